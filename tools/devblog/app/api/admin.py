@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 from app.db import get_db
 from app.models import Project
 from app.core.config import settings
+from app.services.project_cache import project_cache
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 templates = Jinja2Templates(directory="app/templates")
@@ -42,6 +43,7 @@ def projects_create(request: Request, name: str = Form(...), repo_full_name: str
     p = Project(name=name, repo_full_name=repo_full_name, telegram_chat_id=telegram_chat_id, language=language, ai_enabled=ai_flag)
     db.add(p)
     db.commit()
+    project_cache.invalidate(db)
     return RedirectResponse(url="/admin/projects", status_code=303)
 
 
@@ -72,6 +74,7 @@ def projects_edit(request: Request, project_id: int, name: str = Form(None), lan
         p.telegram_chat_id = telegram_chat_id
     db.add(p)
     db.commit()
+    project_cache.invalidate(db)
     return RedirectResponse(url="/admin/projects", status_code=303)
 
 
@@ -84,6 +87,7 @@ def projects_toggle_ai(project_id: int, db: Session = Depends(get_db), _: bool =
     p.ai_enabled = not p.ai_enabled
     db.add(p)
     db.commit()
+    project_cache.invalidate(db)
     return RedirectResponse(url="/admin/projects", status_code=303)
 
 
@@ -95,4 +99,5 @@ def projects_delete(project_id: int, db: Session = Depends(get_db), _: bool = De
         raise HTTPException(status_code=404, detail="Project not found")
     db.delete(p)
     db.commit()
+    project_cache.invalidate(db)
     return RedirectResponse(url="/admin/projects", status_code=303)
@@ -1,8 +1,16 @@
 """
 Health check endpoint
 """
-from fastapi import APIRouter
-from app.schemas import HealthResponse
+from typing import List
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_async_db
+from app.schemas import HealthResponse, QueueStatsResponse, HttpClientStatsResponse, OpenAIStatsResponse, AICacheStatsResponse
+from app.integrations.http_client import shared_clients
+from app.integrations.openai_service import openai_limiter, openai_metrics
+from app.services.job_queue import JobQueue
+from app.services.ai_cache import ai_post_cache
 from app.core.config import settings
 from app import __version__
 
@@ -17,3 +25,27 @@ async def health_check():
         version=__version__,
         environment=settings.APP_ENV
     )
+
+
+@router.get("/health/queue", response_model=QueueStatsResponse)
+async def queue_stats(db: AsyncSession = Depends(get_async_db)):
+    """Webhook job queue depth and oldest pending wait time"""
+    return QueueStatsResponse(**await JobQueue(db).stats())
+
+
+@router.get("/health/http", response_model=List[HttpClientStatsResponse])
+async def http_client_stats():
+    """Request and connection counters of the shared upstream HTTP clients"""
+    return [HttpClientStatsResponse(**shared.metrics()) for shared in shared_clients]
+
+
+@router.get("/health/openai", response_model=OpenAIStatsResponse)
+async def openai_stats():
+    """OpenAI concurrency limit, retries, latency percentiles and token usage"""
+    return OpenAIStatsResponse(**openai_limiter.stats(), **openai_metrics.snapshot())
+
+
+@router.get("/health/ai-cache", response_model=AICacheStatsResponse)
+async def ai_cache_stats():
+    """Hit rate of the AI post cache (memory and DB tiers) and OpenAI time saved"""
+    return AICacheStatsResponse(**ai_post_cache.stats())
@@ -0,0 +1,16 @@
+"""
+Prometheus metrics endpoint
+"""
+from fastapi import APIRouter
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from app.core.metrics import render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus exposition of all processes sharing PROMETHEUS_MULTIPROC_DIR (or of this one)"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
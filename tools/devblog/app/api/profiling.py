@@ -0,0 +1,45 @@
+"""
+Profiling endpoints (admin only)
+Profiles are folded stacks: open them in https://www.speedscope.app or pipe them to flamegraph.pl
+"""
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from app.core.auth import require_admin
+from app.core.config import settings
+from app.core.profiler import SamplingProfiler, list_profiles, profile_path
+
+router = APIRouter(prefix="/admin/profiles", tags=["profiling"], dependencies=[Depends(require_admin)])
+
+
+@router.post("")
+async def profile_window(seconds: float = Query(10.0, gt=0)):
+    """Sample the whole process for `seconds` (at most PROFILE_MAX_SEC) and return the profile"""
+    profiler = SamplingProfiler.try_start("window")
+    if profiler is None:
+        raise HTTPException(status_code=409, detail="Another profile is running")
+    try:
+        await asyncio.sleep(min(seconds, settings.PROFILE_MAX_SEC))
+    finally:
+        path = profiler.stop()
+    return FileResponse(path, media_type="text/plain", filename=path.name)
+
+
+@router.get("")
+def profiles():
+    """Stored profile ids, newest first (single-request profiles are triggered with `X-Profile: 1`)"""
+    return {"profiles": list_profiles()}
+
+
+@router.get("/{profile_id}")
+def download_profile(profile_id: str):
+    """Download a stored profile"""
+    try:
+        path = profile_path(profile_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=path.name)
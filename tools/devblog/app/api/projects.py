@@ -1,6 +1,7 @@
 """Projects API endpoints"""
 
-from typing import List
+import re
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 
@@ -10,11 +11,23 @@ from app.schemas import ProjectCreate, ProjectUpdate, ProjectResponse
 from app.core.logger import get_logger
 from app.core.auth import require_admin
 from app.core.config import settings
+from app.core.commit_filter import compile_commit_filter
+from app.core.commit_parser import compile_commit_parser
+from app.services.project_cache import project_cache
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/projects", tags=["projects"])
 
 
+def check_commit_rules(rules: Optional[Dict[str, Any]]) -> None:
+    """Reject rules that would fail to compile when the next push arrives."""
+    try:
+        compile_commit_filter(rules)
+        compile_commit_parser(rules)
+    except (re.error, ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid commit_rules: {exc}")
+
+
 @router.post("/", response_model=ProjectResponse, dependencies=[Depends(require_admin)])
 def create_project(
     project: ProjectCreate,
@@ -24,6 +37,7 @@ def create_project(
     existing = db.query(Project).filter(Project.repo_full_name == project.repo_full_name).first()
     if existing:
         raise HTTPException(status_code=400, detail="Project with this repo already exists")
+    check_commit_rules(project.commit_rules)
 
     db_data = project.dict()
     if not db_data.get("github_webhook_secret"):
@@ -33,8 +47,9 @@ def create_project(
     db.add(db_project)
     db.commit()
     db.refresh(db_project)
+    project_cache.invalidate(db)
 
-    logger.info(f"Project created: {db_project.id} ({project.repo_full_name})")
+    logger.info("Project created: %s (%s)", db_project.id, project.repo_full_name)
     return db_project
 
 
@@ -66,14 +81,16 @@ def update_project(
         raise HTTPException(status_code=404, detail="Project not found")
 
     update_data = project.dict(exclude_unset=True)
+    check_commit_rules(update_data.get("commit_rules"))
     for field, value in update_data.items():
         setattr(db_project, field, value)
 
     db.add(db_project)
     db.commit()
     db.refresh(db_project)
+    project_cache.invalidate(db)
 
-    logger.info(f"Project updated: {project_id}")
+    logger.info("Project updated: %s", project_id)
     return db_project
 
 
@@ -86,6 +103,7 @@ def delete_project(project_id: int, db: Session = Depends(get_db)):
 
     db.delete(db_project)
     db.commit()
+    project_cache.invalidate(db)
 
-    logger.info(f"Project deleted: {project_id}")
+    logger.info("Project deleted: %s", project_id)
     return {"status": "deleted"}
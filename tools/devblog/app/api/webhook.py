@@ -2,26 +2,39 @@
 GitHub Webhook endpoint
 """
 import hmac
+import time
+import asyncio
 import hashlib
-import json
+from typing import Optional, Callable, TypeVar
 from fastapi import APIRouter, Request, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
-from app.models import Project, CommitEvent, Post
-from app.core.logger import get_logger
+from app.db import get_async_db
+from app.models import ProjectSnapshot
+from app.core.logger import get_logger, add_log_context, current_request_id
 from app.services.commit_processor import CommitProcessor
+from app.services.job_queue import JobQueue
+from app.services.project_cache import project_cache
+from app.services.delivery_log import DeliveryLog
+from app.services.push_payload import PushPayload, parse_push_payload
 from app.core.config import settings
+from app.core.commit_filter import get_commit_filter
+from app.core.metrics import SIGNATURE_SECONDS, PUSH_COMMITS
+from app.core.timing import span, record
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/webhook", tags=["webhook"])
 
+T = TypeVar("T")
+
 
 def validate_github_signature(request_body: bytes, signature: str, secret: str) -> bool:
     """
     Validate GitHub webhook signature
     X-Hub-Signature-256: sha256=<hmac>
     """
+    started = time.perf_counter()
     expected_signature = hmac.new(
         secret.encode(),
         request_body,
@@ -30,49 +43,76 @@ def validate_github_signature(request_body: bytes, signature: str, secret: str)
     
     provided_signature = signature.split("=")[-1] if "=" in signature else ""
     
-    return hmac.compare_digest(expected_signature, provided_signature)
+    valid = hmac.compare_digest(expected_signature, provided_signature)
+    elapsed = time.perf_counter() - started
+    SIGNATURE_SECONDS.observe(elapsed)
+    record("signature", elapsed)
+    return valid
+
+
+async def run_cpu_bound(size: int, func: Callable[..., T], *args) -> T:
+    """Run CPU-bound work on the body in a thread when it is large, inline otherwise
+    (a thread hop costs more than hashing or decoding a small body)."""
+    if size >= settings.WEBHOOK_OFFLOAD_MIN_BYTES:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+
+async def read_body_limited(request: Request, max_bytes: int) -> bytes:
+    """Read request body, rejecting it with 413 as soon as it exceeds `max_bytes`."""
+    content_length = request.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail="Payload too large")
+    
+    body = bytearray()
+    with span("read"):
+        async for chunk in request.stream():
+            body.extend(chunk)
+            if len(body) > max_bytes:
+                raise HTTPException(status_code=413, detail="Payload too large")
+    return bytes(body)
 
 
 @router.post("/github")
 async def github_webhook(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     GitHub push webhook handler
-    Receives push events and processes commits
+    Receives push events, verifies them and queues commits for the worker
     """
     # Get headers
     github_event = request.headers.get("X-GitHub-Event")
     signature = request.headers.get("X-Hub-Signature-256", "")
+    delivery_id = request.headers.get("X-GitHub-Delivery")
     
     # Only handle push events
     if github_event != "push":
-        logger.info(f"Ignoring GitHub event: {github_event}")
+        logger.info("Ignoring GitHub event: %s", github_event)
         return {"status": "ignored"}
     
     # Get raw body for signature validation
-    body = await request.body()
+    body = await read_body_limited(request, settings.WEBHOOK_MAX_BODY_BYTES)
     
     try:
-        payload = json.loads(body)
-    except json.JSONDecodeError:
+        with span("parse"):
+            payload = await run_cpu_bound(len(body), parse_push_payload, body)
+    except ValueError:
         logger.error("Invalid JSON in webhook payload")
         raise HTTPException(status_code=400, detail="Invalid JSON")
     
     # Get repository info
-    repo_full_name = payload.get("repository", {}).get("full_name")
+    repo_full_name = payload.repo_full_name
     if not repo_full_name:
         logger.error("Missing repository full_name in payload")
         raise HTTPException(status_code=400, detail="Missing repository info")
     
-    # Find project
-    project = db.query(Project).filter(
-        Project.repo_full_name == repo_full_name
-    ).first()
+    # Find project (cached snapshot)
+    project = await project_cache.get_by_repo(db, repo_full_name)
     
     if not project:
-        logger.warning(f"Project not found for repo: {repo_full_name}")
+        logger.warning("Project not found for repo: %s", repo_full_name)
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Determine secret (project-level or global default)
@@ -80,43 +120,159 @@ async def github_webhook(
 
     # Signature header must exist
     if not signature:
-        logger.error(f"Missing signature header for project {project.id}")
+        logger.error("Missing signature header for project %s", project.id)
         raise HTTPException(status_code=401, detail="Missing signature")
 
+    add_log_context(project_id=project.id)
+
     # Validate signature
-    # DEBUG: log signature info
-    logger.info(f"DEBUG: Signature header: {signature[:20]}...")
-    logger.info(f"DEBUG: Webhook secret (first 16): {webhook_secret[:16]}...")
-    logger.info(f"DEBUG: Request body length: {len(body)}")
-    
-    if not validate_github_signature(body, signature, webhook_secret):
-        # DEBUG: compute what we expect
-        import hmac as hmac_module
-        import hashlib
-        expected_sig = hmac_module.new(webhook_secret.encode(), body, hashlib.sha256).hexdigest()
-        logger.error(f"Invalid signature. Expected: sha256={expected_sig}, Got: {signature}")
-        logger.error(f"Invalid signature for project {project.id}")
+    if not await run_cpu_bound(len(body), validate_github_signature, body, signature, webhook_secret):
+        logger.error("Invalid signature for project %s (body %d bytes)", project.id, len(body))
         raise HTTPException(status_code=401, detail="Invalid signature")
+    request.state.project_id = project.id  # metrics label, only for verified requests
+    
+    logger.info("Valid webhook received for project %s (%s)", project.id, repo_full_name)
+    
+    duplicate = await DeliveryLog(db).get_response(delivery_id)
+    if duplicate is not None:
+        return duplicate_response(delivery_id, duplicate)
+    
+    return await accept_push(db, project, payload, delivery_id)
+
+
+@router.post("/github/{project_id}")
+async def github_project_webhook(
+    project_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    GitHub push webhook handler addressed by project id
+    The secret is known from the URL, so the signature is verified on raw bytes
+    before any JSON decoding; forged or oversized requests are rejected cheaply.
+    """
+    github_event = request.headers.get("X-GitHub-Event")
+    signature = request.headers.get("X-Hub-Signature-256", "")
+    delivery_id = request.headers.get("X-GitHub-Delivery")
     
-    logger.info(f"Valid webhook received for project {project.id} ({repo_full_name})")
+    if github_event != "push":
+        logger.info("Ignoring GitHub event: %s", github_event)
+        return {"status": "ignored"}
     
-    # Process commits
-    commits = payload.get("commits", [])
-    branch = payload.get("ref", "").split("/")[-1]  # refs/heads/main -> main
+    if not signature:
+        raise HTTPException(status_code=401, detail="Missing signature")
+    
+    add_log_context(project_id=project_id)
+    project = await project_cache.get_by_id(db, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    body = await read_body_limited(request, settings.WEBHOOK_MAX_BODY_BYTES)
+    
+    webhook_secret = project.github_webhook_secret or settings.GITHUB_WEBHOOK_SECRET_DEFAULT
+    if not await run_cpu_bound(len(body), validate_github_signature, body, signature, webhook_secret):
+        logger.error("Invalid signature for project %s", project.id)
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    request.state.project_id = project.id  # metrics label, only for verified requests
+    
+    # Redelivery: answer from the log without decoding the payload again
+    duplicate = await DeliveryLog(db).get_response(delivery_id)
+    if duplicate is not None:
+        return duplicate_response(delivery_id, duplicate)
+    
+    try:
+        with span("parse"):
+            payload = await run_cpu_bound(len(body), parse_push_payload, body)
+    except ValueError:
+        logger.error("Invalid JSON in webhook payload")
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    
+    # The secret may be shared (default secret), so the URL must match the repo too
+    if payload.repo_full_name != project.repo_full_name:
+        logger.warning("Repository %s does not match project %s", payload.repo_full_name, project.id)
+        raise HTTPException(status_code=400, detail="Repository does not match project")
+    
+    logger.info("Valid webhook received for project %s (%s)", project.id, project.repo_full_name)
+    
+    return await accept_push(db, project, payload, delivery_id)
+
+
+def duplicate_response(delivery_id: str, response: dict):
+    """Response for a delivery that was already accepted"""
+    logger.info("Duplicate delivery %s, returning stored result", delivery_id)
+    return {**response, "duplicate": True}
+
+
+async def accept_push(db: AsyncSession, project: ProjectSnapshot, payload: PushPayload, delivery_id: Optional[str] = None):
+    """Queue (or inline-process) commits of a verified push"""
+    commits = payload.commits
+    branch = payload.branch
     
     if not commits:
-        logger.info(f"No commits in webhook for project {project.id}")
+        logger.info("No commits in webhook for project %s", project.id)
         return {"status": "no commits"}
+    PUSH_COMMITS.labels(str(project.id)).observe(len(commits))
+    
+    # Project rules are applied to the raw commits: ignored pushes cost no job, row or delivery record
+    rules = get_commit_filter(project.commit_rules)
+    if not rules.accepts_branch(branch):
+        logger.info("Ignoring push to branch %s of project %s", branch, project.id)
+        return {"status": "ignored", "reason": "branch"}
+    commits = rules.select(commits)
+    if not commits:
+        logger.info("All %d commits of the push rejected by the rules of project %s", len(payload.commits), project.id)
+        return {"status": "ignored", "reason": "rules", "commits_received": len(payload.commits)}
+    
+    deliveries = DeliveryLog(db)
+    
+    # Hand off to the worker: persist a job and ack immediately
+    if settings.WEBHOOK_QUEUE_ENABLED:
+        with span("enqueue"):
+            job = await JobQueue(db).enqueue(project.id, {"branch": branch, "commits": commits, "request_id": current_request_id()}, commit=False)
+            content = {
+                "status": "queued",
+                "job_id": job.id,
+                "commits_received": len(payload.commits),
+            }
+            # Job and delivery are committed together; a concurrent duplicate rolls both back
+            if delivery_id:
+                duplicate = await deliveries.record(delivery_id, project.id, content, job_id=job.id)
+            else:
+                duplicate = None
+                await db.commit()
+        if duplicate is not None:
+            return duplicate_response(delivery_id, duplicate)
+        logger.info("Webhook queued for project %s: job %s", project.id, content["job_id"])
+        return JSONResponse(status_code=202, content=content)
+    
+    # Inline processing (queue disabled): claim the delivery before doing any work,
+    # and release the claim if processing fails so a redelivery is processed again
+    if delivery_id:
+        duplicate = await deliveries.record(delivery_id, project.id, {"status": "processing"})
+        if duplicate is not None:
+            return duplicate_response(delivery_id, duplicate)
     
-    # Process using CommitProcessor
     processor = CommitProcessor(db, project)
-    result = processor.process_webhook_commits(commits, branch)
+    try:
+        with span("process"):
+            result = await processor.process_webhook_commits(commits, branch)
+    except Exception:
+        await db.rollback()
+        if delivery_id:
+            await deliveries.forget(delivery_id)
+        raise
     
-    logger.info(f"Webhook processed for project {project.id}: {result}")
+    logger.info("Webhook processed for project %s: %s", project.id, result)
+    if result.get("error") and delivery_id:
+        # The post was not sent: a redelivery takes it over (see CommitProcessor._retry_failed_posts)
+        await deliveries.forget(delivery_id)
     
-    return {
+    content = {
         "status": "success",
-        "commits_received": len(commits),
+        "commits_received": len(payload.commits),
         "commits_processed": result.get("processed", 0),
         "message_sent": result.get("message_sent", False)
     }
+    if delivery_id and not result.get("error"):
+        await deliveries.update_response(delivery_id, content)
+    return content
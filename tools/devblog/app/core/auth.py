@@ -1,17 +1,30 @@
 """
 Admin auth utilities
 """
+import hmac
 from fastapi import Header, HTTPException
-from typing import Optional
+from typing import List, Optional
 
 from app.core.config import settings
 
 
+def is_admin_token(token: Optional[str]) -> bool:
+    """Constant-time check of an `X-Admin-Token` value; False when no admin key is configured."""
+    if not settings.ADMIN_API_KEY or not token:
+        return False
+    return hmac.compare_digest(token.encode("latin-1", "replace"), settings.ADMIN_API_KEY.encode("latin-1", "replace"))
+
+
+def has_admin_token(headers: List[tuple]) -> bool:
+    """`is_admin_token` for raw ASGI headers (middlewares run before FastAPI dependencies)."""
+    return is_admin_token(dict(headers).get(b"x-admin-token", b"").decode("latin-1"))
+
+
 def require_admin(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
     """Dependency that enforces presence of valid admin API key in header `X-Admin-Token`"""
     if not settings.ADMIN_API_KEY:
         # In case no admin key is set, deny by default
         raise HTTPException(status_code=403, detail="Admin API key not configured")
-    if not x_admin_token or x_admin_token != settings.ADMIN_API_KEY:
+    if not is_admin_token(x_admin_token):
         raise HTTPException(status_code=401, detail="Invalid admin API token")
     return True
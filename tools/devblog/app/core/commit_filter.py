@@ -0,0 +1,117 @@
+"""
+Per-project commit filter
+Branch globs, author include/exclude, message regexes and a minimum length,
+compiled once per rule set and applied to raw webhook commits before anything is stored
+"""
+import re
+import json
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Pattern
+
+# Keys of Project.commit_rules read by the filter (the parser reads "aliases" and "allowed_types")
+FILTER_KEYS = ("branches", "ignore_branches", "authors", "ignore_authors", "messages", "ignore_messages", "min_length")
+
+
+def _pattern_list(patterns: Optional[Iterable[str]]) -> List[str]:
+    """The patterns as a list; a bare string would otherwise become one pattern per character."""
+    if isinstance(patterns, str) or not isinstance(patterns, (list, tuple, type(None))):
+        raise ValueError(f"expected a list of patterns, got {patterns!r}")
+    if not all(isinstance(p, str) for p in patterns or []):
+        raise ValueError(f"patterns must be strings, got {patterns!r}")
+    return list(patterns or [])
+
+
+def _compile_globs(patterns: Optional[Iterable[str]]) -> Optional[Pattern[str]]:
+    """One case-insensitive regex for a list of globs (`*` any run of characters, `?` one character)."""
+    patterns = _pattern_list(patterns)
+    if not patterns:
+        return None
+    parts = (re.escape(p).replace(r"\*", ".*").replace(r"\?", ".") for p in patterns)
+    return re.compile("(?:" + "|".join(parts) + r")\Z", re.IGNORECASE)
+
+
+def _compile_regexes(patterns: Optional[Iterable[str]]) -> Optional[Pattern[str]]:
+    patterns = _pattern_list(patterns)
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.MULTILINE)
+
+
+class CommitFilter:
+    """Compiled commit_rules filter; the defaults accept everything.
+
+    Notes:
+    - Branch and author lists are globs matched against the whole name, case-insensitively
+      (`release/*`, `*[bot]`, `dependabot*`).
+    - `messages` / `ignore_messages` are regexes searched in the full message; with `messages`
+      set, a commit must match at least one of them.
+    - `min_length` applies to the stripped message.
+    - Raises re.error on an invalid pattern and ValueError on a value of the wrong type
+      (e.g. a string instead of a list), so bad rules are rejected when they are saved.
+    """
+
+    def __init__(
+        self,
+        branches: Optional[Iterable[str]] = None,
+        ignore_branches: Optional[Iterable[str]] = None,
+        authors: Optional[Iterable[str]] = None,
+        ignore_authors: Optional[Iterable[str]] = None,
+        messages: Optional[Iterable[str]] = None,
+        ignore_messages: Optional[Iterable[str]] = None,
+        min_length: int = 0,
+    ):
+        self.branches = _compile_globs(branches)
+        self.ignore_branches = _compile_globs(ignore_branches)
+        self.authors = _compile_globs(authors)
+        self.ignore_authors = _compile_globs(ignore_authors)
+        self.messages = _compile_regexes(messages)
+        self.ignore_messages = _compile_regexes(ignore_messages)
+        if isinstance(min_length, bool) or not isinstance(min_length, (int, type(None))):
+            raise ValueError(f"min_length must be an integer, got {min_length!r}")
+        self.min_length = max(0, min_length or 0)
+        self.filters_commits = any(
+            (self.authors, self.ignore_authors, self.messages, self.ignore_messages, self.min_length)
+        )
+
+    def accepts_branch(self, branch: str) -> bool:
+        if self.branches and not self.branches.match(branch):
+            return False
+        return not (self.ignore_branches and self.ignore_branches.match(branch))
+
+    def accepts(self, author: str, message: str) -> bool:
+        if self.authors and not self.authors.match(author):
+            return False
+        if self.ignore_authors and self.ignore_authors.match(author):
+            return False
+        if self.min_length and len(message.strip()) < self.min_length:
+            return False
+        if self.messages and not self.messages.search(message):
+            return False
+        return not (self.ignore_messages and self.ignore_messages.search(message))
+
+    def select(self, commits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Raw webhook commits (see push_payload.project_commit) that pass the author and message rules."""
+        if not self.filters_commits:
+            return commits
+        return [
+            c for c in commits
+            if self.accepts((c.get("author") or {}).get("name") or "Unknown", c.get("message") or "")
+        ]
+
+
+DEFAULT_FILTER = CommitFilter()
+
+
+def compile_commit_filter(rules: Optional[Dict[str, Any]]) -> CommitFilter:
+    """Filter for a commit_rules dict; raises re.error / ValueError on invalid rules."""
+    if not rules:
+        return DEFAULT_FILTER
+    if not isinstance(rules, dict):
+        raise ValueError(f"commit_rules must be an object, got {rules!r}")
+    return CommitFilter(**{key: rules[key] for key in FILTER_KEYS if key in rules})
+
+
+@lru_cache(maxsize=256)
+def get_commit_filter(rules_json: Optional[str]) -> CommitFilter:
+    """Filter for a project's `commit_rules` (canonical JSON, see ProjectSnapshot); compiled once per distinct rule set."""
+    return compile_commit_filter(json.loads(rules_json) if rules_json else None)
@@ -0,0 +1,103 @@
+"""
+Conventional Commits parser
+One precompiled pass per message: type, scope, breaking-change flag and subject
+"""
+import re
+import json
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, Mapping, NamedTuple, Optional
+
+# type(scope)!: subject - on the first line only
+HEADER_RE = re.compile(r"(?P<type>[A-Za-z][\w-]*)(?:\((?P<scope>[^()\r\n]*)\))?(?P<bang>!)?:[ \t]*(?P<subject>[^\r\n]*)")
+BREAKING_FOOTER_RE = re.compile(r"^BREAKING[ -]CHANGE:", re.MULTILINE)
+# Leading verb of a free-form message, used to pick an emoji when there is no type
+KEYWORD_RE = re.compile(r"(?P<word>[A-Za-z]+)")
+
+DEFAULT_ALIASES: Dict[str, str] = {
+    "feature": "feat",
+    "bugfix": "fix",
+    "performance": "perf",
+    "doc": "docs",
+}
+# Types announced by default (other typed commits still pass when they are long enough)
+DEFAULT_ALLOWED_TYPES = ("feat", "fix", "perf", "docs", "style", "refactor", "test", "chore")
+DEFAULT_KEYWORDS: Dict[str, str] = {
+    "add": "feat", "added": "feat", "implement": "feat",
+    "fix": "fix", "fixed": "fix", "bug": "fix",
+    "optimize": "perf", "speed": "perf",
+    "document": "docs",
+    "refactor": "refactor",
+    "test": "test", "tests": "test",
+    "update": "chore", "bump": "chore",
+}
+MAX_TYPE_LEN = 32
+MAX_SCOPE_LEN = 64
+# Untyped messages this short are treated as noise ("wip", "typo")
+MIN_UNTYPED_LENGTH = 11
+
+
+class ParsedCommit(NamedTuple):
+    type: Optional[str]  # Canonical lowercase type, None for free-form messages
+    scope: Optional[str]
+    breaking: bool
+    subject: str  # First line without the "type(scope)!:" header
+
+
+class CommitParser:
+    """Conventional Commits parser with project-specific type aliases and announced types."""
+
+    def __init__(
+        self,
+        aliases: Optional[Mapping[str, str]] = None,
+        allowed_types: Iterable[str] = DEFAULT_ALLOWED_TYPES,
+    ):
+        self.aliases: Dict[str, str] = {**DEFAULT_ALIASES, **{k.lower(): v.lower() for k, v in (aliases or {}).items()}}
+        self.allowed_types: FrozenSet[str] = frozenset(t.lower() for t in allowed_types)
+
+    def parse(self, message: str) -> ParsedCommit:
+        message = (message or "").strip()
+        first_line = message.split("\n", 1)[0].strip()
+        match = HEADER_RE.match(first_line)
+        if not match:
+            return ParsedCommit(None, None, bool(BREAKING_FOOTER_RE.search(message)), first_line)
+        commit_type = match["type"].lower()
+        commit_type = self.aliases.get(commit_type, commit_type)[:MAX_TYPE_LEN]
+        scope = (match["scope"] or "").strip()[:MAX_SCOPE_LEN] or None
+        breaking = bool(match["bang"]) or bool(BREAKING_FOOTER_RE.search(message))
+        return ParsedCommit(commit_type, scope, breaking, match["subject"].strip())
+
+    def is_announced(self, commit_type: Optional[str], message: str) -> bool:
+        """Announced types always pass; anything else only if the message is not trivially short."""
+        return commit_type in self.allowed_types or len((message or "").strip()) >= MIN_UNTYPED_LENGTH
+
+    @staticmethod
+    def display_type(parsed: ParsedCommit) -> Optional[str]:
+        """Type to show (emoji, tag): the parsed one, else guessed from the leading verb."""
+        if parsed.type:
+            return parsed.type
+        match = KEYWORD_RE.match(parsed.subject)
+        return DEFAULT_KEYWORDS.get(match["word"].lower()) if match else None
+
+
+DEFAULT_PARSER = CommitParser()
+
+
+def compile_commit_parser(rules: Optional[Dict[str, Any]]) -> CommitParser:
+    """Parser for a commit_rules dict; raises ValueError when "aliases" or "allowed_types" has the wrong type."""
+    if not rules:
+        return DEFAULT_PARSER
+    aliases = rules.get("aliases")
+    if aliases is not None and not (
+        isinstance(aliases, dict) and all(isinstance(v, str) for v in (*aliases.keys(), *aliases.values()))
+    ):
+        raise ValueError(f"aliases must map type names to type names, got {aliases!r}")
+    allowed_types = rules.get("allowed_types", DEFAULT_ALLOWED_TYPES)
+    if not (isinstance(allowed_types, (list, tuple)) and all(isinstance(t, str) for t in allowed_types)):
+        raise ValueError(f"allowed_types must be a list of type names, got {allowed_types!r}")
+    return CommitParser(aliases=aliases, allowed_types=allowed_types)
+
+
+@lru_cache(maxsize=256)
+def get_commit_parser(rules_json: Optional[str]) -> CommitParser:
+    """Parser for a project's `commit_rules` (canonical JSON, see ProjectSnapshot); compiled once per distinct rule set."""
+    return compile_commit_parser(json.loads(rules_json) if rules_json else None)
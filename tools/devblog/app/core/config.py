@@ -19,9 +19,31 @@ class Settings(BaseSettings):
     # OpenAI
     OPENAI_API_KEY: Optional[str] = None
     OPENAI_MODEL: str = "gpt-4o-mini"
+    OPENAI_API_BASE: str = "https://api.openai.com/v1"
+    OPENAI_TIMEOUT_SEC: float = 20.0
+    # Retries on 429/5xx/timeouts: full-jitter backoff, Retry-After honored up to OPENAI_RETRY_MAX_SEC
+    OPENAI_MAX_RETRIES: int = 3
+    OPENAI_RETRY_BASE_SEC: float = 1.0
+    OPENAI_RETRY_MAX_SEC: float = 30.0
+    # Adaptive (AIMD) limit of concurrent calls per process
+    OPENAI_MAX_CONCURRENCY: int = 8
+    OPENAI_MIN_CONCURRENCY: int = 1
+    # Estimated prompt tokens per post; larger pushes are deduplicated, grouped and truncated
+    OPENAI_PROMPT_TOKEN_BUDGET: int = 1500
+    # Hedged posts: send the template at once, edit it to the AI text if that arrives within the deadline
+    AI_HEDGED_POSTS: bool = False
+    AI_HEDGE_DEADLINE_SEC: float = 60.0
+    # Cache of generated posts: in-memory LRU in front of the ai_post_cache table
+    AI_CACHE_TTL_SEC: int = 7 * 86400
+    AI_CACHE_MAX_SIZE: int = 256
     
     # Telegram
     TELEGRAM_BOT_TOKEN: Optional[str] = None
+    # Bot API base URL (point at a local stub in tests / load tests)
+    TELEGRAM_API_BASE: str = "https://api.telegram.org"
+    # Shared keep-alive client: pool size and HTTP/2 (needs the h2 package)
+    TELEGRAM_MAX_CONNECTIONS: int = 20
+    TELEGRAM_HTTP2: bool = True
     
     # GitHub
     GITHUB_WEBHOOK_SECRET_DEFAULT: str = "test-secret"
@@ -29,9 +51,78 @@ class Settings(BaseSettings):
     ADMIN_API_KEY: Optional[str] = None
     # Telegram rate limit (messages per minute). 0 disables limiter.
     TELEGRAM_RATE_LIMIT_PER_MIN: int = 20
+    # Messages a chat may receive back to back before the per-minute rate applies
+    TELEGRAM_CHAT_BURST: int = 3
+    # Bot-wide limit across all chats (Telegram allows about 30/s). 0 disables.
+    TELEGRAM_GLOBAL_RATE_PER_SEC: float = 30
+    # Sends wait for capacity instead of failing; give up only after this long (keep below WORKER_LEASE_SEC)
+    TELEGRAM_MAX_SEND_WAIT_SEC: float = 90
     
-    # Logging
+    # Webhook payloads (GitHub caps deliveries at 25 MB)
+    WEBHOOK_MAX_BODY_BYTES: int = 25 * 1024 * 1024
+    # Bodies at least this large are verified (HMAC) and decoded in a thread, off the event loop
+    WEBHOOK_OFFLOAD_MIN_BYTES: int = 64 * 1024
+    # Commits are written and released in chunks of this size
+    COMMIT_CHUNK_SIZE: int = 200
+    # Recently stored commit hashes remembered per project (skips the DB for re-pushed commits)
+    SEEN_COMMITS_PER_PROJECT: int = 10000
+    
+    # Webhook job queue (drained by scripts/worker.py). When disabled, commits are processed inline.
+    WEBHOOK_QUEUE_ENABLED: bool = True
+    WORKER_CONCURRENCY: int = 4
+    WORKER_POLL_INTERVAL_SEC: float = 1.0
+    WORKER_LEASE_SEC: int = 120
+    # A running job renews its lease this often (keep well below WORKER_LEASE_SEC)
+    WORKER_HEARTBEAT_SEC: int = 30
+    # Finished (done/failed) jobs and accepted deliveries are deleted after this long
+    JOB_RETENTION_SEC: int = 7 * 24 * 3600
+    WORKER_MAX_ATTEMPTS: int = 5
+    # A post that failed to send is retried at most this many times in total, and only while its
+    # commits are younger than POST_RETRY_MAX_AGE_SEC; after that it stays in "error"
+    POST_MAX_SEND_ATTEMPTS: int = 5
+    POST_RETRY_MAX_AGE_SEC: int = 24 * 3600
+    WORKER_RETRY_BASE_SEC: int = 5
+    
+    # Coalescing (Project.coalesce_window_sec > 0): a project's post is delayed at most this long
+    # after the first push it covers, even if pushes keep arriving
+    COALESCE_MAX_DELAY_SEC: int = 600
+    
+    # post_mode="daily_digest": one digest per project per period, checked by the worker
+    DIGEST_PERIOD_SEC: int = 86400
+    DIGEST_CHECK_INTERVAL_SEC: int = 60
+    DIGEST_MAX_COMMITS: int = 500  # Per digest; the rest goes into the next one
+    # The watermark only moves past commits stored longer ago than this (slow transactions may commit lower ids late)
+    DIGEST_WATERMARK_LAG_SEC: int = 300
+    # Generate AI digests through the OpenAI Batch API when at least DIGEST_BATCH_MIN_PROJECTS are due
+    DIGEST_BATCH_ENABLED: bool = False
+    DIGEST_BATCH_MIN_PROJECTS: int = 10
+    DIGEST_BATCH_MAX_WAIT_SEC: float = 1800.0  # Then cancelled; unfinished digests use the template
+    DIGEST_BATCH_POLL_SEC: float = 30.0
+    
+    # In-process Project cache (TTL + LRU), invalidated across processes via cache_versions table
+    PROJECT_CACHE_TTL_SEC: int = 60
+    PROJECT_CACHE_NEGATIVE_TTL_SEC: int = 5
+    PROJECT_CACHE_MAX_SIZE: int = 1024
+    PROJECT_CACHE_VERSION_CHECK_SEC: float = 1.0
+    
+    # Logging: records go through a queue to one writer thread; "json" or "text" lines
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_QUEUE_SIZE: int = 10000
+    # Keep a share of DEBUG/INFO lines of busy loggers, e.g. "app.api.webhook=0.1,app.core.timing=0.5"
+    LOG_SAMPLING: str = ""
+    
+    # Prometheus /metrics. Set a directory shared by all processes (uvicorn --workers N, worker.py)
+    # to aggregate their samples; empty it before starting them.
+    PROMETHEUS_MULTIPROC_DIR: Optional[str] = None
+    
+    # Stage timing: Server-Timing header on every response, warning log for requests/jobs slower than this (0 = off)
+    SERVER_TIMING_ENABLED: bool = True
+    SLOW_REQUEST_MS: int = 2000
+    # On-demand sampling profiler (admin only): folded stacks are written to PROFILE_DIR
+    PROFILE_DIR: str = "profiles"
+    PROFILE_INTERVAL_SEC: float = 0.005
+    PROFILE_MAX_SEC: float = 300.0
     
     class Config:
         env_file = ".env"
@@ -1,25 +1,268 @@
 """
 Logging configuration
+Loggers hand records to a queue; a single listener thread formats, redacts and writes them,
+so request handlers and the event loop never block on stdout. Records carry the request/job
+context (request_id, project_id, job_id) bound with `bind_log_context`.
 """
-import logging
+import re
 import sys
+import json
+import uuid
+import queue
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, FrozenSet, Iterator, Optional
+
 from .config import settings
 
+CONTEXT_FIELDS = ("request_id", "project_id", "job_id")
+REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Attributes every LogRecord has; anything else was passed with `extra=` and goes to the JSON line
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", *CONTEXT_FIELDS}
+
+_log_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+
+
+@contextmanager
+def bind_log_context(**fields: Any) -> Iterator[None]:
+    """Attach fields (request_id, project_id, job_id) to every record logged inside the block."""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def add_log_context(**fields: Any) -> None:
+    """Attach fields for the rest of the current request/task (e.g. once the project is known)."""
+    _log_context.set({**_log_context.get(), **fields})
+
+
+def current_request_id() -> Optional[str]:
+    return _log_context.get().get("request_id")
+
+
+# Redaction -----------------------------------------------------------------------------------
+
+_SECRET_PATTERNS = (
+    (re.compile(r"(?<!\d)\d{6,12}:[A-Za-z0-9_-]{30,}"), "<telegram-token>"),  # also inside /bot<token>/
+    (re.compile(r"\bsk-[A-Za-z0-9_-]{16,}"), "<openai-key>"),
+    (re.compile(r"\b(sha(?:1|256)=)[0-9a-fA-F]{40,}"), r"\1<redacted>"),
+    (re.compile(r"(?i)\b(bearer\s+)[A-Za-z0-9._~+/=-]{8,}"), r"\1<redacted>"),
+    (
+        re.compile(r"(?i)([\w-]*(?:secret|token|api_key|apikey|password)[\"']?\s*[:=]\s*[\"']?)([^\s\"',;}]{4,})"),
+        r"\1<redacted>",
+    ),
+)
+_MIN_SECRET_LENGTH = 6
+_registered_secrets: FrozenSet[str] = frozenset()  # replaced, never mutated: read without a lock
+
+
+def register_secret(*values: Optional[str]) -> None:
+    """Redact these exact values (e.g. per-project webhook secrets) from every log line."""
+    global _registered_secrets
+    new = {value for value in values if value and len(value) >= _MIN_SECRET_LENGTH} - _registered_secrets
+    if new:
+        _registered_secrets = _registered_secrets | new
+
+
+def redact(text: str) -> str:
+    """Mask configured secrets and anything shaped like a token, key or signature."""
+    for value in (
+        settings.SECRET_KEY, settings.OPENAI_API_KEY, settings.TELEGRAM_BOT_TOKEN,
+        settings.ADMIN_API_KEY, settings.GITHUB_WEBHOOK_SECRET_DEFAULT, *_registered_secrets,
+    ):
+        if value and len(value) >= _MIN_SECRET_LENGTH and value in text:
+            text = text.replace(value, "<redacted>")
+    for pattern, replacement in _SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+# Filters and formatters ----------------------------------------------------------------------
+
+class LogContextFilter(logging.Filter):
+    """Copies the bound context onto the record, in the caller's thread before it is queued."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.get().items():
+            setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Passes `rate` of the DEBUG/INFO records of one logger (evenly spaced); warnings always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self._credit = 0.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        self._credit += self.rate
+        if self._credit < 1.0:
+            return False
+        self._credit -= 1.0
+        record.sample_rate = self.rate
+        return True
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """`app.api.webhook=0.1,app.services.digest=0.5` -> {logger name: rate}."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        try:
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = " ".join(f"{key}={getattr(record, key)}" for key in CONTEXT_FIELDS if hasattr(record, key))
+        return redact(f"{line} [{context}]" if context else line)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, context fields, `extra=` fields, exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in CONTEXT_FIELDS:
+            if hasattr(record, key):
+                entry[key] = getattr(record, key)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return redact(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+def build_formatter() -> logging.Formatter:
+    return JsonFormatter() if settings.LOG_FORMAT.lower() == "json" else TextFormatter()
+
+
+# Queue pipeline ------------------------------------------------------------------------------
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Enqueues without waiting; records are dropped (and counted) when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.addFilter(LogContextFilter())
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and render the traceback now (both may change or vanish later), but leave
+        # JSON building, redaction and I/O to the listener thread
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: Optional[NonBlockingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def _queue_handler() -> NonBlockingQueueHandler:
+    global _handler, _listener
+    with _setup_lock:
+        if _handler is None:
+            log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+            output = logging.StreamHandler(sys.stdout)
+            output.setFormatter(build_formatter())
+            _handler = NonBlockingQueueHandler(log_queue)
+            _listener = QueueListener(log_queue, output, respect_handler_level=False)
+            _listener.start()
+            atexit.register(stop_logging)
+        return _handler
+
+
+def stop_logging() -> None:
+    """Flush the queue and stop the listener thread (registered with atexit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        if _handler is not None and _handler.dropped:
+            sys.stderr.write(f"logging: {_handler.dropped} records dropped, queue was full\n")
+
 
 def get_logger(name: str) -> logging.Logger:
     """
     Get a configured logger instance.
-    Never logs sensitive data like tokens or keys.
+    Never logs sensitive data like tokens or keys: every line passes through `redact`.
     """
     logger = logging.getLogger(name)
-    
+
     if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        logger.addHandler(_queue_handler())
         logger.setLevel(settings.LOG_LEVEL)
-    
+        rate = parse_sampling(settings.LOG_SAMPLING).get(name)
+        if rate is not None and rate < 1.0:
+            logger.addFilter(SamplingFilter(rate))
+
     return logger
+
+
+class RequestContextMiddleware:
+    """ASGI middleware binding a request id (X-Request-ID, else X-GitHub-Delivery, else random)
+    to the request's log records and echoing it in the X-Request-ID response header."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        request_id = next(
+            (
+                value.decode("latin-1") for value in (headers.get(b"x-request-id"), headers.get(b"x-github-delivery"))
+                if value and REQUEST_ID_RE.match(value.decode("latin-1"))
+            ),
+            None,
+        ) or uuid.uuid4().hex[:16]
+
+        async def send_with_id(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode())]}
+            await send(message)
+
+        with bind_log_context(request_id=request_id):
+            await self.app(scope, receive, send_with_id)
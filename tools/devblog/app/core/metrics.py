@@ -0,0 +1,169 @@
+"""
+Prometheus metrics
+Collectors shared by the app and the worker. With PROMETHEUS_MULTIPROC_DIR set, every process
+(uvicorn workers, scripts/worker.py) writes its samples there and /metrics aggregates them.
+"""
+import os
+import time
+from typing import Any, Dict
+
+from app.core.config import settings
+from app.core.timing import record
+
+# prometheus_client picks its value storage on import, so the directory must be known first
+if settings.PROMETHEUS_MULTIPROC_DIR:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.PROMETHEUS_MULTIPROC_DIR)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+from prometheus_client import (  # noqa: E402
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Per-project labels use the project id: projects are created by an admin, so cardinality stays small
+HTTP_REQUEST_SECONDS = Histogram(
+    "devblog_http_request_seconds", "Time to handle an HTTP request", ["route", "method", "status"],
+)
+WEBHOOK_SECONDS = Histogram(
+    "devblog_webhook_seconds", "Time to handle a GitHub webhook until the response", ["project", "status"],
+)
+SIGNATURE_SECONDS = Histogram(
+    "devblog_signature_validation_seconds", "HMAC validation of a webhook body", buckets=FAST_BUCKETS,
+)
+PUSH_COMMITS = Histogram(
+    "devblog_push_commits", "Commits per accepted push", ["project"], buckets=COUNT_BUCKETS,
+)
+DB_STATEMENT_SECONDS = Histogram(
+    "devblog_db_statement_seconds", "Database statement execution time", ["engine", "operation"], buckets=FAST_BUCKETS,
+)
+DB_CONNECTIONS_IN_USE = Gauge(
+    "devblog_db_connections_in_use", "Connections checked out of the pool", ["engine"], multiprocess_mode="livesum",
+)
+HTTP_CLIENT_IN_FLIGHT = Gauge(
+    "devblog_http_client_in_flight", "Upstream requests in flight per shared client", ["client"],
+    multiprocess_mode="livesum",
+)
+HTTP_CLIENT_CONNECTIONS = Gauge(
+    "devblog_http_client_connections", "Pooled upstream connections per shared client", ["client", "state"],
+    multiprocess_mode="livesum",
+)
+OPENAI_SECONDS = Histogram(
+    "devblog_openai_request_seconds", "OpenAI request attempt latency", ["project", "status"], buckets=UPSTREAM_BUCKETS,
+)
+OPENAI_TOKENS = Counter("devblog_openai_tokens", "OpenAI tokens billed", ["project", "kind"])
+OPENAI_FAILURES = Counter("devblog_openai_failures", "OpenAI generations that failed after retries", ["project"])
+OPENAI_RETRIES = Counter("devblog_openai_retries", "OpenAI attempts retried", ["reason"])
+TELEGRAM_SECONDS = Histogram(
+    "devblog_telegram_request_seconds", "Telegram Bot API call latency", ["project", "method", "status"],
+    buckets=UPSTREAM_BUCKETS,
+)
+TELEGRAM_THROTTLED = Counter("devblog_telegram_throttled", "Telegram 429 answers", ["project"])
+TELEGRAM_DROPPED = Counter("devblog_telegram_dropped", "Telegram messages given up on", ["project", "reason"])
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "devblog_rate_limit_wait_seconds", "Time spent waiting for a client-side rate/concurrency limiter", ["limiter"],
+    buckets=(0.001, 0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+
+
+def render_metrics() -> bytes:
+    """Exposition text of this process, or of all processes in multiprocess mode."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead() -> None:
+    """Drop this process's live gauges from the multiprocess directory (call on shutdown)."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def instrument_engine(engine: Any, name: str) -> None:
+    """Time every statement and track pool checkouts of a (sync) SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    in_use = DB_CONNECTIONS_IN_USE.labels(name)
+    # {operation: histogram child}, resolved once instead of on every statement
+    children: Dict[str, Any] = {}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        operation = statement.lstrip()[:6].upper()
+        child = children.get(operation)
+        if child is None:
+            known = operation in ("SELECT", "INSERT", "UPDATE", "DELETE")
+            child = children.setdefault(operation, DB_STATEMENT_SECONDS.labels(name, operation if known else "OTHER"))
+        elapsed = time.perf_counter() - started
+        child.observe(elapsed)
+        record("db", elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        conn = context.connection
+        if conn is not None and conn.info.get("metrics_started"):
+            conn.info["metrics_started"].pop()
+
+    @event.listens_for(engine.pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        in_use.inc()
+
+    @event.listens_for(engine.pool, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        in_use.dec()
+
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route template; webhooks also per project.
+
+    Plain ASGI rather than BaseHTTPMiddleware, so the response body is not re-streamed.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            # The router stores the matched route in the same scope dict
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.labels(path, scope["method"], str(status)).observe(elapsed)
+            if path.startswith("/webhook/"):
+                # Handlers put the project in request.state once its signature is verified; the raw URL
+                # id is never used, so unauthenticated requests cannot create new series
+                project = (scope.get("state") or {}).get("project_id") or "unknown"
+                WEBHOOK_SECONDS.labels(str(project), str(status)).observe(elapsed)
@@ -0,0 +1,134 @@
+"""
+On-demand sampling profiler
+A background thread samples the stacks of all threads (stdlib only, no tracing overhead on the
+profiled code) and writes them in the collapsed "folded" format read by flamegraph.pl and speedscope
+"""
+import re
+import sys
+import time
+import uuid
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.auth import has_admin_token
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_ID_RE = re.compile(r"^[0-9a-z_-]{1,64}$")
+
+
+class SamplingProfiler:
+    """Samples every thread each `interval_sec` until stopped.
+
+    Notes:
+    - Only one profiler runs per process at a time (`try_start` returns None otherwise).
+    - Everything the process does in the window is sampled, including other requests served
+      concurrently; the thread name is the root frame of each stack.
+    - Results are files in PROFILE_DIR, so any process sharing the directory can serve them.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, label: str, interval_sec: float = settings.PROFILE_INTERVAL_SEC):
+        self.id = f"{datetime.utcnow():%Y%m%d-%H%M%S}-{label}-{uuid.uuid4().hex[:6]}"
+        self.interval_sec = max(0.001, interval_sec)
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    @classmethod
+    def try_start(cls, label: str) -> Optional["SamplingProfiler"]:
+        if not cls._lock.acquire(blocking=False):
+            return None
+        profiler = cls(label)
+        profiler._started = time.monotonic()
+        profiler._thread = threading.Thread(target=profiler._run, name="sampling-profiler", daemon=True)
+        profiler._thread.start()
+        return profiler
+
+    def stop(self) -> Path:
+        """Stop sampling, write the folded stacks and return the file path."""
+        self._stop.set()
+        self._thread.join()
+        try:
+            path = profile_path(self.id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+            path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        finally:
+            SamplingProfiler._lock.release()
+        logger.info(
+            "Profile %s: %s samples over %.1fs -> %s",
+            self.id, self.samples, time.monotonic() - self._started, path,
+        )
+        return path
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval_sec):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+
+def profile_path(profile_id: str) -> Path:
+    if not PROFILE_ID_RE.match(profile_id):
+        raise ValueError(f"Invalid profile id: {profile_id}")
+    return Path(settings.PROFILE_DIR) / f"{profile_id}.folded"
+
+
+def list_profiles() -> List[str]:
+    directory = Path(settings.PROFILE_DIR)
+    if not directory.is_dir():
+        return []
+    return sorted((p.stem for p in directory.glob("*.folded")), reverse=True)
+
+
+def is_profile_requested(headers: List[tuple]) -> bool:
+    """`X-Profile: 1` together with a valid `X-Admin-Token` (admin key must be configured)."""
+    return dict(headers).get(b"x-profile") in (b"1", b"true") and has_admin_token(headers)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling a single request on demand; the profile id is returned in X-Profile-Id."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not is_profile_requested(scope.get("headers", [])):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = SamplingProfiler.try_start("request")
+        if profiler is None:
+            logger.warning("Profiling requested but another profile is running, serving unprofiled")
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_id(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profiler.id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+
@@ -0,0 +1,127 @@
+"""
+Per-request stage timing
+Code marks stages with `span("name")`; the durations of the current request (or worker job) are
+collected in a context variable, sent back as a Server-Timing header and logged when slow
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.auth import has_admin_token
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class StageTimings:
+    """Total time and count per stage name. Nested or concurrent stages overlap, so they do not add up to the total."""
+
+    __slots__ = ("started", "stages", "closed")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}  # {name: [seconds, count]}
+        self.closed = False
+
+    def add(self, name: str, seconds: float) -> None:
+        if self.closed:
+            return  # a background task outlived the request
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. `db;dur=3.1;desc="x4", telegram;dur=120.4, total;dur=130.2`."""
+        parts = [
+            f'{name};dur={seconds * 1000:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+            for name, (seconds, count) in self.stages.items()
+        ]
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+    def summary(self) -> str:
+        """Stages for a log line, slowest first: `telegram=120ms db=3ms(x4)`."""
+        ordered = sorted(self.stages.items(), key=lambda item: item[1][0], reverse=True)
+        return " ".join(
+            f"{name}={seconds * 1000:.0f}ms" + (f"(x{int(count)})" if count > 1 else "")
+            for name, (seconds, count) in ordered
+        ) or "no stages"
+
+
+_current: ContextVar[Optional[StageTimings]] = ContextVar("stage_timings", default=None)
+
+
+@contextmanager
+def collect_timings() -> Iterator[StageTimings]:
+    """Collect spans of the code run inside (and tasks/threads started from it)."""
+    timings = StageTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        timings.closed = True
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a stage of the current request; a no-op outside `collect_timings`."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add an already measured stage (e.g. from SQLAlchemy events) to the current request."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def log_if_slow(what: str, timings: StageTimings) -> None:
+    elapsed_ms = timings.elapsed() * 1000
+    if settings.SLOW_REQUEST_MS and elapsed_ms >= settings.SLOW_REQUEST_MS:
+        logger.warning("Slow %s: %.0fms (%s)", what, elapsed_ms, timings.summary())
+
+
+class TimingMiddleware:
+    """ASGI middleware: collects the request's spans, adds Server-Timing and logs slow requests.
+
+    Stage timings reveal internals, so Server-Timing is only sent with a valid `X-Admin-Token`.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        show_timing = settings.SERVER_TIMING_ENABLED and has_admin_token(scope.get("headers", []))
+        with collect_timings() as timings:
+            async def send_with_timing(message: Dict[str, Any]) -> None:
+                if message["type"] == "http.response.start" and show_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.server_timing().encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                log_if_slow(f"request {scope['method']} {scope['path']}", timings)
@@ -1,7 +1,7 @@
 """
 Database module
 """
-from .session import SessionLocal, engine, get_db
+from .session import SessionLocal, engine, get_db, AsyncSessionLocal, async_engine, get_async_db
 from .base import Base
 
-__all__ = ["SessionLocal", "engine", "get_db", "Base"]
+__all__ = ["SessionLocal", "engine", "get_db", "AsyncSessionLocal", "async_engine", "get_async_db", "Base"]
@@ -2,11 +2,30 @@
 Database session management
 """
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL to its async driver (sqlite -> aiosqlite, postgresql -> asyncpg)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    elif backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed.render_as_string(hide_password=False)
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
 
 
 # Create engine
@@ -24,6 +43,21 @@ else:
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the webhook path and the worker.
+# Note: an in-memory SQLite database is private to each engine, so use a file for the app.
+if _is_memory_sqlite(settings.DATABASE_URL):
+    async_engine = create_async_engine(async_database_url(settings.DATABASE_URL), poolclass=StaticPool)
+elif settings.DATABASE_URL.startswith("sqlite"):
+    async_engine = create_async_engine(async_database_url(settings.DATABASE_URL))
+else:
+    async_engine = create_async_engine(async_database_url(settings.DATABASE_URL), pool_pre_ping=True)
+
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
+# expire_on_commit=False: attributes must stay readable after commit without an implicit (blocking) reload
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db() -> Generator[Session, None, None]:
     """
@@ -34,3 +68,11 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for getting an async database session (async endpoints)
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
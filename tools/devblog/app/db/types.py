@@ -0,0 +1,23 @@
+"""
+Custom column types
+"""
+from sqlalchemy.types import TypeDecorator, LargeBinary
+
+
+class HexHash(TypeDecorator):
+    """Hex digest (git SHA, sha256...) stored as raw bytes - half the size, fixed width.
+
+    Python side always sees a lowercase hex string.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value
+        return bytes.fromhex(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return bytes(value).hex()
@@ -0,0 +1,188 @@
+"""
+In-place schema upgrade for databases created by earlier versions
+The app creates its schema with `create_all`, which adds missing tables but never changes
+existing ones. `upgrade` brings an existing database to the current models: missing columns,
+indexes and unique constraints are added, and `commit_events` is rebuilt when it still stores
+commit hashes as text with the raw payload inline (`data_raw`). Safe to run repeatedly.
+"""
+import json
+from typing import Any, Dict, List, Set, Tuple
+
+from sqlalchemy import MetaData, Table, UniqueConstraint, insert, inspect, literal, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.types import LargeBinary
+
+from app.db.base import Base
+from app.models import CommitEvent, CommitPayload, Project
+from app.core.commit_parser import get_commit_parser
+from app.services.commit_processor import HEX_SHA_RE
+from app.services.payload_store import encode_payload
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+LEGACY_COMMIT_EVENTS = "commit_events_legacy"
+COPY_CHUNK_SIZE = 1000
+
+
+def pending_upgrades(engine: Engine) -> List[str]:
+    """What `upgrade` would change (empty when the schema is current); used for startup warnings."""
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    pending = []
+    if _commit_events_is_legacy(inspector, existing):
+        pending.append("rebuild commit_events")
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        pending += [f"add {table.name}.{c.name}" for c in table.columns if c.name not in columns]
+    return pending
+
+
+def upgrade(engine: Engine) -> Dict[str, Any]:
+    """Upgrade the schema (and commit_events rows) in one transaction; returns what was done."""
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    report: Dict[str, Any] = {"columns": [], "indexes": [], "commit_events": None}
+    rebuild = _commit_events_is_legacy(inspector, existing)
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name in existing and not (rebuild and table.name == CommitEvent.__tablename__):
+                report["columns"] += _add_missing_columns(conn, inspector, table)
+
+        if rebuild:
+            # Index names are schema-wide: free them before the new table is created
+            for index in inspector.get_indexes(CommitEvent.__tablename__):
+                conn.execute(text(f'DROP INDEX "{index["name"]}"'))
+            conn.execute(text(f'ALTER TABLE {CommitEvent.__tablename__} RENAME TO {LEGACY_COMMIT_EVENTS}'))
+
+        Base.metadata.create_all(bind=conn)  # new tables, including the rebuilt commit_events
+
+        if rebuild:
+            report["commit_events"] = _copy_legacy_commits(conn)
+            conn.execute(text(f"DROP TABLE {LEGACY_COMMIT_EVENTS}"))
+
+        report["indexes"] = _add_missing_indexes(conn)
+
+    logger.info("Database upgrade: %s", report)
+    return report
+
+
+def _commit_events_is_legacy(inspector: Any, existing: Set[str]) -> bool:
+    if CommitEvent.__tablename__ not in existing:
+        return False
+    columns = {c["name"]: c for c in inspector.get_columns(CommitEvent.__tablename__)}
+    return "data_raw" in columns or not isinstance(columns["commit_hash"]["type"], LargeBinary)
+
+
+def _add_missing_columns(conn: Connection, inspector: Any, table: Table) -> List[str]:
+    columns = {c["name"] for c in inspector.get_columns(table.name)}
+    added = []
+    for column in table.columns:
+        if column.name in columns:
+            continue
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"
+        default = column.default.arg if column.default is not None and column.default.is_scalar else None
+        if default is not None:
+            rendered = literal(default, column.type).compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+            ddl += f" DEFAULT {rendered}"
+        if not column.nullable and default is not None:
+            ddl += " NOT NULL"
+        conn.execute(text(ddl))
+        added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def _add_missing_indexes(conn: Connection) -> List[str]:
+    """Indexes and unique constraints of the models that existing tables lack.
+
+    A missing unique constraint is added as a unique index with the same name: ALTER TABLE cannot
+    add constraints on SQLite, and the index enforces the same rule (ON CONFLICT works with both).
+    """
+    inspector = inspect(conn)
+    added = []
+    for table in Base.metadata.sorted_tables:
+        names = {i["name"] for i in inspector.get_indexes(table.name)}
+        names |= {c["name"] for c in inspector.get_unique_constraints(table.name)}
+        for index in table.indexes:
+            if index.name not in names:
+                index.create(conn)
+                added.append(index.name)
+        for constraint in table.constraints:
+            if isinstance(constraint, UniqueConstraint) and constraint.name and constraint.name not in names:
+                # Plain DDL: an Index object built from the columns would attach itself to the model's table
+                columns = ", ".join(column.name for column in constraint.columns)
+                conn.execute(text(f"CREATE UNIQUE INDEX {constraint.name} ON {table.name} ({columns})"))
+                added.append(constraint.name)
+    return added
+
+
+def _copy_legacy_commits(conn: Connection) -> Dict[str, int]:
+    """Copy legacy rows into commit_events: binary hashes, parsed type, payload moved to commit_payloads.
+
+    Rows whose hash is not a 40-char hex SHA (test data) cannot be stored and are dropped, as are
+    repeated (project, hash) pairs, which the new unique constraint forbids; both are counted.
+    """
+    legacy = Table(LEGACY_COMMIT_EVENTS, MetaData(), autoload_with=conn)
+    parsers = {
+        project_id: get_commit_parser(json.dumps(rules, sort_keys=True) if rules else None)
+        for project_id, rules in conn.execute(select(Project.id, Project.commit_rules))
+    }
+    counts = {"copied": 0, "invalid_hash": 0, "duplicate": 0}
+    seen: Set[Tuple[int, str]] = set()
+    stored_payloads: Set[bytes] = set()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(legacy).where(legacy.c.id > last_id).order_by(legacy.c.id).limit(COPY_CHUNK_SIZE)
+        ).mappings().all()
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+        events, payloads = [], []
+        for row in rows:
+            commit_hash = (row["commit_hash"] or "")[:40].lower()
+            if not HEX_SHA_RE.match(commit_hash):
+                logger.warning("Dropping commit %s with invalid hash %r", row["id"], row["commit_hash"])
+                counts["invalid_hash"] += 1
+                continue
+            if (row["project_id"], commit_hash) in seen:
+                counts["duplicate"] += 1
+                continue
+            seen.add((row["project_id"], commit_hash))
+
+            digest = None
+            if row.get("data_raw"):
+                digest, compressed, size = encode_payload(row["data_raw"])
+                if digest not in stored_payloads:
+                    stored_payloads.add(digest)
+                    payloads.append({"digest": digest, "data": compressed, "size": size})
+            parsed = parsers.get(row["project_id"], get_commit_parser(None)).parse(row["message"])
+            events.append({
+                "id": row["id"],
+                "project_id": row["project_id"],
+                "commit_hash": commit_hash,
+                "author": row["author"],
+                "message": row["message"],
+                "pushed_at": row["pushed_at"],
+                "branch": row["branch"],
+                "commit_type": parsed.type,
+                "commit_scope": parsed.scope,
+                "breaking": parsed.breaking,
+                "payload_digest": digest,
+                "created_at": row["created_at"],
+            })
+        if payloads:
+            conn.execute(insert(CommitPayload), payloads)
+        if events:
+            conn.execute(insert(CommitEvent), events)
+        counts["copied"] += len(events)
+
+    if conn.dialect.name == "postgresql":
+        # Ids were copied explicitly; move the sequence past them
+        conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('commit_events', 'id'), COALESCE(MAX(id), 1)) FROM commit_events"
+        ))
+    return counts
@@ -0,0 +1,14 @@
+"""
+Dialect-specific INSERT ... ON CONFLICT DO NOTHING
+"""
+from typing import List
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def insert_ignore(db: AsyncSession, model, index_elements: List[str]):
+    """INSERT for `model` that silently skips rows conflicting on `index_elements`."""
+    dialect = db.get_bind().dialect.name
+    insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+    return insert(model).on_conflict_do_nothing(index_elements=index_elements)
@@ -0,0 +1,150 @@
+"""
+Application-scoped pooled HTTP clients
+One keep-alive httpx.AsyncClient per upstream API, opened on startup and closed on shutdown
+"""
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.metrics import HTTP_CLIENT_CONNECTIONS, HTTP_CLIENT_IN_FLIGHT
+
+logger = get_logger(__name__)
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class SharedHttpClient:
+    """Long-lived httpx.AsyncClient with pool metrics.
+
+    Notes:
+    - `start()` / `aclose()` are called from the app startup/shutdown hooks (and the worker);
+      `client` also opens lazily so scripts and tests work without them.
+    - A client is bound to the event loop it was first used on; call `aclose()` before
+      switching loops.
+    - HTTP/2 is used only when requested and the `h2` package is installed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 60.0,
+        http2: bool = False,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2 and HTTP2_AVAILABLE
+        if http2 and not HTTP2_AVAILABLE:
+            logger.info("HTTP/2 requested for %s client but h2 is not installed, using HTTP/1.1 keep-alive", name)
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._requests = 0
+        self._connections_opened = 0
+        self._in_flight = HTTP_CLIENT_IN_FLIGHT.labels(name)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                transport=self.transport,
+                event_hooks={"request": [self._on_request]},
+            )
+        return self._client
+
+    async def start(self) -> None:
+        _ = self.client  # open now rather than on the first request
+        logger.info("HTTP client '%s' ready (%s, http2=%s)", self.name, self.base_url, self.http2)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        with self._in_flight.track_inprogress():
+            return await self.client.post(url, **kwargs)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        with self._in_flight.track_inprogress():
+            return await self.client.get(url, **kwargs)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Request/connection counters; connections_opened much lower than requests means reuse works."""
+        open_connections = idle_connections = None
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        if pool is not None:
+            # httpcore internals, best effort
+            connections = list(getattr(pool, "connections", []))
+            open_connections = len(connections)
+            idle_connections = sum(1 for c in connections if c.is_idle())
+        return {
+            "name": self.name,
+            "base_url": self.base_url,
+            "http2": self.http2,
+            "requests": self._requests,
+            "connections_opened": self._connections_opened,
+            "open_connections": open_connections,
+            "idle_connections": idle_connections,
+        }
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        self._requests += 1
+        request.extensions["trace"] = self._trace
+        stats = self.metrics()
+        if stats["open_connections"] is not None:
+            HTTP_CLIENT_CONNECTIONS.labels(self.name, "open").set(stats["open_connections"])
+            HTTP_CLIENT_CONNECTIONS.labels(self.name, "idle").set(stats["idle_connections"])
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self._connections_opened += 1
+
+
+telegram_http = SharedHttpClient(
+    "telegram",
+    base_url=settings.TELEGRAM_API_BASE,
+    max_connections=settings.TELEGRAM_MAX_CONNECTIONS,
+    http2=settings.TELEGRAM_HTTP2,
+)
+
+openai_http = SharedHttpClient(
+    "openai",
+    base_url=settings.OPENAI_API_BASE,
+    timeout=settings.OPENAI_TIMEOUT_SEC,
+    max_connections=settings.OPENAI_MAX_CONCURRENCY,
+    max_keepalive=settings.OPENAI_MAX_CONCURRENCY,
+    http2=True,
+)
+
+shared_clients: List[SharedHttpClient] = [telegram_http, openai_http]
+
+
+async def start_shared_clients() -> None:
+    for shared in shared_clients:
+        await shared.start()
+
+
+async def close_shared_clients() -> None:
+    for shared in shared_clients:
+        await shared.aclose()
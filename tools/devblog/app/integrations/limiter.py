@@ -0,0 +1,94 @@
+"""
+Client-side concurrency and rate control for upstream APIs
+"""
+import time
+import asyncio
+from typing import Any, Callable, Dict
+
+
+class AIMDLimiter:
+    """Adaptive concurrency limit (additive increase, multiplicative decrease).
+
+    Notes:
+    - Every successful call grows the limit by `increase / limit`, i.e. about +`increase`
+      per full window of calls; every push back from the provider (429, overload 5xx,
+      timeout) multiplies it by `decrease`. The limit stays within [min_limit, max_limit].
+    - Callers hold a slot for the duration of one HTTP attempt only, never while sleeping
+      before a retry.
+    - Bound to the event loop it is first used on (asyncio.Condition).
+    """
+
+    def __init__(self, initial: float, min_limit: float = 1, max_limit: float = 32,
+                 increase: float = 1.0, decrease: float = 0.5):
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max(max_limit, min_limit))
+        self.limit = min(self.max_limit, max(self.min_limit, float(initial)))
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self.throttled = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self) -> "AIMDLimiter":
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self) -> None:
+        self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+    def on_throttle(self) -> None:
+        self.throttled += 1
+        self.limit = max(self.min_limit, self.limit * self.decrease)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "throttled": self.throttled,
+        }
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate_per_sec`, holding at most `capacity` tokens.
+
+    `wait_time()` tells how long until a token can be taken, so callers sleep exactly that long
+    instead of being rejected; `pause()` applies a server-imposed cool-down (e.g. retry_after).
+    """
+
+    def __init__(self, rate_per_sec: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate_per_sec = rate_per_sec
+        self.capacity = max(1.0, float(capacity))
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated_at = clock()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        # No refill while paused, so a cool-down is not followed by a full burst
+        elapsed = now - max(self.updated_at, self.paused_until)
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate_per_sec)
+        self.updated_at = now
+
+    def wait_time(self) -> float:
+        now = self.clock()
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate_per_sec
+        return max(wait, self.paused_until - now)
+
+    def take(self) -> None:
+        self._refill(self.clock())
+        self.tokens -= 1.0
+
+    def pause(self, seconds: float) -> None:
+        now = self.clock()
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+        self.paused_until = max(self.paused_until, now + seconds)
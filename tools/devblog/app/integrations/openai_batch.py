@@ -0,0 +1,187 @@
+"""
+Batch generation through the OpenAI Batch API
+Many Responses API requests go out as one JSONL file and come back as one output file
+"""
+import json
+import time
+import uuid
+import asyncio
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.integrations.http_client import SharedHttpClient, openai_http
+from app.integrations.openai_service import OpenAIService
+
+logger = get_logger(__name__)
+
+RESPONSES_ENDPOINT = "/v1/responses"
+BATCH_PENDING_STATUS = {"validating", "in_progress", "finalizing", "cancelling"}
+
+
+class BatchRequest(NamedTuple):
+    custom_id: str
+    body: Dict[str, Any]  # Responses API request body, see OpenAIService.build_request
+
+
+def encode_batch_input(requests: List[BatchRequest]) -> bytes:
+    """Batch input file: one JSON request per line."""
+    lines = [
+        json.dumps({"custom_id": r.custom_id, "method": "POST", "url": RESPONSES_ENDPOINT, "body": r.body})
+        for r in requests
+    ]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def parse_batch_output(content: str) -> Dict[str, Optional[str]]:
+    """Output/error file -> {custom_id: post text, or None if that request failed}."""
+    results: Dict[str, Optional[str]] = {}
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            logger.warning("Skipping malformed batch output line: %s", line[:200])
+            continue
+        response = item.get("response") or {}
+        text = None
+        if not item.get("error") and response.get("status_code") == 200:
+            text = OpenAIService.extract_text(response.get("body") or {}) or None
+        results[item.get("custom_id", "")] = text
+    return results
+
+
+class BatchBackend(ABC):
+    """Submit a set of requests and collect the generated texts.
+
+    Subclasses implement `submit` and `collect`; `run` polls until the batch is done or
+    `max_wait_sec` runs out. Requests missing from the result (failed, expired, timed out)
+    map to None, so callers fall back per request.
+    """
+
+    @abstractmethod
+    async def submit(self, requests: List[BatchRequest]) -> str:
+        """Start a batch and return its id."""
+
+    @abstractmethod
+    async def collect(self, batch_id: str) -> Optional[Dict[str, Optional[str]]]:
+        """Results if the batch has finished, None while it is still running."""
+
+    async def cancel(self, batch_id: str) -> None:
+        pass
+
+    async def run(
+        self,
+        requests: List[BatchRequest],
+        max_wait_sec: float = settings.DIGEST_BATCH_MAX_WAIT_SEC,
+        poll_sec: float = settings.DIGEST_BATCH_POLL_SEC,
+    ) -> Dict[str, Optional[str]]:
+        if not requests:
+            return {}
+        batch_id = await self.submit(requests)
+        logger.info("Submitted batch %s with %s requests", batch_id, len(requests))
+        deadline = time.monotonic() + max_wait_sec
+        while True:
+            results = await self.collect(batch_id)
+            if results is not None:
+                break
+            if time.monotonic() >= deadline:
+                logger.warning("Batch %s not finished after %.0fs, cancelling", batch_id, max_wait_sec)
+                await self.cancel(batch_id)
+                results = {}
+                break
+            await asyncio.sleep(poll_sec)
+        return {r.custom_id: results.get(r.custom_id) for r in requests}
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API: upload the input file, create a batch, poll it, download the output."""
+
+    def __init__(self, http: Optional[SharedHttpClient] = None, api_key: Optional[str] = None):
+        self.http = http or openai_http
+        self.api_key = api_key or settings.OPENAI_API_KEY
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    async def submit(self, requests: List[BatchRequest]) -> str:
+        upload = await self.http.post(
+            "/files",
+            headers=self.headers,
+            data={"purpose": "batch"},
+            files={"file": ("digests.jsonl", encode_batch_input(requests), "application/jsonl")},
+        )
+        upload.raise_for_status()
+        batch = await self.http.post(
+            "/batches",
+            headers=self.headers,
+            json={
+                "input_file_id": upload.json()["id"],
+                "endpoint": RESPONSES_ENDPOINT,
+                "completion_window": "24h",
+            },
+        )
+        batch.raise_for_status()
+        return batch.json()["id"]
+
+    async def collect(self, batch_id: str) -> Optional[Dict[str, Optional[str]]]:
+        res = await self.http.get(f"/batches/{batch_id}", headers=self.headers)
+        res.raise_for_status()
+        batch = res.json()
+        if batch.get("status") in BATCH_PENDING_STATUS:
+            return None
+        if batch.get("status") != "completed":
+            logger.warning("Batch %s ended with status %s", batch_id, batch.get("status"))
+        # Expired or cancelled batches may still carry partial output
+        results: Dict[str, Optional[str]] = {}
+        for file_key in ("error_file_id", "output_file_id"):
+            if batch.get(file_key):
+                content = await self.http.get(f"/files/{batch[file_key]}/content", headers=self.headers)
+                content.raise_for_status()
+                results.update(parse_batch_output(content.text))
+        return results
+
+    async def cancel(self, batch_id: str) -> None:
+        try:
+            await self.http.post(f"/batches/{batch_id}/cancel", headers=self.headers)
+        except httpx.HTTPError as exc:
+            logger.warning("Could not cancel batch %s: %s", batch_id, exc)
+
+
+class LocalBatchBackend(BatchBackend):
+    """File-based stand-in for the Batch API (tests, offline runs).
+
+    `submit` writes `<id>.input.jsonl` to `directory`, answers every line with `respond(body)`
+    (an exception becomes a per-request error) and writes `<id>.output.jsonl` in the Batch API
+    output format, which `collect` then parses exactly like the real output file.
+    """
+
+    def __init__(self, directory: Path, respond: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        self.directory = Path(directory)
+        self.respond = respond
+
+    async def submit(self, requests: List[BatchRequest]) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{batch_id}.input.jsonl").write_bytes(encode_batch_input(requests))
+        lines = []
+        for r in requests:
+            try:
+                item = {"custom_id": r.custom_id, "response": {"status_code": 200, "body": self.respond(r.body)}, "error": None}
+            except Exception as exc:
+                item = {"custom_id": r.custom_id, "response": None, "error": {"message": str(exc)}}
+            lines.append(json.dumps(item))
+        (self.directory / f"{batch_id}.output.jsonl").write_text("\n".join(lines) + "\n")
+        return batch_id
+
+    async def collect(self, batch_id: str) -> Optional[Dict[str, Optional[str]]]:
+        output = self.directory / f"{batch_id}.output.jsonl"
+        if not output.exists():
+            return None
+        return parse_batch_output(output.read_text())
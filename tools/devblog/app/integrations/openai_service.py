@@ -1,96 +1,263 @@
 """
 OpenAI integration for generating post content using gpt-4o-mini
 """
-import requests
-from typing import List, Tuple, Optional
+import time
+import random
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Tuple, Optional
+
+import httpx
 
 from app.core.config import settings
-from app.models import CommitEvent, Project
+from app.models import CommitSnapshot, ProjectSnapshot
 from app.core.logger import get_logger
+from app.core.metrics import OPENAI_SECONDS, OPENAI_TOKENS, OPENAI_FAILURES, OPENAI_RETRIES, RATE_LIMIT_WAIT_SECONDS
+from app.integrations.http_client import SharedHttpClient, openai_http
+from app.integrations.limiter import AIMDLimiter
+from app.integrations.prompt_builder import PromptBuilder, estimate_tokens
+from app.core.commit_parser import get_commit_parser
 
 logger = get_logger(__name__)
 
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Statuses that mean "slow down" and shrink the concurrency limit (timeouts do too)
+PUSHBACK_STATUS = {429, 503}
+
+
+def parse_retry_after(headers: httpx.Headers) -> Optional[float]:
+    """Seconds to wait from `retry-after-ms` / `Retry-After` (delta seconds or HTTP date)."""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class OpenAIMetrics:
+    """Per-process counters of OpenAI calls (latency of recent successful attempts, token usage)"""
+
+    def __init__(self, window: int = 512):
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._latencies: "deque[float]" = deque(maxlen=window)
+
+    def observe(self, latency_sec: float, usage: Optional[Dict[str, Any]]) -> None:
+        self.calls += 1
+        self._latencies.append(latency_sec)
+        usage = usage or {}
+        # Responses API: input/output_tokens; Chat Completions: prompt/completion_tokens
+        self.input_tokens += int(usage.get("input_tokens", usage.get("prompt_tokens", 0)) or 0)
+        self.output_tokens += int(usage.get("output_tokens", usage.get("completion_tokens", 0)) or 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+
+        def pct(q: float) -> Optional[float]:
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3) if latencies else None
+
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "latency_p50_sec": pct(0.5),
+            "latency_p95_sec": pct(0.95),
+            "latency_max_sec": round(latencies[-1], 3) if latencies else None,
+        }
+
+
+openai_limiter = AIMDLimiter(
+    initial=settings.OPENAI_MAX_CONCURRENCY,
+    min_limit=settings.OPENAI_MIN_CONCURRENCY,
+    max_limit=settings.OPENAI_MAX_CONCURRENCY,
+)
+openai_metrics = OpenAIMetrics()
+
 
 class OpenAIService:
-    """Simple OpenAI wrapper using HTTP requests to Responses API.
+    """Simple OpenAI wrapper using async HTTP requests (httpx) to Responses API.
 
     This avoids hard dependency on openai package and keeps code explicit.
+    Calls share one pooled client (`openai_http`) and one AIMD limiter per process and are
+    retried on 429/5xx/timeouts with full-jitter backoff, honoring Retry-After.
     """
 
-    API_URL = "https://api.openai.com/v1/responses"
+    RESPONSES_PATH = "/responses"
 
-    def __init__(self, project: Project):
+    def __init__(
+        self,
+        project: ProjectSnapshot,
+        http: Optional[SharedHttpClient] = None,
+        limiter: Optional[AIMDLimiter] = None,
+        metrics: Optional[OpenAIMetrics] = None,
+    ):
         self.project = project
         self.api_key = settings.OPENAI_API_KEY
         self.model = getattr(settings, "OPENAI_MODEL", "gpt-4o-mini")
-        self.timeout = 20
-
-    def _build_prompt(self, commits: List[CommitEvent]) -> str:
-        # Compose a compact prompt describing commits for a short Telegram post.
-        lines = []
-        lines.append(f"Create a short Telegram post (max 250 tokens) in {self.project.language} for the project '{self.project.name}'.")
-        lines.append("Output should be a single message suitable for Telegram, include a short title, 2-6 bullet points summarizing commits, appropriate emoji, and 2-4 hashtags. Use HTML formatting for bold and italics where helpful.")
-        lines.append("Tone: concise, friendly, developer-focused. If commit messages are trivial, summarize them. Do not invent features.")
-        lines.append("---")
-        for c in commits:
-            when = c.pushed_at.isoformat() if getattr(c, "pushed_at", None) else ""
-            lines.append(f"- {c.commit_hash[:7]} | {c.author} | {when} | {c.message.splitlines()[0]}")
-
-        return "\n".join(lines)
-
-    def generate_post(self, commits: List[CommitEvent]) -> Tuple[bool, Optional[str]]:
-        if not self.api_key:
-            return False, "OpenAI API key not configured"
+        self.http = http or openai_http
+        self.limiter = limiter or openai_limiter
+        self.metrics = metrics or openai_metrics
+        self.max_retries = max(0, settings.OPENAI_MAX_RETRIES)
+        self.retry_base_sec = settings.OPENAI_RETRY_BASE_SEC
+        self.retry_max_sec = settings.OPENAI_RETRY_MAX_SEC
+        self.prompt_builder = PromptBuilder(parser=get_commit_parser(project.commit_rules))
 
-        prompt = self._build_prompt(commits)
-
-        payload = {
+    def build_request(self, commits: List[CommitSnapshot]) -> Dict[str, Any]:
+        """Responses API request body for a post about `commits` (also used for batch jobs)."""
+        prompt = self.prompt_builder.build(self.project.name, self.project.language, commits)
+        if prompt.stages:
+            logger.info(
+                "Prompt for project %s (%s commits) reduced from ~%s to ~%s tokens: %s",
+                self.project.id, len(commits), prompt.raw_tokens, prompt.tokens, ", ".join(prompt.stages),
+            )
+        return {
             "model": self.model,
-            "input": prompt,
+            "input": prompt.text,
             "max_output_tokens": 500,
             "temperature": 0.2,
         }
 
+    async def generate_post(self, commits: List[CommitSnapshot]) -> Tuple[bool, Optional[str]]:
+        if not self.api_key:
+            return False, "OpenAI API key not configured"
+
+        payload = self.build_request(commits)
+
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
 
+        started = time.monotonic()
         try:
-            resp = requests.post(self.API_URL, json=payload, headers=headers, timeout=self.timeout)
-            resp.raise_for_status()
-            data = resp.json()
-            # Responses API may return choices or output; try to extract text
-            # New API: data['output'] is list of dicts with 'content' or 'text'
-            text = None
-            if isinstance(data.get("output"), list) and data.get("output"):
-                parts = []
-                for item in data.get("output"):
-                    # item can be dict with 'content' which may be list/dict
-                    if isinstance(item, dict):
-                        if "content" in item:
-                            if isinstance(item["content"], list):
-                                for c in item["content"]:
-                                    if isinstance(c, dict) and c.get("text"):
-                                        parts.append(c.get("text"))
-                            elif isinstance(item["content"], str):
-                                parts.append(item["content"])
-                        elif item.get("text"):
-                            parts.append(item.get("text"))
-                    elif isinstance(item, str):
-                        parts.append(item)
-
-                text = "\n".join(parts).strip() if parts else None
-
-            # Fallback to top-level 'output_text' or choices
-            if not text:
-                text = data.get("output_text") or data.get("choices", [{}])[0].get("message", {}).get("content", "")
-
-            if not text:
-                return False, "OpenAI returned empty response"
-
-            return True, text
-
-        except requests.RequestException as exc:
-            logger.error(f"OpenAI request failed: {exc}")
+            data = await self._request(payload, headers)
+        except (httpx.HTTPError, ValueError) as exc:
+            self.metrics.failures += 1
+            OPENAI_FAILURES.labels(str(self.project.id)).inc()
+            logger.error("OpenAI request failed: %s", exc)
             return False, str(exc)
+
+        usage = data.get("usage") or {}
+        project_label = str(self.project.id)
+        OPENAI_TOKENS.labels(project_label, "input").inc(int(usage.get("input_tokens", usage.get("prompt_tokens", 0)) or 0))
+        OPENAI_TOKENS.labels(project_label, "output").inc(int(usage.get("output_tokens", usage.get("completion_tokens", 0)) or 0))
+        logger.info(
+            "OpenAI post for project %s: %s commits, ~%s prompt tokens estimated, %s billed, %.2fs",
+            self.project.id,
+            len(commits),
+            estimate_tokens(payload["input"]),
+            usage.get("input_tokens", usage.get("prompt_tokens", "?")),
+            time.monotonic() - started,
+        )
+
+        text = self.extract_text(data)
+        if not text:
+            return False, "OpenAI returned empty response"
+
+        return True, text
+
+    async def _request(self, payload: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+        """POST to the Responses API, retrying 429/5xx/transport errors. Raises the last error."""
+        attempt = 0
+        while True:
+            response: Optional[httpx.Response] = None
+            error: Optional[httpx.TransportError] = None
+            # A slot is held for one attempt only, never while sleeping before a retry
+            queued = time.monotonic()
+            async with self.limiter:
+                started = time.monotonic()
+                RATE_LIMIT_WAIT_SECONDS.labels("openai").observe(started - queued)
+                try:
+                    response = await self.http.post(self.RESPONSES_PATH, json=payload, headers=headers)
+                except httpx.TransportError as exc:
+                    error = exc
+                latency = time.monotonic() - started
+                OPENAI_SECONDS.labels(
+                    str(self.project.id), type(error).__name__ if error is not None else str(response.status_code)
+                ).observe(latency)
+                if error is not None or response.status_code in PUSHBACK_STATUS:
+                    self.limiter.on_throttle()
+                elif response.status_code < 400:
+                    self.limiter.on_success()
+
+            if response is not None and response.status_code not in RETRYABLE_STATUS:
+                response.raise_for_status()  # other 4xx are not retryable
+                data = response.json()
+                self.metrics.observe(latency, data.get("usage"))
+                logger.info(
+                    "OpenAI call for project %s: %.2fs, attempt %s, concurrency limit %.1f",
+                    self.project.id, latency, attempt + 1, self.limiter.limit,
+                )
+                return data
+
+            delay = self._retry_delay(attempt, response)
+            if attempt >= self.max_retries or delay is None:
+                if error is not None:
+                    raise error
+                response.raise_for_status()
+
+            reason = type(error).__name__ if error is not None else f"HTTP {response.status_code}"
+            logger.warning("OpenAI %s, retry %s/%s in %.1fs", reason, attempt + 1, self.max_retries, delay)
+            self.metrics.retries += 1
+            OPENAI_RETRIES.labels(reason).inc()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> Optional[float]:
+        """Retry-After if the provider sent one (None if it exceeds OPENAI_RETRY_MAX_SEC), else full jitter."""
+        retry_after = parse_retry_after(response.headers) if response is not None else None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.retry_max_sec else None
+        return random.uniform(0, min(self.retry_max_sec, self.retry_base_sec * (2 ** attempt)))
+
+    @staticmethod
+    def extract_text(data: Dict[str, Any]) -> Optional[str]:
+        # Responses API may return choices or output; try to extract text
+        # New API: data['output'] is list of dicts with 'content' or 'text'
+        text = None
+        if isinstance(data.get("output"), list) and data.get("output"):
+            parts = []
+            for item in data.get("output"):
+                # item can be dict with 'content' which may be list/dict
+                if isinstance(item, dict):
+                    if "content" in item:
+                        if isinstance(item["content"], list):
+                            for c in item["content"]:
+                                if isinstance(c, dict) and c.get("text"):
+                                    parts.append(c.get("text"))
+                        elif isinstance(item["content"], str):
+                            parts.append(item["content"])
+                    elif item.get("text"):
+                        parts.append(item.get("text"))
+                elif isinstance(item, str):
+                    parts.append(item)
+
+            text = "\n".join(parts).strip() if parts else None
+
+        # Fallback to top-level 'output_text' or choices
+        if not text:
+            text = data.get("output_text") or data.get("choices", [{}])[0].get("message", {}).get("content", "")
+
+        return text
@@ -0,0 +1,137 @@
+"""
+Prompt construction for post generation
+Static instructions first (byte-identical across calls, so provider prefix caching hits),
+then the project and its commits, shrunk to fit a token budget
+"""
+from collections import OrderedDict
+from typing import List, NamedTuple, Tuple
+
+from app.core.config import settings
+from app.models import CommitSnapshot
+from app.core.commit_parser import CommitParser, DEFAULT_PARSER
+
+STATIC_INSTRUCTIONS = "\n".join([
+    "You write a short Telegram post (max 250 tokens) announcing new commits of a software project.",
+    "Output should be a single message suitable for Telegram, include a short title, 2-6 bullet points summarizing commits, appropriate emoji, and 2-4 hashtags. Use HTML formatting for bold and italics where helpful.",
+    "Tone: concise, friendly, developer-focused. If commit messages are trivial, summarize them. Do not invent features.",
+    "Write in the language and about the project given below. Commits may be grouped by type and shortened; "
+    "a number in parentheses is how many commits a line stands for.",
+    "---",
+])
+
+TRUNCATE_STEPS = (120, 80, 50)
+ELLIPSIS = "…"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token); good enough for budgeting, no tokenizer needed."""
+    return (len(text) + 3) // 4
+
+
+class BuiltPrompt(NamedTuple):
+    text: str
+    tokens: int  # Estimated tokens of `text`
+    raw_tokens: int  # Estimated tokens before any reduction
+    stages: Tuple[str, ...]  # Reductions applied, in order
+
+
+class PromptBuilder:
+    """Builds the post prompt within `token_budget` estimated tokens.
+
+    Over budget, reductions are applied in order until the prompt fits:
+    dedupe identical subjects -> group by commit type (dropping hash/author/time) ->
+    truncate subjects -> keep only the first commits of each group -> drop trailing lines.
+    Only the commit block is reduced; the instructions and the project header are never cut.
+    Commit types come from `parser`, i.e. the project's commit rules.
+    """
+
+    def __init__(self, token_budget: int = settings.OPENAI_PROMPT_TOKEN_BUDGET, parser: CommitParser = DEFAULT_PARSER):
+        self.token_budget = token_budget
+        self.parser = parser
+
+    def build(self, project_name: str, language: str, commits: List[CommitSnapshot]) -> BuiltPrompt:
+        header = f"Project: {project_name}\nLanguage: {language}\nCommits ({len(commits)}):"
+        text = self._render(header, [self._full_line(c) for c in commits])
+        raw_tokens = estimate_tokens(text)
+        if raw_tokens <= self.token_budget:
+            return BuiltPrompt(text, raw_tokens, raw_tokens, ())
+
+        stages: List[str] = []
+        groups = self._group(commits)
+
+        stages.append("dedupe")
+        text = self._render(header, [
+            f"- {subject}{self._count(n)}" for items in groups.values() for subject, n in items.items()
+        ])
+        if estimate_tokens(text) <= self.token_budget:
+            return BuiltPrompt(text, estimate_tokens(text), raw_tokens, tuple(stages))
+
+        stages.append("group")
+        text = self._render(header, self._grouped_lines(groups))
+        for max_chars in TRUNCATE_STEPS:
+            if estimate_tokens(text) <= self.token_budget:
+                return BuiltPrompt(text, estimate_tokens(text), raw_tokens, tuple(stages))
+            stages.append(f"truncate:{max_chars}")
+            text = self._render(header, self._grouped_lines(groups, max_chars=max_chars))
+
+        per_group = max((len(items) for items in groups.values()), default=0)
+        while estimate_tokens(text) > self.token_budget and per_group > 1:
+            per_group //= 2
+            text = self._render(header, self._grouped_lines(groups, max_chars=TRUNCATE_STEPS[-1], per_group=per_group))
+        if per_group < max((len(items) for items in groups.values()), default=0):
+            stages.append(f"top:{per_group}")
+
+        if estimate_tokens(text) > self.token_budget:
+            # Only headers left over budget (many types): keep the lines that fit
+            stages.append("cut")
+            text = self._fit(header, self._grouped_lines(groups, max_chars=TRUNCATE_STEPS[-1], per_group=per_group))
+        return BuiltPrompt(text, estimate_tokens(text), raw_tokens, tuple(stages))
+
+    def _fit(self, header: str, lines: List[str]) -> str:
+        """Leading commit lines that fit the budget left after the instructions and header."""
+        room = self.token_budget * 4 - len(self._render(header, []))
+        marker = f"{ELLIPSIS} and {len(lines)} more lines"  # longest possible marker
+        used, kept = 0, 0
+        for line in lines:
+            if used + len(line) + 1 + len(marker) + 1 > room:
+                break
+            used += len(line) + 1
+            kept += 1
+        return self._render(header, [*lines[:kept], f"{ELLIPSIS} and {len(lines) - kept} more lines"])
+
+    @staticmethod
+    def _render(header: str, lines: List[str]) -> str:
+        return "\n".join([STATIC_INSTRUCTIONS, header, *lines])
+
+    @staticmethod
+    def _full_line(c: CommitSnapshot) -> str:
+        when = c.pushed_at.isoformat() if getattr(c, "pushed_at", None) else ""
+        first_line = c.message.splitlines()[0] if c.message else ""
+        return f"- {c.commit_hash[:7]} | {c.author} | {when} | {first_line}"
+
+    @staticmethod
+    def _count(n: int) -> str:
+        return f" ({n})" if n > 1 else ""
+
+    def _group(self, commits: List[CommitSnapshot]) -> "OrderedDict[str, OrderedDict[str, int]]":
+        """{commit type: {subject: count}} in first-seen order; subjects are whitespace-normalized."""
+        groups: "OrderedDict[str, OrderedDict[str, int]]" = OrderedDict()
+        for c in commits:
+            parsed = self.parser.parse(c.message)
+            commit_type, subject = parsed.type or "other", " ".join(parsed.subject.split())
+            items = groups.setdefault(commit_type, OrderedDict())
+            items[subject] = items.get(subject, 0) + 1
+        return groups
+
+    def _grouped_lines(self, groups, max_chars: int = 0, per_group: int = 0) -> List[str]:
+        lines = []
+        for commit_type, items in groups.items():
+            lines.append(f"{commit_type} ({sum(items.values())}):")
+            shown = list(items.items())[:per_group] if per_group else list(items.items())
+            for subject, n in shown:
+                if max_chars and len(subject) > max_chars:
+                    subject = subject[:max_chars - 1] + ELLIPSIS
+                lines.append(f"  - {subject}{self._count(n)}")
+            if len(shown) < len(items):
+                lines.append(f"  - {ELLIPSIS} and {len(items) - len(shown)} more")
+        return lines
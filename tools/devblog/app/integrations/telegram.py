@@ -1,78 +1,97 @@
 """
 Telegram Bot integration service
 """
-import requests
+import httpx
 import time
-from typing import Dict, Any, Optional
+import asyncio
+from typing import Dict, Any, List, Optional
 
-from app.models import Project
+from app.models import ProjectSnapshot
 from app.core.config import settings
 from app.core.logger import get_logger
+from app.core.metrics import TELEGRAM_SECONDS, TELEGRAM_THROTTLED, TELEGRAM_DROPPED, RATE_LIMIT_WAIT_SECONDS
+from app.core.timing import span, record
+from app.integrations.http_client import SharedHttpClient, telegram_http
+from app.integrations.limiter import TokenBucket
 
 logger = get_logger(__name__)
 
 
 class TelegramService:
-    """Telegram Bot API integration with simple in-memory rate limiting (token-bucket).
+    """Telegram Bot API integration with an in-memory send scheduler (token buckets).
 
     Notes:
-    - Limiter is per-chat_id and in-memory (single-process). For multi-process or multi-host
-      deployments use Redis or another central store.
-    - Configure `TELEGRAM_RATE_LIMIT_PER_MIN` in environment (0 disables limiter).
+    - Sends are delayed, not dropped: a message waits for a token of its chat bucket
+      (`TELEGRAM_RATE_LIMIT_PER_MIN`, burst `TELEGRAM_CHAT_BURST`) and of its bot bucket
+      (`TELEGRAM_GLOBAL_RATE_PER_SEC`), and a 429 `retry_after` pauses the chat and is retried.
+      Only a wait beyond `TELEGRAM_MAX_SEND_WAIT_SEC` gives up with an error.
+    - One sender per chat at a time; asyncio.Lock wakes waiters in FIFO order, so messages
+      to a chat leave in the order they were submitted.
+    - State is per process. For multi-process or multi-host deployments use Redis or another
+      central store. 0 disables the corresponding limit.
+    - Requests go through the application-wide keep-alive client (`telegram_http`), so the
+      service itself is cheap to construct per webhook.
     """
-    TELEGRAM_API_BASE = "https://api.telegram.org"
     SEND_MESSAGE_ENDPOINT = "/sendMessage"
+    EDIT_MESSAGE_ENDPOINT = "/editMessageText"
 
-    # In-memory token buckets: {chat_id: {tokens: float, last_refill: float}}
-    _buckets: Dict[str, Dict[str, float]] = {}
+    # Per-process scheduler state: {chat_id: TokenBucket}, {bot_token: TokenBucket}, {chat_id: Lock}
+    _buckets: Dict[str, TokenBucket] = {}
+    _bot_buckets: Dict[str, TokenBucket] = {}
+    _chat_locks: Dict[str, asyncio.Lock] = {}
     
-    def __init__(self, project: Project):
+    def __init__(self, project: ProjectSnapshot, http: Optional[SharedHttpClient] = None):
         self.project = project
+        self.http = http or telegram_http
         # Use project-specific token if available, otherwise use global
         self.bot_token = project.telegram_bot_token or settings.TELEGRAM_BOT_TOKEN
         self.chat_id = project.telegram_chat_id
         # rate limit per minute
         self.rate_per_min = max(0, int(settings.TELEGRAM_RATE_LIMIT_PER_MIN or 0))
+        self.global_rate_per_sec = max(0.0, float(settings.TELEGRAM_GLOBAL_RATE_PER_SEC or 0))
+        self.max_wait_sec = settings.TELEGRAM_MAX_SEND_WAIT_SEC
+
+    def _send_buckets(self) -> List[TokenBucket]:
+        """Buckets a message to this chat must take a token from (created on first use)."""
+        buckets = []
+        if self.rate_per_min > 0:
+            key = str(self.chat_id)
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(self.rate_per_min / 60.0, settings.TELEGRAM_CHAT_BURST)
+            buckets.append(self._buckets[key])
+        if self.global_rate_per_sec > 0:
+            key = str(self.bot_token)
+            if key not in self._bot_buckets:
+                self._bot_buckets[key] = TokenBucket(self.global_rate_per_sec, self.global_rate_per_sec)
+            buckets.append(self._bot_buckets[key])
+        return buckets
 
     def _allow_send(self) -> tuple[bool, Optional[float]]:
-        """Check and update token bucket for the chat.
+        """Take a token from the chat and bot buckets if both have one.
 
         Returns (allowed, retry_after_seconds)
         """
-        if self.rate_per_min <= 0:
-            return True, None
+        buckets = self._send_buckets()
+        wait = max((bucket.wait_time() for bucket in buckets), default=0.0)
+        if wait > 0:
+            return False, wait
+        for bucket in buckets:
+            bucket.take()
+        return True, None
 
-        now = time.time()
+    def _pause_chat(self, seconds: float) -> None:
         key = str(self.chat_id)
-        bucket = self._buckets.get(key)
-        # Refill rate per second
-        rate_per_sec = self.rate_per_min / 60.0
-        capacity = float(self.rate_per_min)
-
-        if not bucket:
-            # initialize with full capacity minus one token for immediate send
-            self._buckets[key] = {"tokens": capacity - 1.0, "last_refill": now}
-            return True, None
-
-        # refill tokens
-        elapsed = now - bucket["last_refill"]
-        refill = elapsed * rate_per_sec
-        tokens = min(capacity, bucket["tokens"] + refill)
-
-        if tokens >= 1.0:
-            bucket["tokens"] = tokens - 1.0
-            bucket["last_refill"] = now
-            self._buckets[key] = bucket
-            return True, None
-        else:
-            # compute retry-after in seconds
-            needed = 1.0 - tokens
-            retry_after = needed / rate_per_sec if rate_per_sec > 0 else None
-            return False, retry_after
-
-    def send_message(self, text: str, parse_mode: str = "HTML") -> Dict[str, Any]:
+        if key not in self._buckets:
+            # limiter disabled: still obey the server for this chat
+            self._buckets[key] = TokenBucket(1.0, 1.0)
+        self._buckets[key].pause(seconds)
+
+    def _chat_lock(self) -> asyncio.Lock:
+        return self._chat_locks.setdefault(str(self.chat_id), asyncio.Lock())
+
+    async def send_message(self, text: str, parse_mode: str = "HTML") -> Dict[str, Any]:
         """
-        Send message to Telegram
+        Send message to Telegram, waiting for rate limit capacity (in per-chat order)
         
         Returns:
             {
@@ -81,66 +100,119 @@ class TelegramService:
                 "error": Optional[str]
             }
         """
+        payload = {
+            "chat_id": self.chat_id,
+            "text": text,
+            "parse_mode": parse_mode,
+            "disable_web_page_preview": True,
+        }
+        return await self._call(self.SEND_MESSAGE_ENDPOINT, payload)
+
+    async def edit_message(self, message_id: str, text: str, parse_mode: str = "HTML") -> Dict[str, Any]:
+        """Replace the text of a message sent earlier (editMessageText); same scheduler and result as send_message."""
+        payload = {
+            "chat_id": self.chat_id,
+            "message_id": int(message_id),
+            "text": text,
+            "parse_mode": parse_mode,
+            "disable_web_page_preview": True,
+        }
+        return await self._call(self.EDIT_MESSAGE_ENDPOINT, payload)
+
+    async def _call(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Call a Bot API method that posts to the chat, waiting for rate limit capacity."""
         if not self.bot_token:
             error = "Telegram bot token not configured"
             logger.error(error)
+            TELEGRAM_DROPPED.labels(str(self.project.id), "no_token").inc()
             return {
                 "success": False,
                 "error": error
             }
 
-        # Rate limiting check
-        allowed, retry = self._allow_send()
-        if not allowed:
-            error = f"Rate limit exceeded. Retry after {int(retry)}s" if retry else "Rate limit exceeded"
-            logger.warning(error)
-            return {"success": False, "error": error}
-        
-        url = f"{self.TELEGRAM_API_BASE}/bot{self.bot_token}{self.SEND_MESSAGE_ENDPOINT}"
-        
-        payload = {
-            "chat_id": self.chat_id,
-            "text": text,
-            "parse_mode": parse_mode,
-            "disable_web_page_preview": True,
-        }
+        url = f"/bot{self.bot_token}{endpoint}"
         
+        deadline = time.monotonic() + self.max_wait_sec
+        async with self._chat_lock():
+            while True:
+                allowed, retry = self._allow_send()
+                if allowed:
+                    with span("telegram"):
+                        result = await self._post_message(url, payload)
+                    retry = result.pop("retry_after", None)
+                    if retry is None:
+                        if not result["success"]:
+                            TELEGRAM_DROPPED.labels(str(self.project.id), "error").inc()
+                        return result
+                    self._pause_chat(retry)
+                if time.monotonic() + retry > deadline:
+                    error = f"Rate limit exceeded. Retry after {int(retry)}s"
+                    logger.warning("%s (chat %s, gave up after %ss)", error, self.chat_id, self.max_wait_sec)
+                    TELEGRAM_DROPPED.labels(str(self.project.id), "rate_limit").inc()
+                    return {"success": False, "error": error}
+                logger.info("Telegram send to %s delayed %.2fs by rate limit", self.chat_id, retry)
+                RATE_LIMIT_WAIT_SECONDS.labels("telegram").observe(retry)
+                record("telegram_wait", retry)
+                await asyncio.sleep(retry)
+
+    async def _post_message(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Single sendMessage/editMessageText call. A 429 result carries `retry_after` (seconds) for the scheduler."""
         try:
-            logger.info(f"Sending message to Telegram for project {self.project.id}")
-            response = requests.post(url, json=payload, timeout=10)
+            method = url.rsplit('/', 1)[-1]
+            logger.info("Calling Telegram %s for project %s", method, self.project.id)
+            started = time.monotonic()
+            try:
+                response = await self.http.post(url, json=payload)
+            except httpx.HTTPError as exc:
+                TELEGRAM_SECONDS.labels(str(self.project.id), method, type(exc).__name__).observe(time.monotonic() - started)
+                raise
+            TELEGRAM_SECONDS.labels(str(self.project.id), method, str(response.status_code)).observe(time.monotonic() - started)
+            
+            if response.status_code == 429:
+                TELEGRAM_THROTTLED.labels(str(self.project.id)).inc()
+                data = response.json()
+                retry_after = (data.get("parameters") or {}).get("retry_after")
+                if retry_after is None:
+                    retry_after = response.headers.get("Retry-After", 1)
+                logger.warning("Telegram flood control for chat %s: retry after %ss", self.chat_id, retry_after)
+                return {
+                    "success": False,
+                    "error": data.get("description", "Too Many Requests"),
+                    "retry_after": float(retry_after),
+                }
             
             if response.status_code == 200:
                 data = response.json()
                 if data.get("ok"):
                     message_id = str(data.get("result", {}).get("message_id"))
-                    logger.info(f"Message sent successfully: {message_id}")
+                    logger.info("Message sent successfully: %s", message_id)
                     return {
                         "success": True,
                         "message_id": message_id,
                     }
                 else:
                     error = data.get("description", "Unknown Telegram error")
-                    logger.error(f"Telegram API error: {error}")
+                    logger.error("Telegram API error: %s", error)
                     return {
                         "success": False,
                         "error": error
                     }
             else:
                 error = f"HTTP {response.status_code}: {response.text}"
-                logger.error(f"Telegram request failed: {error}")
+                logger.error("Telegram request failed: %s", error)
                 return {
                     "success": False,
                     "error": error
                 }
         
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             error = "Telegram request timeout"
             logger.error(error)
             return {
                 "success": False,
                 "error": error
             }
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             error = f"Request error: {str(e)}"
             logger.error(error)
             return {
@@ -4,9 +4,16 @@ FastAPI application factory
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.db import Base, engine
+from app.db import Base, engine, async_engine
+from app.db.upgrade import pending_upgrades
+from app.integrations.http_client import start_shared_clients, close_shared_clients
 from app.api import api_router
-from app.core.logger import get_logger
+from app.services.hedged_posts import hedged_posts
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, mark_process_dead
+from app.core.timing import TimingMiddleware
+from app.core.profiler import ProfilingMiddleware
+from app.core.logger import get_logger, RequestContextMiddleware
 from app import __version__
 
 logger = get_logger(__name__)
@@ -18,6 +25,9 @@ def create_app() -> FastAPI:
     # Create tables
     Base.metadata.create_all(bind=engine)
     logger.info("Database tables created/verified")
+    pending = pending_upgrades(engine)
+    if pending:
+        logger.error("Database schema is outdated (%s): run scripts/upgrade_db.py", ", ".join(pending))
     
     app = FastAPI(
         title="Blackburn Tools",
@@ -34,16 +44,27 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    app.add_middleware(TimingMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(ProfilingMiddleware)
+    # Outermost: the request id is bound before anything else logs
+    app.add_middleware(RequestContextMiddleware)
+    
     # Include routers
     app.include_router(api_router)
     
     @app.on_event("startup")
     async def startup_event():
         logger.info("Application starting up...")
+        await start_shared_clients()
     
     @app.on_event("shutdown")
     async def shutdown_event():
         logger.info("Application shutting down...")
+        await hedged_posts.drain(settings.AI_HEDGE_DEADLINE_SEC)
+        await close_shared_clients()
+        await async_engine.dispose()
+        mark_process_dead()
     
     return app
 
@@ -1,6 +1,7 @@
 """
 Models module
 """
-from .models import Project, CommitEvent, Post
+from .models import Project, CommitEvent, CommitPayload, Post, WebhookJob, WebhookDelivery, DigestWatermark, AIPostCacheEntry, CacheVersion
+from .snapshots import ProjectSnapshot, CommitSnapshot
 
-__all__ = ["Project", "CommitEvent", "Post"]
+__all__ = ["Project", "CommitEvent", "CommitPayload", "Post", "WebhookJob", "WebhookDelivery", "DigestWatermark", "AIPostCacheEntry", "CacheVersion", "ProjectSnapshot", "CommitSnapshot"]
@@ -2,9 +2,10 @@
 SQLAlchemy models
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Index, UniqueConstraint, LargeBinary, Float
+from sqlalchemy.orm import relationship, deferred
 from app.db.base import Base
+from app.db.types import HexHash
 
 
 class Project(Base):
@@ -19,6 +20,8 @@ class Project(Base):
     language = Column(String(10), default="ru")  # "ru", "en"
     ai_enabled = Column(Boolean, default=False)
     post_mode = Column(String(50), default="per_push")  # "per_push", "daily_digest"
+    coalesce_window_sec = Column(Integer, default=0, nullable=False)  # 0 = post every push right away
+    commit_rules = Column(JSON, nullable=True)  # {"aliases": {"feature": "feat"}, "allowed_types": [...]}, see CommitParser
     telegram_chat_id = Column(String(255), nullable=False)
     telegram_bot_token = Column(String(255), nullable=True)  # if custom per-project
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -27,39 +30,146 @@ class Project(Base):
     # Relationships
     posts = relationship("Post", back_populates="project", cascade="all, delete-orphan")
     commit_events = relationship("CommitEvent", back_populates="project", cascade="all, delete-orphan")
+    webhook_jobs = relationship("WebhookJob", back_populates="project", cascade="all, delete-orphan")
+    deliveries = relationship("WebhookDelivery", back_populates="project", cascade="all, delete-orphan")
+    digest_watermark = relationship("DigestWatermark", uselist=False, cascade="all, delete-orphan")
 
 
 class CommitEvent(Base):
     """Commit event model - raw data from GitHub"""
     __tablename__ = "commit_events"
+    __table_args__ = (
+        UniqueConstraint("project_id", "commit_hash", name="uq_commit_events_project_hash"),
+        # Digest runs scan (project_id, id > watermark)
+        Index("ix_commit_events_project_id_id", "project_id", "id"),
+        Index("ix_commit_events_project_type", "project_id", "commit_type"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
-    commit_hash = Column(String(255), nullable=False, index=True)
+    commit_hash = Column(HexHash(20), nullable=False, index=True)  # 40-char hex SHA stored as 20 bytes
     author = Column(String(255), nullable=False)
     message = Column(Text, nullable=False)
     pushed_at = Column(DateTime, nullable=False)
     branch = Column(String(255), nullable=False)
-    data_raw = Column(JSON, nullable=True)  # Full GitHub webhook payload
+    # Parsed once on ingestion (Conventional Commits), so queries can filter by type in SQL
+    commit_type = Column(String(32), nullable=True)  # "feat", "fix", ...; None for free-form messages
+    commit_scope = Column(String(64), nullable=True)
+    breaking = Column(Boolean, default=False, nullable=False)
+    payload_digest = Column(LargeBinary(32), ForeignKey("commit_payloads.digest"), nullable=True)  # Raw commit JSON, see CommitPayload
+    post_id = Column(Integer, ForeignKey("posts.id"), nullable=True, index=True)  # Post that announced the commit
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     project = relationship("Project", back_populates="commit_events")
+    # Never loaded implicitly; use PayloadStore or an explicit loader option
+    payload = relationship("CommitPayload", lazy="raise_on_sql")
+
+
+class CommitPayload(Base):
+    """Raw commit payload - zlib-compressed canonical JSON, content-addressed by sha256"""
+    __tablename__ = "commit_payloads"
+    
+    digest = Column(LargeBinary(32), primary_key=True)
+    data = deferred(Column(LargeBinary, nullable=False))
+    size = Column(Integer, nullable=False)  # Uncompressed size in bytes
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 
 class Post(Base):
     """Published post model"""
     __tablename__ = "posts"
+    __table_args__ = (
+        UniqueConstraint("project_id", "content_hash", name="uq_posts_project_content_hash"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
     source = Column(String(50), default="github", nullable=False)  # "github"
+    kind = Column(String(20), default="push", nullable=False)  # "push" (per push or coalesced), "digest"
     content = Column(Text, nullable=False)  # The actual message sent
     content_md = Column(Text, nullable=True)  # Markdown version for website
-    status = Column(String(50), default="success")  # "success", "error"
+    status = Column(String(50), default="success")  # "pending", "success", "error"
     error_message = Column(Text, nullable=True)
     telegram_message_id = Column(String(255), nullable=True)  # For tracking in Telegram
+    content_hash = Column(String(64), nullable=True)  # sha256 of the announced commit hashes
+    edited_at = Column(DateTime, nullable=True)  # Template replaced with the AI text (hedged posts)
+    send_attempts = Column(Integer, default=1, nullable=False)  # Claims of this post, including take-overs
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     project = relationship("Project", back_populates="posts")
+
+
+class WebhookJob(Base):
+    """Queued webhook job - persisted by the webhook handler, drained by scripts/worker.py"""
+    __tablename__ = "webhook_jobs"
+    __table_args__ = (
+        Index("ix_webhook_jobs_status_available", "status", "available_at"),
+        Index("ix_webhook_jobs_project_status", "project_id", "status"),
+        Index("ix_webhook_jobs_status_finished", "status", "finished_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    kind = Column(String(50), default="push", nullable=False)  # "push"
+    payload = Column(JSON, nullable=False)  # {"branch": str, "commits": [...]}
+    status = Column(String(50), default="pending", nullable=False)  # "pending", "processing", "done", "failed"
+    attempts = Column(Integer, default=0, nullable=False)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # not leased before this time
+    locked_by = Column(String(255), nullable=True)  # worker id holding the lease
+    locked_until = Column(DateTime, nullable=True)  # lease expiry; expired leases are re-leased
+    last_error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    project = relationship("Project", back_populates="webhook_jobs")
+
+
+class WebhookDelivery(Base):
+    """GitHub delivery (X-GitHub-Delivery) already accepted - redeliveries return the stored response"""
+    __tablename__ = "webhook_deliveries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    delivery_id = Column(String(64), nullable=False, unique=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    job_id = Column(Integer, nullable=True)
+    response = Column(JSON, nullable=True)  # Body returned for the original delivery
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    
+    # Relationships
+    project = relationship("Project", back_populates="deliveries")
+
+
+class DigestWatermark(Base):
+    """Per-project digest progress: commits up to last_commit_id are covered by a digest"""
+    __tablename__ = "digest_watermarks"
+    
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    last_commit_id = Column(Integer, default=0, nullable=False)  # Highest CommitEvent.id digested
+    last_digest_at = Column(DateTime, nullable=True)  # When the last digest run finished
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class AIPostCacheEntry(Base):
+    """Persistent tier of the AI post cache - generated text keyed by a hash of the prompt inputs"""
+    __tablename__ = "ai_post_cache"
+    
+    key = Column(String(64), primary_key=True)  # sha256 hex, see AIPostCache.key_for
+    model = Column(String(100), nullable=False)
+    content = Column(Text, nullable=False)
+    generation_sec = Column(Float, nullable=False, default=0.0)  # What a hit saves
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class CacheVersion(Base):
+    """Shared version counter used to invalidate in-process caches across workers"""
+    __tablename__ = "cache_versions"
+    
+    name = Column(String(50), primary_key=True)  # "projects"
+    version = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
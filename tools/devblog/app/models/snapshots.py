@@ -0,0 +1,54 @@
+"""
+Immutable read-only views of models, safe to share across requests and threads
+"""
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, NamedTuple
+
+from .models import Project
+
+
+@dataclass(frozen=True)
+class ProjectSnapshot:
+    """Detached copy of the Project fields used on the webhook hot path"""
+    id: int
+    name: str
+    repo_full_name: str
+    github_webhook_secret: Optional[str]
+    language: str
+    ai_enabled: bool
+    post_mode: str
+    telegram_chat_id: str
+    telegram_bot_token: Optional[str]
+    coalesce_window_sec: int = 0
+    commit_rules: Optional[str] = None  # Canonical JSON of Project.commit_rules (hashable, see get_commit_parser)
+
+    @classmethod
+    def from_model(cls, project: Project) -> "ProjectSnapshot":
+        return cls(
+            id=project.id,
+            name=project.name,
+            repo_full_name=project.repo_full_name,
+            github_webhook_secret=project.github_webhook_secret,
+            language=project.language or "ru",
+            ai_enabled=bool(project.ai_enabled),
+            post_mode=project.post_mode or "per_push",
+            telegram_chat_id=project.telegram_chat_id,
+            telegram_bot_token=project.telegram_bot_token,
+            coalesce_window_sec=project.coalesce_window_sec or 0,
+            commit_rules=json.dumps(project.commit_rules, sort_keys=True) if project.commit_rules else None,
+        )
+
+
+class CommitSnapshot(NamedTuple):
+    """Plain values of a stored CommitEvent, as returned by the ingestion INSERT ... RETURNING"""
+    id: int
+    commit_hash: str
+    author: str
+    message: str
+    pushed_at: datetime
+    branch: str
+    commit_type: Optional[str] = None
+    commit_scope: Optional[str] = None
+    breaking: bool = False
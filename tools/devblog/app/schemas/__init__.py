@@ -13,6 +13,10 @@ from .schemas import (
     PostCreate,
     PostResponse,
     HealthResponse,
+    QueueStatsResponse,
+    HttpClientStatsResponse,
+    OpenAIStatsResponse,
+    AICacheStatsResponse,
     GitHubCommit,
     GitHubPushPayload,
 )
@@ -29,6 +33,10 @@ __all__ = [
     "PostCreate",
     "PostResponse",
     "HealthResponse",
+    "QueueStatsResponse",
+    "HttpClientStatsResponse",
+    "OpenAIStatsResponse",
+    "AICacheStatsResponse",
     "GitHubCommit",
     "GitHubPushPayload",
 ]
@@ -2,7 +2,7 @@
 Pydantic schemas for request/response validation
 """
 from datetime import datetime
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict
 from pydantic import BaseModel, Field
 
 
@@ -18,6 +18,8 @@ class ProjectBase(BaseModel):
     post_mode: str = "per_push"
     telegram_chat_id: str = Field(..., min_length=1, max_length=255)
     telegram_bot_token: Optional[str] = None
+    coalesce_window_sec: int = Field(0, ge=0)
+    commit_rules: Optional[Dict[str, Any]] = None
 
 
 class ProjectCreate(ProjectBase):
@@ -33,6 +35,8 @@ class ProjectUpdate(BaseModel):
     post_mode: Optional[str] = None
     telegram_chat_id: Optional[str] = None
     telegram_bot_token: Optional[str] = None
+    coalesce_window_sec: Optional[int] = Field(None, ge=0)
+    commit_rules: Optional[Dict[str, Any]] = None
 
 
 class ProjectResponse(ProjectBase):
@@ -53,7 +57,6 @@ class CommitEventBase(BaseModel):
     message: str
     pushed_at: datetime
     branch: str
-    data_raw: Optional[dict] = None
 
 
 class CommitEventCreate(CommitEventBase):
@@ -65,6 +68,9 @@ class CommitEventResponse(CommitEventBase):
     """Commit event response schema"""
     id: int
     project_id: int
+    commit_type: Optional[str] = None
+    commit_scope: Optional[str] = None
+    breaking: bool = False
     created_at: datetime
     
     class Config:
@@ -105,6 +111,55 @@ class HealthResponse(BaseModel):
     environment: str
 
 
+# Job queue stats response
+class QueueStatsResponse(BaseModel):
+    """Webhook job queue depth and wait time"""
+    pending: int
+    processing: int
+    failed: int
+    depth: int
+    oldest_wait_sec: float
+
+
+# Shared HTTP client pool stats
+class HttpClientStatsResponse(BaseModel):
+    """Counters of an application-scoped upstream HTTP client"""
+    name: str
+    base_url: str
+    http2: bool
+    requests: int
+    connections_opened: int
+    open_connections: Optional[int] = None
+    idle_connections: Optional[int] = None
+
+
+# OpenAI client stats
+class OpenAIStatsResponse(BaseModel):
+    """Adaptive concurrency limit, retries, latency and token usage of OpenAI calls"""
+    limit: float
+    in_flight: int
+    throttled: int
+    calls: int
+    failures: int
+    retries: int
+    input_tokens: int
+    output_tokens: int
+    latency_p50_sec: Optional[float] = None
+    latency_p95_sec: Optional[float] = None
+    latency_max_sec: Optional[float] = None
+
+
+class AICacheStatsResponse(BaseModel):
+    """Hit/miss counters of the AI post cache and OpenAI time saved by hits"""
+    size: int
+    memory_hits: int
+    db_hits: int
+    misses: int
+    coalesced: int
+    hit_rate: Optional[float] = None
+    saved_sec: float
+
+
 # GitHub Webhook payload (simplified)
 class GitHubCommit(BaseModel):
     """GitHub commit payload"""
@@ -3,5 +3,6 @@ Services module
 """
 from .commit_processor import CommitProcessor
 from .content_generator import ContentGenerator
+from .job_queue import JobQueue
 
-__all__ = ["CommitProcessor", "ContentGenerator"]
+__all__ = ["CommitProcessor", "ContentGenerator", "JobQueue"]
@@ -0,0 +1,195 @@
+"""
+Cache of AI-generated posts
+In-memory LRU in front of the `ai_post_cache` table, with TTL eviction and request coalescing
+"""
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+from app.db.upsert import insert_ignore
+from app.models import AIPostCacheEntry, CommitSnapshot
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class AIPostCache:
+    """Content-addressed cache of generated post texts.
+
+    Notes:
+    - The key hashes everything the prompt depends on (model, language, project name and the
+      normalized commit lines), so a redelivered push or the same commits pushed to another
+      branch reuse the earlier post instead of calling OpenAI again.
+    - Lookups go memory -> DB -> generate. Concurrent misses for the same key share one
+      in-flight generation (singleflight); waiters get its result, or None if it failed.
+    - Only successful generations are stored. The DB tier is best effort: its errors are
+      logged and treated as misses.
+    - The in-flight map is bound to the event loop it is first used on.
+    """
+
+    def __init__(
+        self,
+        ttl_sec: float = settings.AI_CACHE_TTL_SEC,
+        max_size: int = settings.AI_CACHE_MAX_SIZE,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.ttl_sec = ttl_sec
+        self.max_size = max_size
+        self.session_factory = session_factory
+        # {key: (expires_at monotonic, text, generation_sec)}
+        self._entries: "OrderedDict[str, Tuple[float, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, "asyncio.Future[Optional[str]]"] = {}
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_sec = 0.0
+
+    @staticmethod
+    def key_for(model: str, language: str, project_name: str, commits: List[CommitSnapshot]) -> str:
+        digest = hashlib.sha256()
+        for part in (model, language, project_name):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        for c in commits:
+            first_line = " ".join(c.message.splitlines()[0].split()) if c.message else ""
+            digest.update(f"{c.commit_hash[:7]}|{c.author}|{first_line}\n".encode())
+        return digest.hexdigest()
+
+    async def get_or_generate(
+        self,
+        key: str,
+        model: str,
+        generate: Callable[[], Awaitable[Optional[str]]],
+    ) -> Optional[str]:
+        """Cached text for `key`, or the result of `generate()` (stored if not empty)."""
+        text = self._get_local(key)
+        if text is not None:
+            return text
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        future: "asyncio.Future[Optional[str]]" = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            text = await self._load(key)
+            if text is None:
+                self.misses += 1
+                started = time.monotonic()
+                text = await generate()
+                if text:
+                    await self.put(key, model, text, time.monotonic() - started)
+            future.set_result(text)
+            return text
+        finally:
+            if not future.done():
+                future.set_result(None)  # generation raised; waiters fall back on their own
+            del self._in_flight[key]
+
+    async def get(self, key: str) -> Optional[str]:
+        """Cached text for `key` (memory, then DB); counts a miss if there is none."""
+        text = self._get_local(key)
+        if text is None:
+            text = await self._load(key)
+            if text is None:
+                self.misses += 1
+        return text
+
+    async def put(self, key: str, model: str, text: str, generation_sec: float) -> None:
+        """Store a generated text in both tiers."""
+        self._put_local(key, text, generation_sec, self.ttl_sec)
+        now = datetime.utcnow()
+        try:
+            async with self.session_factory() as db:
+                # Expired rows are purged on write; writes only follow an OpenAI call, so this is rare
+                await db.execute(delete(AIPostCacheEntry).where(AIPostCacheEntry.expires_at <= now))
+                await db.execute(
+                    insert_ignore(db, AIPostCacheEntry, ["key"]).values(
+                        key=key,
+                        model=model,
+                        content=text,
+                        generation_sec=generation_sec,
+                        created_at=now,
+                        expires_at=now + timedelta(seconds=self.ttl_sec),
+                    )
+                )
+                await db.commit()
+        except Exception as exc:
+            logger.warning("AI cache write failed: %s", exc)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.db_hits
+        lookups = hits + self.misses
+        return {
+            "size": len(self._entries),
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "saved_sec": round(self.saved_sec, 3),
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _get_local(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, text, generation_sec = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+            self.saved_sec += generation_sec
+            return text
+
+    def _put_local(self, key: str, text: str, generation_sec: float, ttl_sec: float) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_sec, text, generation_sec)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def _load(self, key: str) -> Optional[str]:
+        now = datetime.utcnow()
+        try:
+            async with self.session_factory() as db:
+                row = (
+                    await db.execute(
+                        select(AIPostCacheEntry.content, AIPostCacheEntry.generation_sec, AIPostCacheEntry.expires_at)
+                        .where(AIPostCacheEntry.key == key, AIPostCacheEntry.expires_at > now)
+                    )
+                ).first()
+        except Exception as exc:
+            logger.warning("AI cache lookup failed: %s", exc)
+            return None
+        if row is None:
+            return None
+        content, generation_sec, expires_at = row
+        self.db_hits += 1
+        self.saved_sec += generation_sec
+        self._put_local(key, content, generation_sec, min(self.ttl_sec, (expires_at - now).total_seconds()))
+        return content
+
+
+ai_post_cache = AIPostCache()
@@ -2,155 +2,599 @@
 Commit processing service
 Filters, validates and prepares commits for publishing
 """
-from typing import List, Dict, Any
-from datetime import datetime
-from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+import hashlib
 import re
 
-from app.models import Project, CommitEvent, Post
+from app.db.upsert import insert_ignore
+from app.models import ProjectSnapshot, CommitSnapshot, CommitEvent, Post, DigestWatermark
 from app.core.logger import get_logger
+from app.core.config import settings
 from app.integrations.telegram import TelegramService
 from app.services.content_generator import ContentGenerator
+from app.services.seen_commits import seen_commits
+from app.services.payload_store import PayloadStore
+from app.services.job_queue import JobQueue
+from app.core.commit_parser import get_commit_parser
+from app.core.commit_filter import get_commit_filter
+from app.core.timing import span
+from app.services.hedged_posts import hedged_posts
 
 logger = get_logger(__name__)
 
+HEX_SHA_RE = re.compile(r"^[0-9a-f]{40}$")
+
+
+def digest_stale_sec() -> float:
+    """How long a claimed digest may stay unsent: batch digests wait for their batch job."""
+    return max(settings.WORKER_LEASE_SEC, settings.DIGEST_BATCH_MAX_WAIT_SEC + settings.DIGEST_BATCH_POLL_SEC)
+
 
 class CommitProcessor:
     """Process GitHub webhook commits and send to Telegram"""
     
-    def __init__(self, db: Session, project: Project):
+    def __init__(self, db: AsyncSession, project: ProjectSnapshot):
         self.db = db
         self.project = project
         self.telegram = TelegramService(project)
         self.generator = ContentGenerator(project)
+        self.parser = get_commit_parser(project.commit_rules)
+        self.rules = get_commit_filter(project.commit_rules)
     
-    def process_webhook_commits(
+    async def process_webhook_commits(
         self,
         commits: List[Dict[str, Any]],
-        branch: str
+        branch: str,
+        coalesce: bool = False,
     ) -> Dict[str, Any]:
         """
         Process webhook commits:
-        1. Save all commits to DB
-        2. Filter by branch and prefixes
-        3. Generate message
-        4. Send to Telegram
+        1. Drop pushes to ignored branches and commits rejected by the project's rules
+           (authors, messages, types) before anything is written
+        2. Save the rest to DB in chunks of COMMIT_CHUNK_SIZE (already known commits are skipped)
+        3. In daily_digest mode stop here (see `publish_digest`); with `coalesce` and a project
+           coalescing window hand them to the project's flush job (see `publish_coalesced`)
+        4. Generate message
+        5. Send to Telegram
+        Posts of already known commits that failed (or were left pending by a crashed worker) are
+        taken over and sent again, so a retried job or a redelivered push recovers them.
         """
         if not commits:
             return {"processed": 0, "message_sent": False}
+        if not self.rules.accepts_branch(branch):
+            logger.info("Ignoring %s commits pushed to branch %s of project %s", len(commits), branch, self.project.id)
+            return {"processed": 0, "ignored": len(commits), "message_sent": False}
+        received = len(commits)
+        commits = self.rules.select(commits)
         
-        # Save raw commits to DB
-        saved_commits = []
-        for commit_data in commits:
-            try:
-                # Parse timestamp robustly (GitHub may provide Z timezone)
-                ts = commit_data.get("timestamp") or datetime.utcnow().isoformat()
-                if isinstance(ts, str) and ts.endswith("Z"):
-                    ts = ts.replace("Z", "+00:00")
-                try:
-                    pushed_at = datetime.fromisoformat(ts)
-                except Exception:
-                    pushed_at = datetime.utcnow()
+        # Save raw commits to DB chunk by chunk, keeping only new ones.
+        # Chunks are flushed, not committed: commits and the post claim commit together,
+        # so a failed job leaves nothing behind and its retry sees the commits as new again.
+        saved_count = 0
+        duplicate_count = 0
+        filtered_commits: List[CommitSnapshot] = []
+        stored_hashes = []
+        chunk_size = max(1, settings.COMMIT_CHUNK_SIZE)
+        for start in range(0, len(commits), chunk_size):
+            with span("save"):
+                new_commits, chunk_hashes = await self._save_commits(commits[start:start + chunk_size], branch)
+            saved_count += len(new_commits)
+            duplicate_count += len(chunk_hashes) - len(new_commits)
+            stored_hashes.extend(chunk_hashes)
+            filtered_commits.extend(new_commits)
+        
+        if duplicate_count:
+            logger.info("Skipped %s already known commits for project %s", duplicate_count, self.project.id)
+        ignored = received - len(stored_hashes)
+        if ignored:
+            logger.info("Ignored %s commits rejected by the rules of project %s", ignored, self.project.id)
+        
+        counts = {"processed": saved_count, "duplicates": duplicate_count}
+        if ignored:
+            counts["ignored"] = ignored
+        
+        if not filtered_commits:
+            await self.db.commit()
+            seen_commits.add(self.project.id, stored_hashes)
+            logger.info("No new commits passed filters for project %s", self.project.id)
+            result = {**counts, "message_sent": False}
+        elif self.project.post_mode == "daily_digest":
+            await self.db.commit()
+            seen_commits.add(self.project.id, stored_hashes)
+            logger.info("Stored %s commits of project %s for the next digest", len(filtered_commits), self.project.id)
+            # Digest posts are recovered from the watermark, not by pushes
+            return {**counts, "filtered": len(filtered_commits), "message_sent": False, "digest": True}
+        else:
+            result = await self._publish_new(filtered_commits, stored_hashes, counts, coalesce)
+            if result.get("duplicate"):
+                return result
+        
+        if duplicate_count:
+            new_hashes = {c.commit_hash for c in filtered_commits}
+            known = [h for h in stored_hashes if h not in new_hashes]
+            retried = await self._retry_failed_posts(CommitEvent.commit_hash.in_(known))
+            if retried:
+                result = {**result, **retried, "message_sent": result["message_sent"] or retried["message_sent"]}
+        return result
+    
+    async def _publish_new(
+        self,
+        filtered_commits: List[CommitSnapshot],
+        stored_hashes: List[str],
+        counts: Dict[str, int],
+        coalesce: bool,
+    ) -> Dict[str, Any]:
+        """Hand new commits to the project's flush job, or announce them right away."""
+        if coalesce and self.project.coalesce_window_sec > 0:
+            # Debounce: the flush job is due `coalesce_window_sec` after the latest push
+            job = await JobQueue(self.db).schedule_flush(
+                self.project.id,
+                [c.id for c in filtered_commits],
+                self.project.coalesce_window_sec,
+                settings.COALESCE_MAX_DELAY_SEC,
+            )
+            await self.db.commit()
+            seen_commits.add(self.project.id, stored_hashes)
+            logger.info(
+                "Coalesced %s commits of project %s into flush job %s", len(filtered_commits), self.project.id, job.id
+            )
+            return {**counts, "filtered": len(filtered_commits), "message_sent": False, "coalesced_into": job.id}
+        
+        result = await self._publish(filtered_commits, stored_hashes)
+        if result.get("duplicate"):
+            return result
+        return {**counts, **result}
+    
+    async def _retry_failed_posts(self, commit_condition: Any) -> Dict[str, Any]:
+        """
+        Take over and deliver again the posts of the matching commits that failed or stayed
+        pending past the worker lease. Returns {} when there was nothing to retry.
+        Posts of commits stored more than POST_RETRY_MAX_AGE_SEC ago are not resent (a force-push
+        or a late redelivery must not publish stale news), nor are posts out of send attempts.
+        """
+        fresh_since = datetime.utcnow() - timedelta(seconds=settings.POST_RETRY_MAX_AGE_SEC)
+        post_ids = (
+            await self.db.scalars(
+                select(Post.id)
+                .join(CommitEvent, CommitEvent.post_id == Post.id)
+                .where(
+                    CommitEvent.project_id == self.project.id,
+                    Post.kind == "push",  # digest posts are recovered by `claim_digest`
+                    commit_condition,
+                    CommitEvent.created_at >= fresh_since,
+                    self._retryable(),
+                )
+                .distinct()
+                .order_by(Post.id)
+            )
+        ).all()
+        if not post_ids:
+            return {}
+        
+        sent, errors = 0, []
+        for post_id in post_ids:
+            if not await self._take_over_post(post_id):
+                continue
+            logger.info("Retrying post %s of project %s", post_id, self.project.id)
+            delivered = await self.deliver_post(post_id, await self._post_commits(post_id))
+            sent += delivered["message_sent"]
+            if delivered.get("error"):
+                errors.append(delivered["error"])
+        result: Dict[str, Any] = {"retried": len(post_ids), "message_sent": sent > 0}
+        if errors:
+            result["error"] = errors[0]
+        return result
+    
+    @staticmethod
+    def _retryable(stale_sec: Optional[float] = None) -> Any:
+        """Posts whose send failed or whose claimer crashed (created_at doubles as claim time),
+        with send attempts left; a post out of attempts stays in "error" for good."""
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.WORKER_LEASE_SEC if stale_sec is None else stale_sec)
+        return and_(
+            or_(Post.status == "error", and_(Post.status == "pending", Post.created_at < stale_before)),
+            Post.send_attempts < settings.POST_MAX_SEND_ATTEMPTS,
+        )
+    
+    async def _take_over_post(self, post_id: int, stale_sec: Optional[float] = None) -> bool:
+        """Conditionally re-claim a failed or stale post; only one run wins. Committed."""
+        result = await self.db.execute(
+            update(Post)
+            .where(Post.id == post_id, self._retryable(stale_sec))
+            .values(
+                status="pending", created_at=datetime.utcnow(), error_message=None, send_attempts=Post.send_attempts + 1
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return result.rowcount == 1
+    
+    async def publish_coalesced(self, commit_ids: List[int]) -> Dict[str, Any]:
+        """Announce commits collected by a flush job in one post (commits already announced are skipped)."""
+        rows = await self.db.execute(
+            select(*(getattr(CommitEvent, name) for name in CommitSnapshot._fields))
+            .where(
+                CommitEvent.project_id == self.project.id,
+                CommitEvent.id.in_(commit_ids),
+                CommitEvent.post_id.is_(None),
+            )
+            .order_by(CommitEvent.id)
+        )
+        pending = [CommitSnapshot(*row) for row in rows]
+        if not pending:
+            # A retried flush job: its post was claimed but not sent
+            retried = await self._retry_failed_posts(CommitEvent.id.in_(commit_ids))
+            return {"coalesced": len(commit_ids), "message_sent": False, **retried}
+        logger.info("Publishing %s coalesced commits for project %s", len(pending), self.project.id)
+        return {"coalesced": len(commit_ids), **await self._publish(pending)}
+    
+    async def publish_digest(self) -> Dict[str, Any]:
+        """
+        Post one digest of the commits stored since the project's watermark.
+
+        Reads only rows past the watermark (index range scan on (project_id, id)) and moves the
+        watermark in the same transaction that claims the post, with a compare-and-set on its
+        old value: of two concurrent runs only one gets to post. The period restarts
+        (last_digest_at) only after the send was attempted: a run that crashed after claiming
+        leaves the project due and its pending post is taken over (see `claim_digest`).
+        """
+        result, post_id, commits = await self.claim_digest()
+        if post_id is None:
+            return result
+        return {**result, **await self.deliver_digest(post_id, commits)}
+    
+    async def claim_digest(self) -> Tuple[Dict[str, Any], Optional[int], List[CommitSnapshot]]:
+        """
+        First half of `publish_digest`: claim the digest post and move the watermark.
+        Returns (result, post_id, commits); post_id is None if there is nothing to post.
+        The post is then delivered with `deliver_digest` (batch digests generate the texts in between).
 
-                commit_event = CommitEvent(
-                    project_id=self.project.id,
-                    commit_hash=commit_data.get("id", "")[:40],
-                    author=commit_data.get("author", {}).get("name", "Unknown"),
-                    message=commit_data.get("message", ""),
-                    pushed_at=pushed_at,
-                    branch=branch,
-                    data_raw=commit_data,
+        A digest post left unsent (failed, or pending past `digest_stale_sec()` after a crash) is
+        taken over and returned first; one still pending within that time means another run
+        is delivering it, and nothing new is claimed meanwhile. A digest post out of send attempts
+        (POST_MAX_SEND_ATTEMPTS) stays in "error" and no longer holds back the next digests.
+        """
+        await self.db.execute(
+            insert_ignore(self.db, DigestWatermark, ["project_id"]).values(project_id=self.project.id, last_commit_id=0)
+        )
+        unsent_id = await self.db.scalar(
+            select(Post.id)
+            .where(
+                Post.project_id == self.project.id,
+                Post.kind == "digest",
+                Post.status.in_(("pending", "error")),
+                Post.send_attempts < settings.POST_MAX_SEND_ATTEMPTS,
+            )
+            .order_by(Post.id)
+            .limit(1)
+        )
+        if unsent_id is not None:
+            if not await self._take_over_post(unsent_id, digest_stale_sec()):
+                logger.info(
+                    "Digest post %s of project %s is being delivered by another run", unsent_id, self.project.id
                 )
-                self.db.add(commit_event)
-                saved_commits.append(commit_event)
-            except Exception as e:
-                logger.error(f"Error saving commit: {e}")
+                return {"digested": 0, "message_sent": False, "in_progress": unsent_id}, None, []
+            commits = await self._post_commits(unsent_id)
+            logger.info("Took over unsent digest post %s of project %s", unsent_id, self.project.id)
+            return {"digested": len(commits), "recovered": unsent_id}, unsent_id, commits
         
-        self.db.commit()
+        last_commit_id = await self.db.scalar(
+            select(DigestWatermark.last_commit_id).where(DigestWatermark.project_id == self.project.id)
+        )
+        rows = (
+            await self.db.execute(
+                select(CommitEvent.created_at, *(getattr(CommitEvent, name) for name in CommitSnapshot._fields))
+                .where(
+                    CommitEvent.project_id == self.project.id,
+                    CommitEvent.id > last_commit_id,
+                    CommitEvent.post_id.is_(None),
+                )
+                .order_by(CommitEvent.id)
+                .limit(max(1, settings.DIGEST_MAX_COMMITS))
+            )
+        ).all()
+        pending = [CommitSnapshot(*row[1:]) for row in rows]
+        # Ids are allocated before commit, so a lower id may become visible after a higher one.
+        # The watermark only passes commits older than DIGEST_WATERMARK_LAG_SEC (any earlier insert
+        # has committed by then); newer ones are rescanned, and skipped once linked to a post.
+        settled_before = datetime.utcnow() - timedelta(seconds=settings.DIGEST_WATERMARK_LAG_SEC)
+        settled = [row[1] for row in rows if row[0] is not None and row[0] <= settled_before]
+        watermark = (last_commit_id, settled[-1] if settled else last_commit_id)
+        filtered = self._filter_commits(pending)
         
-        # Filter commits by rules
-        filtered_commits = self._filter_commits(saved_commits)
+        if not filtered:
+            # Nothing to announce: just record the run (and skip past filtered-out commits)
+            await self._advance_watermark(*watermark)
+            await self._mark_digested()
+            await self.db.commit()
+            return {"digested": len(pending), "message_sent": False}, None, []
         
-        if not filtered_commits:
-            logger.info(f"No commits passed filters for project {self.project.id}")
-            return {"processed": len(saved_commits), "message_sent": False}
+        post_id = await self._claim_post(
+            self._content_hash(filtered), [c.id for c in filtered], watermark, kind="digest"
+        )
+        if post_id is None:
+            logger.info("Digest for project %s already claimed by another run, skipping", self.project.id)
+            return {"digested": len(pending), "filtered": len(filtered), "message_sent": False, "duplicate": True}, None, []
         
+        logger.info(
+            "Claimed digest of %s commits for project %s (after commit %s)",
+            len(filtered), self.project.id, last_commit_id,
+        )
+        return {"digested": len(pending)}, post_id, filtered
+    
+    async def deliver_digest(
+        self,
+        post_id: int,
+        commits: List[CommitSnapshot],
+        message_text: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Deliver a claimed digest post and record the run; an unsent post is retried next period."""
+        delivered = await self.deliver_post(post_id, commits, message_text)
+        await self._mark_digested()
+        await self.db.commit()
+        if delivered.get("error"):
+            attempts = await self.db.scalar(select(Post.send_attempts).where(Post.id == post_id))
+            if attempts >= settings.POST_MAX_SEND_ATTEMPTS:
+                logger.warning(
+                    "Giving up on digest post %s of project %s after %s attempts", post_id, self.project.id, attempts
+                )
+        return delivered
+    
+    async def _advance_watermark(self, old_commit_id: int, new_commit_id: int) -> bool:
+        """Compare-and-set the digest watermark (not committed). False if another run moved it."""
+        result = await self.db.execute(
+            update(DigestWatermark)
+            .where(
+                DigestWatermark.project_id == self.project.id,
+                DigestWatermark.last_commit_id == old_commit_id,
+            )
+            .values(last_commit_id=new_commit_id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+    
+    async def _mark_digested(self) -> None:
+        """Start the next digest period now (not committed)."""
+        await self.db.execute(
+            update(DigestWatermark)
+            .where(DigestWatermark.project_id == self.project.id)
+            .values(last_digest_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+    
+    async def _post_commits(self, post_id: int) -> List[CommitSnapshot]:
+        rows = await self.db.execute(
+            select(*(getattr(CommitEvent, name) for name in CommitSnapshot._fields))
+            .where(CommitEvent.post_id == post_id)
+            .order_by(CommitEvent.id)
+        )
+        return [CommitSnapshot(*row) for row in rows]
+    
+    async def _publish(self, filtered_commits: List[CommitSnapshot], stored_hashes: List[str] = ()) -> Dict[str, Any]:
+        """Claim the post for these commits, generate it and send it to Telegram."""
+        # Claim the post for this commit set (commits the new commits too)
+        post_id = await self._claim_post(self._content_hash(filtered_commits), [c.id for c in filtered_commits])
+        if post_id is None:
+            logger.info("Post for these commits already exists for project %s, skipping", self.project.id)
+            return {
+                "processed": 0,
+                "filtered": len(filtered_commits),
+                "message_sent": False,
+                "duplicate": True,
+            }
+        seen_commits.add(self.project.id, stored_hashes)
+        return await self.deliver_post(post_id, filtered_commits)
+    
+    async def deliver_post(
+        self,
+        post_id: int,
+        filtered_commits: List[CommitSnapshot],
+        message_text: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generate (unless `message_text` is given) and send a claimed post, then store its final state.
+        With AI_HEDGED_POSTS an AI project gets the template first; the AI text replaces it later
+        (see HedgedPosts).
+        """
+        hedge = (
+            message_text is None
+            and self.project.ai_enabled
+            and settings.AI_HEDGED_POSTS
+            and bool(settings.OPENAI_API_KEY)
+        )
         # Generate content
-        message_text = self.generator.generate_from_commits(filtered_commits)
+        with span("generate"):
+            if hedge:
+                message_text = self.generator.generate_template(filtered_commits)
+            elif message_text is None:
+                message_text = await self.generator.generate_from_commits(filtered_commits)
         
         # Send to Telegram
         try:
-            telegram_result = self.telegram.send_message(message_text)
+            telegram_result = await self.telegram.send_message(message_text)
             
             # Save post to DB
-            post = Post(
-                project_id=self.project.id,
-                source="github",
+            await self._finish_post(
+                post_id,
                 content=message_text,
                 status="success" if telegram_result["success"] else "error",
                 error_message=telegram_result.get("error"),
                 telegram_message_id=telegram_result.get("message_id"),
             )
-            self.db.add(post)
-            self.db.commit()
+            if hedge and telegram_result["success"]:
+                hedged_posts.schedule(self.project, post_id, telegram_result["message_id"], filtered_commits)
             
-            return {
-                "processed": len(saved_commits),
+            result = {
                 "filtered": len(filtered_commits),
                 "message_sent": telegram_result["success"]
             }
+            if not telegram_result["success"]:
+                result["error"] = telegram_result.get("error") or "Telegram send failed"
+            return result
         except Exception as e:
-            logger.error(f"Error sending to Telegram: {e}")
+            logger.error("Error sending to Telegram: %s", e)
             
-            post = Post(
-                project_id=self.project.id,
-                source="github",
-                content=message_text,
-                status="error",
-                error_message=str(e),
-            )
-            self.db.add(post)
-            self.db.commit()
+            await self._finish_post(post_id, content=message_text, status="error", error_message=str(e))
             
             return {
-                "processed": len(saved_commits),
                 "filtered": len(filtered_commits),
                 "message_sent": False,
                 "error": str(e)
             }
     
-    def _filter_commits(self, commits: List[CommitEvent]) -> List[CommitEvent]:
+    @staticmethod
+    def _content_hash(commits: List[CommitSnapshot]) -> str:
+        """Hash of the commit set a post announces (order-independent)."""
+        digest = hashlib.sha256()
+        for commit_hash in sorted(c.commit_hash for c in commits):
+            digest.update(commit_hash.encode())
+            digest.update(b"\n")
+        return digest.hexdigest()
+    
+    async def _claim_post(
+        self,
+        content_hash: str,
+        commit_ids: List[int],
+        watermark: Optional[Tuple[int, int]] = None,
+        kind: str = "push",
+    ) -> Optional[int]:
         """
-        Filter commits by rules:
-        - Branch matching (if configured)
-        - Prefix matching (feat:, fix:, chore:, etc.)
+        Commit a pending Post for `content_hash` together with the pending commits (linked to it
+        via post_id) and, for digests, the moved watermark, relying on the (project_id, content_hash)
+        unique constraint. Returns the post id, or None (and rolls everything back) if another
+        delivery or digest run already owns it.
+        A post for the same content that failed, or stayed pending past the worker lease
+        (crashed worker), is taken over instead.
         """
-        filtered = []
-        
-        # Prefixes to include (configurable, default includes main types)
-        allowed_prefixes = [
-            "feat:", "feature:",
-            "fix:", "bugfix:",
-            "perf:", "performance:",
-            "docs:", "doc:",
-            "style:",
-            "refactor:",
-            "test:",
-            "chore:",
-        ]
+        post = Post(
+            project_id=self.project.id,
+            source="github",
+            content="",
+            status="pending",
+            kind=kind,
+            content_hash=content_hash,
+        )
+        self.db.add(post)
+        try:
+            await self.db.flush()
+            post_id = post.id
+            await self.db.execute(
+                update(CommitEvent)
+                .where(CommitEvent.id.in_(commit_ids))
+                .values(post_id=post_id)
+                .execution_options(synchronize_session=False)
+            )
+            if watermark is not None and not await self._advance_watermark(*watermark):
+                await self.db.rollback()
+                return None
+            await self.db.commit()
+            return post_id
+        except IntegrityError:
+            await self.db.rollback()
+            if watermark is not None:
+                return None  # another digest run claimed these commits
         
+        existing_id = await self.db.scalar(
+            select(Post.id).where(Post.project_id == self.project.id, Post.content_hash == content_hash)
+        )
+        if existing_id is None or not await self._take_over_post(existing_id):
+            return None
+        await self.db.execute(
+            update(CommitEvent)
+            .where(CommitEvent.id.in_(commit_ids))
+            .values(post_id=existing_id)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return existing_id
+    
+    async def _finish_post(self, post_id: int, **values: Any) -> None:
+        """Store the final post state with a single UPDATE (no reload of the expired row)."""
+        await self.db.execute(
+            update(Post).where(Post.id == post_id).values(**values).execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+    
+    async def _save_commits(self, commits: List[Dict[str, Any]], branch: str) -> Tuple[List[CommitSnapshot], List[str]]:
+        """
+        Upsert a chunk of commits with a single INSERT ... ON CONFLICT DO NOTHING RETURNING.
+        Returns (plain values of newly inserted commits, hashes of all commits in the chunk).
+        Nothing is loaded back as ORM objects, so later stages never trigger lazy reloads.
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        raw_payloads: Dict[str, Dict[str, Any]] = {}
+        for commit_data in commits:
+            commit_hash = (commit_data.get("id") or "")[:40].lower()
+            if not HEX_SHA_RE.match(commit_hash):
+                logger.warning(
+                    "Skipping commit %r of project %s: id is not a 40-char hex SHA", commit_data.get("id"), self.project.id
+                )
+                continue
+            if commit_hash in rows:
+                continue
+
+            # Parse timestamp robustly (GitHub may provide Z timezone)
+            ts = commit_data.get("timestamp") or datetime.utcnow().isoformat()
+            if isinstance(ts, str) and ts.endswith("Z"):
+                ts = ts.replace("Z", "+00:00")
+            try:
+                pushed_at = datetime.fromisoformat(ts)
+            except Exception:
+                pushed_at = datetime.utcnow()
+
+            message = commit_data.get("message", "")
+            parsed = self.parser.parse(message)
+            if not self.parser.is_announced(parsed.type, message):
+                logger.debug("Commit filtered out: %s - %s", commit_hash, message[:50])
+                continue
+            rows[commit_hash] = {
+                "project_id": self.project.id,
+                "commit_hash": commit_hash,
+                "author": (commit_data.get("author") or {}).get("name", "Unknown"),
+                "message": message,
+                "pushed_at": pushed_at,
+                "branch": branch,
+                "commit_type": parsed.type,
+                "commit_scope": parsed.scope,
+                "breaking": parsed.breaking,
+                "created_at": datetime.utcnow(),
+            }
+            raw_payloads[commit_hash] = commit_data
+
+        chunk_hashes = list(rows)
+        # Recently seen hashes are known to be stored - no need to send them to the DB
+        unseen = seen_commits.filter_unseen(self.project.id, chunk_hashes)
+        if not unseen:
+            return [], chunk_hashes
+
+        digests = await PayloadStore(self.db).put_many([raw_payloads[h] for h in unseen])
+        for commit_hash, digest in zip(unseen, digests):
+            rows[commit_hash]["payload_digest"] = digest
+
+        result = await self.db.execute(self._insert_ignoring_duplicates(), [rows[h] for h in unseen])
+        return [CommitSnapshot(*row) for row in result], chunk_hashes
+    
+    def _insert_ignoring_duplicates(self):
+        """INSERT that skips rows violating (project_id, commit_hash), returning plain values."""
+        return (
+            insert_ignore(self.db, CommitEvent, ["project_id", "commit_hash"])
+            .returning(*(getattr(CommitEvent, name) for name in CommitSnapshot._fields))
+        )
+    
+    def _filter_commits(self, commits: List[CommitSnapshot]) -> List[CommitSnapshot]:
+        """
+        Filter commits by the project's CommitParser rules, using the type parsed on ingestion:
+        announced types (feat, fix, ... by default) always pass, other commits only if their
+        message is not trivially short.
+        """
+        filtered = []
         for commit in commits:
-            message = commit.message.strip()
-            
-            # Check if message starts with allowed prefix
-            has_prefix = any(message.lower().startswith(prefix) for prefix in allowed_prefixes)
-            
-            # Also include commits that have a commit hash pattern in first line
-            # (some workflows don't use prefixes)
-            if has_prefix or len(message) > 10:
+            if self.parser.is_announced(commit.commit_type, commit.message):
                 filtered.append(commit)
-                logger.debug(f"Commit included: {commit.commit_hash} - {message[:50]}")
+                logger.debug("Commit included: %s - %s", commit.commit_hash, commit.message[:50])
             else:
-                logger.debug(f"Commit filtered out: {commit.commit_hash} - {message[:50]}")
-        
+                logger.debug("Commit filtered out: %s - %s", commit.commit_hash, commit.message[:50])
         return filtered
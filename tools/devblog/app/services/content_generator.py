@@ -2,71 +2,62 @@
 Content generation service
 Generates Telegram messages from commits
 """
-from typing import List
+import time
+from typing import List, Optional, Tuple
 from datetime import datetime
 
-from app.models import Project, CommitEvent
+from app.models import ProjectSnapshot, CommitSnapshot
 from app.core.logger import get_logger
+from app.core.config import settings
 from app.integrations.openai_service import OpenAIService
+from app.integrations.openai_batch import BatchBackend, BatchRequest
+from app.services.ai_cache import ai_post_cache
+from app.core.commit_parser import ParsedCommit, get_commit_parser
+from app.core.timing import span
 
 logger = get_logger(__name__)
 
+COMMIT_EMOJI = {
+    "feat": "✨",
+    "fix": "🐛",
+    "docs": "📚",
+    "perf": "⚡",
+    "refactor": "♻️",
+    "test": "🧪",
+    "chore": "🔧",
+}
+
 
 class ContentGenerator:
     """Generate message content from commits. Uses OpenAI when enabled on project, otherwise falls back to template."""
 
-    def __init__(self, project: Project):
+    def __init__(self, project: ProjectSnapshot):
         self.project = project
+        self.parser = get_commit_parser(getattr(project, "commit_rules", None))
 
-    def _get_commit_emoji(self, message: str) -> str:
+    def _get_commit_emoji(self, commit_type: Optional[str]) -> str:
         """Get appropriate emoji based on commit type."""
-        msg_lower = message.lower()
-        if "feat" in msg_lower or "feature" in msg_lower or "add" in msg_lower:
-            return "✨"
-        elif "fix" in msg_lower or "bug" in msg_lower:
-            return "🐛"
-        elif "docs" in msg_lower or "documentation" in msg_lower:
-            return "📚"
-        elif "perf" in msg_lower or "performance" in msg_lower or "optimize" in msg_lower:
-            return "⚡"
-        elif "refactor" in msg_lower:
-            return "♻️"
-        elif "test" in msg_lower:
-            return "🧪"
-        elif "chore" in msg_lower or "update" in msg_lower:
-            return "🔧"
-        else:
-            return "📝"
+        return COMMIT_EMOJI.get(commit_type, "📝")
 
-    def _extract_commit_type(self, message: str) -> str:
-        """Extract commit type prefix (feat:, fix:, etc) if present."""
-        if ":" not in message:
+    def _extract_commit_type(self, parsed: ParsedCommit) -> str:
+        """Type tag ("[FEAT] ", "[FIX!] ") for typed commits, empty for free-form messages."""
+        if not parsed.type:
             return ""
-        
-        prefix = message.split(":")[0].strip().lower()
-        types = ["feat", "fix", "docs", "style", "refactor", "perf", "test", "chore"]
-        
-        if prefix in types:
-            return f"[{prefix.upper()}] "
-        return ""
+        return f"[{parsed.type.upper()}{'!' if parsed.breaking else ''}] "
 
-    def _template_from_commits(self, commits: List[CommitEvent]) -> str:
+    def _template_from_commits(self, commits: List[CommitSnapshot]) -> str:
         if not commits:
             return ""
 
         commits_text = ""
         for commit in commits:
-            # Get first line of commit message
-            message = commit.message.split("\n")[0].strip()
-            
-            # Extract type prefix
-            commit_type = self._extract_commit_type(message)
-            if commit_type:
-                # Remove type prefix from message to avoid duplication
-                message = message.split(":", 1)[1].strip()
+            # One parse of the message: type tag and subject without the "type(scope):" header
+            parsed = self.parser.parse(commit.message)
+            commit_type = self._extract_commit_type(parsed)
+            message = f"{parsed.scope}: {parsed.subject}" if parsed.scope else parsed.subject
             
             # Get emoji
-            emoji = self._get_commit_emoji(commit.message)
+            emoji = self._get_commit_emoji(self.parser.display_type(parsed))
             
             # Format line
             commits_text += f"{emoji} {commit_type}{message}\n"
@@ -100,21 +91,81 @@ class ContentGenerator:
 
         return template
 
-    def generate_from_commits(self, commits: List[CommitEvent]) -> str:
+    def generate_template(self, commits: List[CommitSnapshot]) -> str:
+        """Template post, no network calls."""
+        return self._template_from_commits(commits)
+
+    async def generate_ai(self, commits: List[CommitSnapshot]) -> Optional[str]:
+        """AI post, or None if AI is disabled or generation failed.
+        AI posts are cached by commit set (see AIPostCache), so the same commits cost one OpenAI call."""
+        if not commits or not getattr(self.project, "ai_enabled", False):
+            return None
+        try:
+            ai = OpenAIService(self.project)
+            key = ai_post_cache.key_for(ai.model, self.project.language, self.project.name, commits)
+
+            async def generate() -> Optional[str]:
+                with span("openai"):
+                    ok, result = await ai.generate_post(commits)
+                if ok and result:
+                    return result
+                logger.warning("OpenAI generation failed or empty: %s. Falling back to template.", result)
+                return None
+
+            return await ai_post_cache.get_or_generate(key, ai.model, generate) or None
+        except Exception as exc:
+            logger.exception("OpenAI generation exception: %s. Falling back to template.", exc)
+            return None
+
+    async def generate_from_commits(self, commits: List[CommitSnapshot]) -> str:
         """Generate content. If `ai_enabled` on project and OpenAI configured, use it with fallback to template."""
         if not commits:
             return ""
 
-        if getattr(self.project, "ai_enabled", False):
+        return await self.generate_ai(commits) or self._template_from_commits(commits)
+
+    @staticmethod
+    async def generate_batch(
+        items: List[Tuple[ProjectSnapshot, List[CommitSnapshot]]],
+        backend: BatchBackend,
+    ) -> List[str]:
+        """Texts for many (project, commits) pairs, in order, with one batch job for all AI misses.
+
+        Cached posts are reused; every item the batch does not answer (per-request error,
+        expired or timed out batch, failed submit) falls back to that project's template.
+        """
+        texts: List[Optional[str]] = [None] * len(items)
+        requests: List[BatchRequest] = []
+        cache_keys = {}
+        for index, (project, commits) in enumerate(items):
+            if not commits or not getattr(project, "ai_enabled", False) or not settings.OPENAI_API_KEY:
+                continue
+            ai = OpenAIService(project)
+            key = ai_post_cache.key_for(ai.model, project.language, project.name, commits)
+            texts[index] = await ai_post_cache.get(key)
+            if texts[index] is None:
+                requests.append(BatchRequest(str(index), ai.build_request(commits)))
+                cache_keys[str(index)] = (key, ai.model)
+
+        if requests:
+            started = time.monotonic()
             try:
-                ai = OpenAIService(self.project)
-                ok, result = ai.generate_post(commits)
-                if ok and result:
-                    return result
-                else:
-                    logger.warning(f"OpenAI generation failed or empty: {result}. Falling back to template.")
+                results = await backend.run(requests)
             except Exception as exc:
-                logger.exception(f"OpenAI generation exception: {exc}. Falling back to template.")
-
-        # Fallback
-        return self._template_from_commits(commits)
+                logger.exception("Batch generation failed: %s. Falling back to template.", exc)
+                results = {}
+            per_request_sec = (time.monotonic() - started) / len(requests)
+            for custom_id, (key, model) in cache_keys.items():
+                text = results.get(custom_id)
+                if text:
+                    texts[int(custom_id)] = text
+                    await ai_post_cache.put(key, model, text, per_request_sec)
+                else:
+                    logger.warning(
+                        "No batch result for project %s. Falling back to template.", items[int(custom_id)][0].id
+                    )
+
+        return [
+            text if text is not None else ContentGenerator(project)._template_from_commits(commits)
+            for text, (project, commits) in zip(texts, items)
+        ]
@@ -0,0 +1,72 @@
+"""
+GitHub delivery log
+Makes webhook handling idempotent on X-GitHub-Delivery
+"""
+from typing import Dict, Any, Optional
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import WebhookDelivery
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class DeliveryLog:
+    """Records accepted deliveries; the unique index on delivery_id arbitrates concurrent duplicates."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_response(self, delivery_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Stored response of an already accepted delivery, or None."""
+        if not delivery_id:
+            return None
+        row = (
+            await self.db.execute(
+                select(WebhookDelivery.response).where(WebhookDelivery.delivery_id == delivery_id)
+            )
+        ).first()
+        return (row[0] or {}) if row else None
+
+    async def record(
+        self,
+        delivery_id: str,
+        project_id: int,
+        response: Dict[str, Any],
+        job_id: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Add the delivery to the current transaction and commit it.
+
+        Returns None when this call won, or the stored response when a concurrent
+        duplicate committed first (the whole transaction is rolled back in that case).
+        """
+        self.db.add(WebhookDelivery(
+            delivery_id=delivery_id,
+            project_id=project_id,
+            job_id=job_id,
+            response=response,
+        ))
+        try:
+            await self.db.commit()
+            return None
+        except IntegrityError:
+            await self.db.rollback()
+            logger.info("Concurrent duplicate delivery %s", delivery_id)
+            return await self.get_response(delivery_id) or {}
+
+    async def forget(self, delivery_id: str) -> None:
+        """Drop a claimed delivery whose processing failed, so GitHub's redelivery is processed again."""
+        await self.db.execute(delete(WebhookDelivery).where(WebhookDelivery.delivery_id == delivery_id))
+        await self.db.commit()
+
+    async def update_response(self, delivery_id: str, response: Dict[str, Any]) -> None:
+        await self.db.execute(
+            update(WebhookDelivery)
+            .where(WebhookDelivery.delivery_id == delivery_id)
+            .values(response=response)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
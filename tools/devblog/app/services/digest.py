@@ -0,0 +1,115 @@
+"""
+Daily digest scheduling
+Finds projects in post_mode="daily_digest" whose period has elapsed and runs their digests,
+optionally generating all AI texts in one OpenAI batch job
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Project, DigestWatermark, ProjectSnapshot, CommitSnapshot
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.integrations.openai_batch import BatchBackend, OpenAIBatchBackend
+from app.services.commit_processor import CommitProcessor
+from app.services.content_generator import ContentGenerator
+from app.services.project_cache import project_cache
+
+logger = get_logger(__name__)
+
+
+async def due_digest_projects(db: AsyncSession, now: Optional[datetime] = None) -> List[int]:
+    """Ids of digest-mode projects never digested or digested more than DIGEST_PERIOD_SEC ago."""
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=settings.DIGEST_PERIOD_SEC)
+    rows = await db.scalars(
+        select(Project.id)
+        .outerjoin(DigestWatermark, DigestWatermark.project_id == Project.id)
+        .where(
+            Project.post_mode == "daily_digest",
+            or_(DigestWatermark.last_digest_at.is_(None), DigestWatermark.last_digest_at <= cutoff),
+        )
+        .order_by(Project.id)
+    )
+    return list(rows)
+
+
+async def run_due_digests(
+    session_factory: Callable[[], AsyncSession],
+    batch_backend: Optional[BatchBackend] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Run the digest of every due project, each in its own session.
+    A backlog larger than DIGEST_MAX_COMMITS is posted as several consecutive digests
+    (in batch mode the rest waits for the next period).
+
+    With DIGEST_BATCH_ENABLED (or an explicit `batch_backend`) and at least
+    DIGEST_BATCH_MIN_PROJECTS due, the AI texts are generated in one batch job instead.
+    """
+    async with session_factory() as db:
+        project_ids = await due_digest_projects(db)
+
+    if batch_backend is None and settings.DIGEST_BATCH_ENABLED and settings.OPENAI_API_KEY \
+            and len(project_ids) >= settings.DIGEST_BATCH_MIN_PROJECTS:
+        batch_backend = OpenAIBatchBackend()
+    if batch_backend is not None and project_ids:
+        return await _run_batched(session_factory, project_ids, batch_backend)
+
+    results: Dict[int, Dict[str, Any]] = {}
+    for project_id in project_ids:
+        async with session_factory() as db:
+            project = await project_cache.get_by_id(db, project_id)
+            if not project:
+                continue
+            processor = CommitProcessor(db, project)
+            try:
+                result = await processor.publish_digest()
+                # A recovered post or a full digest means more may be waiting
+                while result.get("message_sent") and (
+                    result.get("recovered") or result.get("digested", 0) >= settings.DIGEST_MAX_COMMITS
+                ):
+                    result = await processor.publish_digest()
+            except Exception as exc:
+                # The watermark only moves together with a claimed post and the period only
+                # restarts after a send attempt, so the next check retries
+                await db.rollback()
+                logger.exception("Digest for project %s failed: %s", project_id, exc)
+                result = {"message_sent": False, "error": str(exc)}
+        results[project_id] = result
+        logger.info("Digest for project %s: %s", project_id, result)
+    return results
+
+
+async def _run_batched(
+    session_factory: Callable[[], AsyncSession],
+    project_ids: List[int],
+    batch_backend: BatchBackend,
+) -> Dict[int, Dict[str, Any]]:
+    """Claim every due digest, generate all texts in one batch, then deliver each post."""
+    results: Dict[int, Dict[str, Any]] = {}
+    claimed: List[Tuple[ProjectSnapshot, int, List[CommitSnapshot]]] = []
+    for project_id in project_ids:
+        async with session_factory() as db:
+            project = await project_cache.get_by_id(db, project_id)
+            if not project:
+                continue
+            try:
+                result, post_id, commits = await CommitProcessor(db, project).claim_digest()
+            except Exception as exc:
+                await db.rollback()
+                logger.exception("Digest for project %s failed: %s", project_id, exc)
+                result, post_id, commits = {"message_sent": False, "error": str(exc)}, None, []
+        results[project_id] = result
+        if post_id is not None:
+            claimed.append((project, post_id, commits))
+
+    logger.info("Generating %s of %s due digests in one batch", len(claimed), len(project_ids))
+    texts = await ContentGenerator.generate_batch([(project, commits) for project, _, commits in claimed], batch_backend)
+
+    for (project, post_id, commits), text in zip(claimed, texts):
+        async with session_factory() as db:
+            delivered = await CommitProcessor(db, project).deliver_digest(post_id, commits, text)
+        results[project.id] = {**results[project.id], **delivered}
+        logger.info("Digest for project %s: %s", project.id, results[project.id])
+    return results
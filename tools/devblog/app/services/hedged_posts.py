@@ -0,0 +1,94 @@
+"""
+Hedged AI posts
+The template post goes out at once; the AI text replaces it via editMessageText if it arrives in time
+"""
+import asyncio
+from datetime import datetime
+from typing import Callable, List, Set
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+from app.models import Post, ProjectSnapshot, CommitSnapshot
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.integrations.telegram import TelegramService
+from app.services.content_generator import ContentGenerator
+
+logger = get_logger(__name__)
+
+
+class HedgedPosts:
+    """Background upgrades of template posts to AI text.
+
+    Notes:
+    - `schedule` starts the upgrade as an asyncio task and returns immediately, so neither the
+      webhook nor the worker job waits for OpenAI.
+    - An AI text arriving after `deadline_sec` (or not at all) leaves the template in place.
+    - Tasks live in this process only; `drain()` is awaited on app/worker shutdown so pending
+      upgrades get a chance to finish.
+    """
+
+    def __init__(
+        self,
+        deadline_sec: float = settings.AI_HEDGE_DEADLINE_SEC,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.deadline_sec = deadline_sec
+        self.session_factory = session_factory
+        self._tasks: Set[asyncio.Task] = set()
+        self.upgraded = 0
+        self.missed = 0
+        self.failed = 0
+
+    def schedule(self, project: ProjectSnapshot, post_id: int, message_id: str, commits: List[CommitSnapshot]) -> asyncio.Task:
+        task = asyncio.create_task(self._run(project, post_id, message_id, commits), name=f"hedge-post-{post_id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def drain(self, timeout: float) -> None:
+        if self._tasks:
+            logger.info("Waiting up to %.0fs for %s pending AI post upgrades", timeout, len(self._tasks))
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+
+    async def _run(self, project: ProjectSnapshot, post_id: int, message_id: str, commits: List[CommitSnapshot]) -> None:
+        try:
+            await self._upgrade(project, post_id, message_id, commits)
+        except Exception as exc:
+            self.failed += 1
+            logger.exception("AI upgrade of post %s failed: %s", post_id, exc)
+
+    async def _upgrade(self, project: ProjectSnapshot, post_id: int, message_id: str, commits: List[CommitSnapshot]) -> None:
+        try:
+            text = await asyncio.wait_for(ContentGenerator(project).generate_ai(commits), self.deadline_sec)
+        except asyncio.TimeoutError:
+            self.missed += 1
+            logger.info(
+                "AI text for post %s missed the %.0fs deadline, keeping the template", post_id, self.deadline_sec
+            )
+            return
+        if not text:
+            self.failed += 1
+            return
+
+        result = await TelegramService(project).edit_message(message_id, text)
+        if not result["success"]:
+            self.failed += 1
+            logger.warning("Could not replace post %s with the AI text: %s", post_id, result.get("error"))
+            return
+
+        async with self.session_factory() as db:
+            await db.execute(
+                update(Post)
+                .where(Post.id == post_id)
+                .values(content=text, edited_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        self.upgraded += 1
+        logger.info("Post %s upgraded to the AI text (message %s)", post_id, message_id)
+
+
+hedged_posts = HedgedPosts()
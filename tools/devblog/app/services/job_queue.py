@@ -0,0 +1,241 @@
+"""
+Durable webhook job queue
+Jobs are rows in `webhook_jobs`; workers lease them with an expiring lock
+"""
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, or_, and_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import WebhookJob, WebhookDelivery
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class JobQueue:
+    """Lease-based job queue on top of the database.
+
+    Notes:
+    - Only the oldest unfinished job of a project can be leased, so jobs of one project
+      are processed strictly in arrival order while different projects run in parallel.
+    - A lease that is not completed before `locked_until` (crashed worker) is picked up again;
+      a running job keeps it with `renew` (worker heartbeat), however long it takes.
+    - Failed jobs are retried with exponential backoff up to `WORKER_MAX_ATTEMPTS`.
+    - Finished jobs and accepted deliveries are deleted by `prune` after `JOB_RETENTION_SEC`.
+    - "flush" jobs (coalesced posts, see `schedule_flush`) wait for their `available_at` without
+      blocking the project: until due they are not considered the head of the project.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.lease_sec = settings.WORKER_LEASE_SEC
+        self.max_attempts = settings.WORKER_MAX_ATTEMPTS
+        self.retry_base_sec = settings.WORKER_RETRY_BASE_SEC
+
+    async def enqueue(self, project_id: int, payload: Dict[str, Any], kind: str = "push", commit: bool = True) -> WebhookJob:
+        """Persist a new pending job. With commit=False it is only flushed (caller owns the transaction)."""
+        job = WebhookJob(
+            project_id=project_id,
+            kind=kind,
+            payload=payload,
+            status="pending",
+            available_at=datetime.utcnow(),
+        )
+        self.db.add(job)
+        if commit:
+            await self.db.commit()
+        else:
+            await self.db.flush()
+        return job
+
+    async def schedule_flush(
+        self,
+        project_id: int,
+        commit_ids: List[int],
+        window_sec: float,
+        max_delay_sec: float,
+    ) -> WebhookJob:
+        """
+        Add commits to the project's pending flush job (or create one) and push its due time
+        to now + window_sec, but never past created_at + max_delay_sec. Flushed, not committed.
+
+        Only the worker holding the project's lease calls this, so the read-modify-write of the
+        pending flush job does not race with other pushes of the same project.
+        """
+        now = datetime.utcnow()
+        job = (
+            await self.db.scalars(
+                select(WebhookJob)
+                .where(
+                    WebhookJob.project_id == project_id,
+                    WebhookJob.kind == "flush",
+                    WebhookJob.status == "pending",
+                )
+                .order_by(WebhookJob.id)
+                .limit(1)
+            )
+        ).first()
+        if job is None:
+            job = WebhookJob(
+                project_id=project_id,
+                kind="flush",
+                payload={"commit_ids": []},
+                status="pending",
+                created_at=now,
+            )
+            self.db.add(job)
+
+        first_push_at = job.created_at or now
+        job.payload = {"commit_ids": list((job.payload or {}).get("commit_ids", [])) + list(commit_ids)}
+        job.available_at = min(
+            now + timedelta(seconds=window_sec),
+            first_push_at + timedelta(seconds=max(window_sec, max_delay_sec)),
+        )
+        await self.db.flush()
+        return job
+
+    async def lease(self, worker_id: str, limit: int) -> List[WebhookJob]:
+        """Lease up to `limit` ready jobs, at most one per project."""
+        if limit <= 0:
+            return []
+
+        now = datetime.utcnow()
+
+        # Projects that currently have a job under an active lease
+        busy_projects = (
+            select(WebhookJob.project_id)
+            .where(WebhookJob.status == "processing", WebhookJob.locked_until > now)
+        )
+        # Oldest unfinished job per project (keeps per-project ordering); a flush job that is not
+        # due yet must not hold back the pushes that keep extending it
+        head_ids = (
+            select(func.min(WebhookJob.id))
+            .where(
+                WebhookJob.status.in_(["pending", "processing"]),
+                or_(WebhookJob.kind != "flush", WebhookJob.available_at <= now),
+            )
+            .group_by(WebhookJob.project_id)
+        )
+        candidate_ids = (
+            await self.db.scalars(
+                select(WebhookJob.id)
+                .where(
+                    WebhookJob.id.in_(head_ids),
+                    WebhookJob.project_id.notin_(busy_projects),
+                    WebhookJob.available_at <= now,
+                )
+                .order_by(WebhookJob.id)
+                .limit(limit)
+            )
+        ).all()
+
+        leased_ids = []
+        for job_id in candidate_ids:
+            # Conditional update: only one worker wins the race for a given job
+            claimed = await self.db.execute(
+                update(WebhookJob)
+                .where(
+                    WebhookJob.id == job_id,
+                    or_(
+                        WebhookJob.status == "pending",
+                        and_(WebhookJob.status == "processing", WebhookJob.locked_until <= now),
+                    ),
+                )
+                .values(
+                    status="processing",
+                    locked_by=worker_id,
+                    locked_until=now + timedelta(seconds=self.lease_sec),
+                    attempts=WebhookJob.attempts + 1,
+                    started_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if claimed.rowcount == 1:
+                leased_ids.append(job_id)
+        await self.db.commit()
+
+        if not leased_ids:
+            return []
+        # populate_existing: jobs already in the identity map must reflect the claim
+        return list(
+            await self.db.scalars(
+                select(WebhookJob)
+                .where(WebhookJob.id.in_(leased_ids))
+                .order_by(WebhookJob.id)
+                .execution_options(populate_existing=True)
+            )
+        )
+
+    async def renew(self, job_id: int, worker_id: str) -> bool:
+        """Extend a running job's lease; False when the job is no longer leased by this worker."""
+        renewed = await self.db.execute(
+            update(WebhookJob)
+            .where(WebhookJob.id == job_id, WebhookJob.status == "processing", WebhookJob.locked_by == worker_id)
+            .values(locked_until=datetime.utcnow() + timedelta(seconds=self.lease_sec))
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return renewed.rowcount == 1
+
+    async def complete(self, job: WebhookJob, result: Optional[Dict[str, Any]] = None) -> None:
+        """Mark a leased job as done."""
+        job.status = "done"
+        job.result = result
+        job.last_error = None
+        job.locked_until = None
+        job.finished_at = datetime.utcnow()
+        self.db.add(job)
+        await self.db.commit()
+
+    async def fail(self, job: WebhookJob, error: str, retry: bool = True) -> None:
+        """Record a failure; reschedule with backoff or give up after max attempts."""
+        now = datetime.utcnow()
+        job.last_error = error
+        job.locked_until = None
+        if retry and job.attempts < self.max_attempts:
+            delay = self.retry_base_sec * (2 ** max(0, job.attempts - 1))
+            job.status = "pending"
+            job.available_at = now + timedelta(seconds=delay)
+            logger.warning("Job %s failed (attempt %s), retry in %ss: %s", job.id, job.attempts, delay, error)
+        else:
+            job.status = "failed"
+            job.finished_at = now
+            logger.error("Job %s failed permanently after %s attempts: %s", job.id, job.attempts, error)
+        self.db.add(job)
+        await self.db.commit()
+
+    async def prune(self, retention_sec: Optional[float] = None) -> Dict[str, int]:
+        """Delete done/failed jobs and accepted deliveries older than the retention period."""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.JOB_RETENTION_SEC if retention_sec is None else retention_sec)
+        jobs = await self.db.execute(
+            delete(WebhookJob).where(WebhookJob.status.in_(["done", "failed"]), WebhookJob.finished_at < cutoff)
+        )
+        deliveries = await self.db.execute(delete(WebhookDelivery).where(WebhookDelivery.created_at < cutoff))
+        await self.db.commit()
+        return {"jobs": jobs.rowcount, "deliveries": deliveries.rowcount}
+
+    async def stats(self) -> Dict[str, Any]:
+        """Queue depth and wait time of the oldest pending job."""
+        now = datetime.utcnow()
+        # Done jobs are the bulk of the table and are not reported: count only the others (index on status)
+        counts = dict(
+            (
+                await self.db.execute(
+                    select(WebhookJob.status, func.count(WebhookJob.id))
+                    .where(WebhookJob.status.in_(["pending", "processing", "failed"]))
+                    .group_by(WebhookJob.status)
+                )
+            ).all()
+        )
+        oldest_pending = await self.db.scalar(
+            select(func.min(WebhookJob.created_at)).where(WebhookJob.status == "pending")
+        )
+        return {
+            "pending": counts.get("pending", 0),
+            "processing": counts.get("processing", 0),
+            "failed": counts.get("failed", 0),
+            "depth": counts.get("pending", 0) + counts.get("processing", 0),
+            "oldest_wait_sec": (now - oldest_pending).total_seconds() if oldest_pending else 0.0,
+        }
@@ -0,0 +1,47 @@
+"""
+Content-addressed store for raw commit payloads
+Payloads are zlib-compressed and keyed by sha256, so identical payloads are stored once
+"""
+import json
+import zlib
+import hashlib
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.upsert import insert_ignore
+from app.models import CommitPayload
+
+COMPRESSION_LEVEL = 6
+
+
+def encode_payload(data: Dict[str, Any]) -> Tuple[bytes, bytes, int]:
+    """Canonical JSON -> (sha256 digest, compressed bytes, uncompressed size)."""
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+    return hashlib.sha256(raw).digest(), zlib.compress(raw, COMPRESSION_LEVEL), len(raw)
+
+
+class PayloadStore:
+    """Read/write access to `commit_payloads`. Only this class touches the payload bytes."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def put_many(self, payloads: List[Dict[str, Any]]) -> List[bytes]:
+        """Store payloads (one INSERT, duplicates skipped) and return their digests in order."""
+        rows = {}
+        digests = []
+        for data in payloads:
+            digest, compressed, size = encode_payload(data)
+            rows[digest] = {"digest": digest, "data": compressed, "size": size}
+            digests.append(digest)
+        if rows:
+            await self.db.execute(insert_ignore(self.db, CommitPayload, ["digest"]), list(rows.values()))
+        return digests
+
+    async def get(self, digest: bytes) -> Optional[Dict[str, Any]]:
+        """Decompress a single payload by digest."""
+        data = await self.db.scalar(select(CommitPayload.data).where(CommitPayload.digest == digest))
+        if data is None:
+            return None
+        return json.loads(zlib.decompress(data))
@@ -0,0 +1,121 @@
+"""
+In-process Project cache
+Serves immutable ProjectSnapshot objects by repo_full_name or id without a DB round trip
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, Any
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import Project, CacheVersion, ProjectSnapshot
+from app.core.config import settings
+from app.core.logger import get_logger, register_secret
+
+logger = get_logger(__name__)
+
+CACHE_NAME = "projects"
+
+
+class ProjectCache:
+    """TTL + LRU cache of project snapshots.
+
+    Notes:
+    - Misses are cached too (for a shorter TTL), so unknown repos do not hit the DB every time.
+    - Every write path calls `invalidate(db)`, which clears the local cache and bumps the
+      `cache_versions` row. Other processes (uvicorn workers, the job worker) poll that row at
+      most once per `PROJECT_CACHE_VERSION_CHECK_SEC` and drop their entries when it changes.
+    - Lookups run on the async webhook path (AsyncSession); `invalidate` is called from the
+      synchronous admin endpoints and CLI, so it takes a regular Session.
+    """
+
+    def __init__(
+        self,
+        ttl_sec: float = settings.PROJECT_CACHE_TTL_SEC,
+        negative_ttl_sec: float = settings.PROJECT_CACHE_NEGATIVE_TTL_SEC,
+        max_size: int = settings.PROJECT_CACHE_MAX_SIZE,
+        version_check_sec: float = settings.PROJECT_CACHE_VERSION_CHECK_SEC,
+    ):
+        self.ttl_sec = ttl_sec
+        self.negative_ttl_sec = negative_ttl_sec
+        self.max_size = max_size
+        self.version_check_sec = version_check_sec
+        # {(kind, key): (expires_at, snapshot or None)}
+        self._entries: "OrderedDict[Tuple[str, Any], Tuple[float, Optional[ProjectSnapshot]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._version_checked_at = 0.0
+
+    async def get_by_repo(self, db: AsyncSession, repo_full_name: str) -> Optional[ProjectSnapshot]:
+        return await self._get(db, "repo", repo_full_name)
+
+    async def get_by_id(self, db: AsyncSession, project_id: int) -> Optional[ProjectSnapshot]:
+        return await self._get(db, "id", project_id)
+
+    def invalidate(self, db: Optional[Session] = None) -> None:
+        """Drop all local entries and, if a session is given, signal other processes."""
+        self.clear()
+        if db is None:
+            return
+        bumped = db.execute(
+            update(CacheVersion)
+            .where(CacheVersion.name == CACHE_NAME)
+            .values(version=CacheVersion.version + 1)
+        )
+        if bumped.rowcount == 0:
+            db.add(CacheVersion(name=CACHE_NAME, version=1))
+        db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    async def _get(self, db: AsyncSession, kind: str, key: Any) -> Optional[ProjectSnapshot]:
+        await self._check_version(db)
+        now = time.monotonic()
+        cache_key = (kind, key)
+
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(cache_key)
+                return entry[1]
+
+        column = Project.repo_full_name if kind == "repo" else Project.id
+        # populate_existing: the session may already hold a stale instance (no expire on commit)
+        project = (
+            await db.scalars(
+                select(Project).where(column == key).limit(1).execution_options(populate_existing=True)
+            )
+        ).first()
+        snapshot = ProjectSnapshot.from_model(project) if project else None
+        if snapshot:
+            register_secret(snapshot.github_webhook_secret, snapshot.telegram_bot_token)
+
+        with self._lock:
+            ttl = self.ttl_sec if snapshot else self.negative_ttl_sec
+            self._entries[cache_key] = (now + ttl, snapshot)
+            self._entries.move_to_end(cache_key)
+            if snapshot:
+                # Same snapshot is reachable by both keys
+                other_key = ("id", snapshot.id) if kind == "repo" else ("repo", snapshot.repo_full_name)
+                self._entries[other_key] = (now + ttl, snapshot)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    async def _check_version(self, db: AsyncSession) -> None:
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_sec:
+            return
+        self._version_checked_at = now
+        version = await db.scalar(select(CacheVersion.version).where(CacheVersion.name == CACHE_NAME)) or 0
+        if self._version is not None and version != self._version:
+            logger.info("Project cache version changed (%s -> %s), clearing", self._version, version)
+            self.clear()
+        self._version = version
+
+
+project_cache = ProjectCache()
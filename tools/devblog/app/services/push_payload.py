@@ -0,0 +1,115 @@
+"""
+Incremental extraction of GitHub push payloads
+Decodes one top-level value (or one commit) at a time and keeps only the fields we use
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+
+_decoder = json.JSONDecoder()
+_skip_ws = re.compile(r"[ \t\n\r]*").match
+
+
+@dataclass
+class PushPayload:
+    """Fields of a push event used by the pipeline"""
+    repo_full_name: Optional[str] = None
+    ref: str = ""
+    commits: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def branch(self) -> str:
+        # refs/heads/main -> main, refs/heads/release/1.2 -> release/1.2
+        return self.ref[len("refs/heads/"):] if self.ref.startswith("refs/heads/") else self.ref.split("/")[-1]
+
+
+def project_commit(commit: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a GitHub commit object to id/message/author/timestamp."""
+    author = commit.get("author") or {}
+    return {
+        "id": commit.get("id", ""),
+        "message": commit.get("message", ""),
+        "author": {"name": author.get("name", "Unknown")},
+        "timestamp": commit.get("timestamp"),
+    }
+
+
+def parse_push_payload(body: bytes) -> PushPayload:
+    """
+    Parse a push payload without materializing the whole document.
+
+    Top-level values other than `ref`, `repository` and `commits` are decoded and dropped
+    immediately, and `commits` is decoded element by element, so peak memory is the body
+    itself plus the projected commits instead of the full object tree.
+
+    Raises ValueError (json.JSONDecodeError) on malformed input.
+    """
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        raise ValueError("Payload is not valid UTF-8") from exc
+
+    decode = _decoder.raw_decode
+    payload = PushPayload()
+
+    pos = _skip_ws(text, 0).end()
+    if text[pos:pos + 1] != "{":
+        raise ValueError("Payload must be a JSON object")
+    pos = _skip_ws(text, pos + 1).end()
+
+    if text[pos:pos + 1] != "}":
+        while True:
+            key, pos = decode(text, pos)
+            if not isinstance(key, str):
+                raise ValueError(f"Expected object key at position {pos}")
+            pos = _skip_ws(text, pos).end()
+            if text[pos:pos + 1] != ":":
+                raise ValueError(f"Expected ':' at position {pos}")
+            pos = _skip_ws(text, pos + 1).end()
+
+            if key == "commits" and text[pos:pos + 1] == "[":
+                pos = _read_commits(text, pos, payload.commits)
+            else:
+                value, pos = decode(text, pos)
+                if key == "ref" and isinstance(value, str):
+                    payload.ref = value
+                elif key == "repository" and isinstance(value, dict):
+                    payload.repo_full_name = value.get("full_name")
+                del value
+
+            pos = _skip_ws(text, pos).end()
+            char = text[pos:pos + 1]
+            if char == ",":
+                pos = _skip_ws(text, pos + 1).end()
+                continue
+            if char == "}":
+                break
+            raise ValueError(f"Expected ',' or '}}' at position {pos}")
+
+    if _skip_ws(text, pos + 1).end() != len(text):
+        raise ValueError("Extra data after payload")
+    return payload
+
+
+def _read_commits(text: str, pos: int, out: List[Dict[str, Any]]) -> int:
+    """Decode the commits array starting at `[`, appending projected commits. Returns end position."""
+    decode = _decoder.raw_decode
+    pos = _skip_ws(text, pos + 1).end()
+    if text[pos:pos + 1] == "]":
+        return pos + 1
+
+    while True:
+        commit, pos = decode(text, pos)
+        if isinstance(commit, dict):
+            out.append(project_commit(commit))
+        del commit
+
+        pos = _skip_ws(text, pos).end()
+        char = text[pos:pos + 1]
+        if char == ",":
+            pos = _skip_ws(text, pos + 1).end()
+            continue
+        if char == "]":
+            return pos + 1
+        raise ValueError(f"Expected ',' or ']' at position {pos}")
@@ -0,0 +1,55 @@
+"""
+Recently seen commit hashes
+In-memory LRU per project used as a prefilter before the commit upsert
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+from app.core.config import settings
+
+
+class SeenCommits:
+    """Per-project LRU of commit hashes already stored in the DB.
+
+    A hit means the commit is known for sure (hashes are only added after a successful
+    commit), so the DB round trip can be skipped. A miss says nothing - the unique
+    (project_id, commit_hash) index remains the source of truth.
+    """
+
+    def __init__(self, max_per_project: int = settings.SEEN_COMMITS_PER_PROJECT):
+        self.max_per_project = max_per_project
+        self._projects: Dict[int, "OrderedDict[str, None]"] = {}
+        self._lock = threading.Lock()
+
+    def filter_unseen(self, project_id: int, hashes: Iterable[str]) -> List[str]:
+        """Return hashes not known to be stored, preserving order."""
+        with self._lock:
+            seen = self._projects.get(project_id)
+            if not seen:
+                return list(hashes)
+            unseen = []
+            for commit_hash in hashes:
+                if commit_hash in seen:
+                    seen.move_to_end(commit_hash)
+                else:
+                    unseen.append(commit_hash)
+            return unseen
+
+    def add(self, project_id: int, hashes: Iterable[str]) -> None:
+        if self.max_per_project <= 0:
+            return
+        with self._lock:
+            seen = self._projects.setdefault(project_id, OrderedDict())
+            for commit_hash in hashes:
+                seen[commit_hash] = None
+                seen.move_to_end(commit_hash)
+            while len(seen) > self.max_per_project:
+                seen.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._projects.clear()
+
+
+seen_commits = SeenCommits()
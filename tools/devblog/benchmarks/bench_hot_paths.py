@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""
+Microbenchmarks of the pure hot-path functions, compared against a stored baseline.
+
+Each case runs at 1, 100 and 2000 commits (or the --counts given); the reported value
+is the best of --repeat runs, in seconds per call. Cases:
+    signature   - validate_github_signature on a push body of that many commits
+    decode      - parse_push_payload of the same body
+    filter      - CommitFilter.select + CommitProcessor._filter_commits
+    template    - ContentGenerator._template_from_commits
+    prompt      - PromptBuilder.build (what OpenAIService.build_request sends)
+    allow_send  - TelegramService._allow_send, `count` calls
+
+Results are compared with the baseline JSON; a case slower than baseline * (1 + --threshold)
+is a regression and makes the script exit with status 1. Baselines are machine specific:
+regenerate with --save-baseline on the machine that runs the comparison.
+
+Usage:
+    python benchmarks/bench_hot_paths.py [--counts 1 100 2000] [--only template prompt]
+        [--baseline benchmarks/baseline_hot_paths.json] [--threshold 0.25]
+        [--output results.json] [--save-baseline]
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+import platform
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from bench_payload_memory import build_payload  # noqa: E402
+
+DEFAULT_COUNTS = [1, 100, 2000]
+DEFAULT_BASELINE = Path(__file__).parent / "baseline_hot_paths.json"
+SECRET = "bench-secret"
+
+
+def make_commits(count: int) -> list:
+    from app.models import CommitSnapshot
+
+    kinds = ["feat(api): add endpoint", "fix: handle empty body", "chore: bump deps", "Merge branch 'main'", "wip"]
+    return [
+        CommitSnapshot(
+            i, f"{i:040x}", "dependabot[bot]" if i % 10 == 0 else "Dev",
+            f"{kinds[i % len(kinds)]} {i}\n\nDetails of change {i}.", datetime(2024, 1, 1), "main",
+        )
+        for i in range(count)
+    ]
+
+
+def make_project(commit_rules=None):
+    from app.models import ProjectSnapshot
+
+    return ProjectSnapshot(
+        id=1, name="Bench", repo_full_name="owner/repo", github_webhook_secret=SECRET, language="en",
+        ai_enabled=False, post_mode="per_push", telegram_chat_id="@bench", telegram_bot_token="bench-token",
+        commit_rules=json.dumps(commit_rules, sort_keys=True) if commit_rules else None,
+    )
+
+
+def case_signature(count: int) -> Callable[[], object]:
+    import hmac
+    import hashlib
+    from app.api.webhook import validate_github_signature
+
+    body = build_payload(count)
+    signature = "sha256=" + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return lambda: validate_github_signature(body, signature, SECRET)
+
+
+def case_decode(count: int) -> Callable[[], object]:
+    from app.services.push_payload import parse_push_payload
+
+    body = build_payload(count)
+    return lambda: parse_push_payload(body)
+
+
+def case_filter(count: int) -> Callable[[], object]:
+    from app.services.commit_processor import CommitProcessor
+    from app.services.push_payload import project_commit
+
+    project = make_project({"ignore_authors": ["*[bot]"], "ignore_messages": ["^Merge "]})
+    processor = CommitProcessor(None, project)
+    raw = [project_commit(c) for c in json.loads(build_payload(count))["commits"]]
+    stored = make_commits(count)
+
+    def run():
+        processor.rules.select(raw)
+        return processor._filter_commits(stored)
+    return run
+
+
+def case_template(count: int) -> Callable[[], object]:
+    from app.services.content_generator import ContentGenerator
+
+    generator = ContentGenerator(make_project())
+    commits = make_commits(count)
+    return lambda: generator._template_from_commits(commits)
+
+
+def case_prompt(count: int) -> Callable[[], object]:
+    from app.integrations.prompt_builder import PromptBuilder
+
+    builder = PromptBuilder()
+    commits = make_commits(count)
+    return lambda: builder.build("Bench", "en", commits)
+
+
+def case_allow_send(count: int) -> Callable[[], object]:
+    from app.integrations.telegram import TelegramService
+
+    service = TelegramService(make_project())
+    # Limits high enough that every call takes a token (the common path)
+    service.rate_per_min = 10 ** 9
+    service.global_rate_per_sec = 10 ** 9
+
+    def run():
+        for _ in range(count):
+            service._allow_send()
+    return run
+
+
+CASES: Dict[str, Callable[[int], Callable[[], object]]] = {
+    "signature": case_signature,
+    "decode": case_decode,
+    "filter": case_filter,
+    "template": case_template,
+    "prompt": case_prompt,
+    "allow_send": case_allow_send,
+}
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """Best seconds per call over `repeat` runs of an auto-sized loop (~0.2s each)."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run(names: List[str], counts: List[int], repeat: int) -> Dict[str, float]:
+    import logging
+    logging.disable(logging.INFO)  # debug/info lines on the hot path would dominate the numbers
+
+    results = {}
+    for name in names:
+        for count in counts:
+            key = f"{name}[{count}]"
+            results[key] = measure(CASES[name](count), repeat)
+            print(f"{key:>20}: {results[key] * 1e6:>12.1f} us")
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """Print the ratio to baseline for each case; return the keys that regressed."""
+    regressions = []
+    print(f"\nAgainst baseline (threshold +{threshold:.0%}):")
+    for key, value in results.items():
+        base = baseline.get(key)
+        if not base:
+            print(f"{key:>20}: no baseline")
+            continue
+        ratio = value / base
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(key)
+        print(f"{key:>20}: {ratio:>6.2f}x{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmarks of hot pure functions with baseline comparison")
+    parser.add_argument("--counts", type=int, nargs="+", default=DEFAULT_COUNTS, help="Commit counts to test")
+    parser.add_argument("--only", nargs="+", default=list(CASES), choices=list(CASES), help="Cases to run")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case; the best one is reported")
+    parser.add_argument("--baseline", type=str, default=str(DEFAULT_BASELINE), help="Baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = +25%%)")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    args = parser.parse_args()
+
+    results = run(args.only, args.counts, args.repeat)
+    document = {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "unit": "seconds per call",
+        "results": results,
+    }
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2))
+        print(f"Results written to {args.output}")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        if baseline_path.exists():
+            # Keep cases that were not re-run this time
+            document["results"] = {**json.loads(baseline_path.read_text())["results"], **results}
+        baseline_path.write_text(json.dumps(document, indent=2) + "\n")
+        print(f"Baseline written to {baseline_path}")
+        return
+
+    if not baseline_path.exists():
+        print(f"\nNo baseline at {baseline_path}; run with --save-baseline to create one")
+        return
+    regressions = compare(results, json.loads(baseline_path.read_text())["results"], args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than baseline: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
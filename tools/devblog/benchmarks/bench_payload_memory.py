@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+Peak RSS of push payload decoding against commit count.
+
+Every (mode, commit count) pair runs in a fresh subprocess so peak RSS is not
+polluted by previous runs. Modes:
+    json    - json.loads of the whole body (previous behaviour)
+    stream  - parse_push_payload (incremental, projected commits)
+    ingest  - parse_push_payload + CommitProcessor into in-memory SQLite
+
+Usage:
+    python benchmarks/bench_payload_memory.py [--counts 10 100 1000 5000] [--output results.json]
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+DEFAULT_COUNTS = [10, 100, 1000, 5000, 20000]
+MODES = ["json", "stream", "ingest"]
+
+
+def peak_rss_kb() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def build_payload(num_commits: int) -> bytes:
+    """Synthetic push payload shaped like a real GitHub delivery."""
+    commits = []
+    for i in range(num_commits):
+        sha = f"{i:040x}"
+        commits.append({
+            "id": sha,
+            "tree_id": "f" * 40,
+            "distinct": True,
+            "message": f"feat: change number {i}\n\n" + "Detailed description line. " * 10,
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "url": f"https://github.com/owner/repo/commit/{sha}",
+            "author": {"name": "Dev", "email": "dev@example.com", "username": "dev"},
+            "committer": {"name": "Dev", "email": "dev@example.com", "username": "dev"},
+            "added": [f"src/module_{i}/file_{j}.py" for j in range(5)],
+            "removed": [],
+            "modified": [f"src/module_{i}/other_{j}.py" for j in range(5)],
+        })
+    payload = {
+        "ref": "refs/heads/main",
+        "before": "0" * 40,
+        "after": "1" * 40,
+        "repository": {"id": 1, "name": "repo", "full_name": "owner/repo", "default_branch": "main"},
+        "pusher": {"name": "dev", "email": "dev@example.com"},
+        "commits": commits,
+        "head_commit": commits[-1] if commits else None,
+    }
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def child(mode: str, path: str) -> None:
+    """Runs inside the subprocess: decode the payload file and print measurements as JSON."""
+    os.environ["DATABASE_URL"] = "sqlite://"
+    os.environ["WEBHOOK_QUEUE_ENABLED"] = "false"
+
+    from app.services.push_payload import parse_push_payload
+
+    body = Path(path).read_bytes()
+    baseline = peak_rss_kb()
+    started = time.perf_counter()
+
+    if mode == "json":
+        payload = json.loads(body)
+        commits = len(payload["commits"])
+    elif mode == "stream":
+        payload = parse_push_payload(body)
+        commits = len(payload.commits)
+    else:
+        import asyncio
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        from sqlalchemy.pool import StaticPool
+        from app.db.base import Base
+        from app.models import Project, ProjectSnapshot
+        from app.services.commit_processor import CommitProcessor
+
+        async def ingest() -> int:
+            engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                project = Project(name="Bench", repo_full_name="owner/repo", telegram_chat_id="@bench")
+                db.add(project)
+                await db.commit()
+                payload = parse_push_payload(body)
+                await CommitProcessor(db, ProjectSnapshot.from_model(project)).process_webhook_commits(
+                    payload.commits, payload.branch
+                )
+            await engine.dispose()
+            return len(payload.commits)
+
+        commits = asyncio.run(ingest())
+
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "commits": commits,
+        "body_bytes": len(body),
+        "baseline_rss_kb": baseline,
+        "peak_rss_kb": peak_rss_kb(),
+        "elapsed_sec": round(elapsed, 4),
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure peak RSS of push payload processing")
+    parser.add_argument("--counts", type=int, nargs="+", default=DEFAULT_COUNTS, help="Commit counts to test")
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES, help="Modes to compare")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.counts:
+            path = Path(tmp) / f"payload_{count}.json"
+            path.write_bytes(build_payload(count))
+            for mode in args.modes:
+                res = subprocess.run(
+                    [sys.executable, __file__, "--child", mode, str(path)],
+                    capture_output=True, text=True, cwd=str(ROOT),
+                )
+                if res.returncode != 0:
+                    print(f"{mode:>6} {count:>7}: failed\n{res.stderr}", file=sys.stderr)
+                    continue
+                row = json.loads(res.stdout.strip().splitlines()[-1])
+                row["mode"] = mode
+                row["delta_rss_kb"] = row["peak_rss_kb"] - row["baseline_rss_kb"]
+                results.append(row)
+                print(
+                    f"{mode:>6} commits={count:>7} body={row['body_bytes'] / 1024:>9.0f}KB "
+                    f"peak_rss={row['peak_rss_kb'] / 1024:>7.1f}MB delta={row['delta_rss_kb'] / 1024:>7.1f}MB "
+                    f"time={row['elapsed_sec']:.3f}s"
+                )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Throughput of the webhook on a single event loop with slow downstream APIs.
+
+Sends N concurrent signed pushes to /webhook/github/{id} in inline mode (no queue),
+with Telegram replaced by a fake that takes --latency seconds, and measures wall
+time plus /health latency while the pushes are in flight. Modes:
+    async     - fake awaits asyncio.sleep (current behaviour)
+    blocking  - fake calls time.sleep, like the previous requests-based client
+
+Usage:
+    python benchmarks/bench_webhook_concurrency.py [--requests 20] [--latency 0.2]
+"""
+import os
+import sys
+import json
+import hmac
+import time
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from statistics import median
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+SECRET = "bench-secret"
+REPO = "owner/bench"
+
+
+def push_body(index: int) -> bytes:
+    return json.dumps({
+        "ref": "refs/heads/main",
+        "repository": {"full_name": REPO},
+        "commits": [{
+            "id": f"{index:040x}",
+            "message": f"feat: concurrent change {index}",
+            "author": {"name": "Dev"},
+            "timestamp": "2024-01-01T00:00:00Z",
+        }],
+    }).encode()
+
+
+async def measure(mode: str, requests: int, latency: float) -> dict:
+    import httpx
+    from app.main import app
+    from app.db import SessionLocal
+    from app.models import Project
+    from app.integrations.telegram import TelegramService
+
+    async def fake_send(self, text, parse_mode="HTML"):
+        if mode == "async":
+            await asyncio.sleep(latency)
+        else:
+            time.sleep(latency)
+        return {"success": True, "message_id": "1"}
+
+    TelegramService.send_message = fake_send
+
+    db = SessionLocal()
+    project = Project(name="Bench", repo_full_name=REPO, telegram_chat_id="@bench", github_webhook_secret=SECRET)
+    db.add(project)
+    db.commit()
+    project_id = project.id
+    db.close()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def push(index: int) -> int:
+            body = push_body(index)
+            signature = "sha256=" + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+            res = await client.post(
+                f"/webhook/github/{project_id}",
+                content=body,
+                headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": signature},
+            )
+            return res.status_code
+
+        async def probe_health(stop: asyncio.Event, samples: list) -> None:
+            while not stop.is_set():
+                started = time.perf_counter()
+                await client.get("/health")
+                samples.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        stop = asyncio.Event()
+        health_samples: list = []
+        prober = asyncio.create_task(probe_health(stop, health_samples))
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(push(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await prober
+
+    return {
+        "mode": mode,
+        "requests": requests,
+        "ok": sum(1 for s in statuses if s == 200),
+        "elapsed_sec": round(elapsed, 3),
+        "req_per_sec": round(requests / elapsed, 1),
+        "health_p50_ms": round(median(health_samples) * 1000, 1) if health_samples else None,
+        "health_max_ms": round(max(health_samples) * 1000, 1) if health_samples else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure webhook concurrency on one event loop")
+    parser.add_argument("--requests", type=int, default=20, help="Concurrent pushes")
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated Telegram latency, seconds")
+    parser.add_argument("--modes", nargs="+", default=["async", "blocking"], choices=["async", "blocking"])
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        # Fresh process per mode: settings and engines are created at import time
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{Path(tmp) / 'bench.db'}",
+                WEBHOOK_QUEUE_ENABLED="false",
+                TELEGRAM_BOT_TOKEN="bench",
+                LOG_LEVEL="WARNING",
+            )
+            res = subprocess.run(
+                [sys.executable, __file__, "--child", mode, str(args.requests), str(args.latency)],
+                env=env, capture_output=True, text=True, cwd=str(ROOT),
+            )
+            if res.returncode != 0:
+                print(f"{mode:>8}: failed\n{res.stderr}", file=sys.stderr)
+                continue
+            row = json.loads(res.stdout.strip().splitlines()[-1])
+            print(
+                f"{row['mode']:>8}: {row['ok']}/{row['requests']} ok in {row['elapsed_sec']:.2f}s "
+                f"({row['req_per_sec']} req/s), /health p50={row['health_p50_ms']}ms max={row['health_max_ms']}ms"
+            )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        print(json.dumps(asyncio.run(measure(sys.argv[2], int(sys.argv[3]), float(sys.argv[4])))))
+    else:
+        main()
@@ -49,7 +49,7 @@ def bootstrap_blackburn_project():
         ).first()
         
         if project:
-            logger.info(f"Found existing project: {project.name} (ID: {project.id})")
+            logger.info("Found existing project: %s (ID: %s)", project.name, project.id)
             
             # Update fields
             project.name = project_name
@@ -64,9 +64,9 @@ def bootstrap_blackburn_project():
             
             db.add(project)
             db.commit()
-            logger.info(f"Updated project: {project_name}")
+            logger.info("Updated project: %s", project_name)
         else:
-            logger.info(f"Creating new project: {project_name}")
+            logger.info("Creating new project: %s", project_name)
             
             project = Project(
                 name=project_name,
@@ -81,7 +81,7 @@ def bootstrap_blackburn_project():
             db.add(project)
             db.commit()
             db.refresh(project)
-            logger.info(f"Created project: {project_name} (ID: {project.id})")
+            logger.info("Created project: %s (ID: %s)", project_name, project.id)
         
         # Print configuration
         print("\n" + "="*70)
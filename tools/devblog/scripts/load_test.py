@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+"""
+End-to-end load generator for the webhook pipeline.
+
+Creates N projects, drives signed GitHub pushes at a target rate (open loop) or with a fixed
+number of concurrent senders (closed loop), then waits until the posts show up on the
+Telegram stub (scripts/stub_servers.py). Reports throughput and p50/p95/p99 plus a histogram
+for the webhook ack and for end-to-end delivery (push sent -> post received by the stub).
+
+Every commit message carries a marker L<run>-<project>-<push>; the stub extracts markers from
+delivered posts (and the OpenAI stub echoes them), which is how deliveries are matched to
+pushes. With coalescing or digests one post covers several pushes; each push counts as
+delivered with the first post that carries its marker.
+
+Setup (three terminals, same DATABASE_URL for the server, worker and this script):
+    python scripts/stub_servers.py --telegram-latency 0.05 --openai-latency 1.5
+    TELEGRAM_API_BASE=http://127.0.0.1:8081 OPENAI_API_BASE=http://127.0.0.1:8081/v1 uvicorn app.main:app
+    TELEGRAM_API_BASE=http://127.0.0.1:8081 OPENAI_API_BASE=http://127.0.0.1:8081/v1 python scripts/worker.py
+
+Usage:
+    python scripts/load_test.py --projects 20 --rate 50 --duration 60 --commits 1-20
+    python scripts/load_test.py --projects 5 --concurrency 16 --pushes 500 --commits exp:8 --ai
+"""
+import sys
+import json
+import hmac
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import uuid
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.session import SessionLocal, engine
+from app.db.base import Base
+from app.models import Project
+
+SECRET = "load-test-secret"
+HISTOGRAM_BOUNDS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+
+def commit_count_sampler(spec: str) -> Callable[[], int]:
+    """Commit count per push: "5" (fixed), "1-50" (uniform) or "exp:8" (exponential, mean 8, at least 1)."""
+    if spec.startswith("exp:"):
+        mean = float(spec[4:])
+        return lambda: max(1, round(random.expovariate(1 / mean)))
+    if "-" in spec:
+        low, high = (int(v) for v in spec.split("-", 1))
+        return lambda: random.randint(low, high)
+    fixed = int(spec)
+    return lambda: fixed
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(name: str, samples: List[float], elapsed: float) -> Dict[str, object]:
+    ms = [s * 1000 for s in samples]
+    summary = {
+        "count": len(ms),
+        "per_sec": round(len(ms) / elapsed, 2) if elapsed > 0 else None,
+        **{f"p{int(q * 100)}_ms": round(percentile(ms, q), 1) if ms else None for q in (0.5, 0.95, 0.99)},
+        "max_ms": round(max(ms), 1) if ms else None,
+    }
+    print(f"\n{name}: {summary['count']} samples, {summary['per_sec']}/s, "
+          f"p50={summary['p50_ms']}ms p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms max={summary['max_ms']}ms")
+    if ms:
+        counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        for value in ms:
+            counts[next((i for i, bound in enumerate(HISTOGRAM_BOUNDS_MS) if value <= bound), -1)] += 1
+        widest = max(counts)
+        labels = [f"<= {b}ms" for b in HISTOGRAM_BOUNDS_MS] + [f"> {HISTOGRAM_BOUNDS_MS[-1]}ms"]
+        for label, n in zip(labels, counts):
+            if n:
+                print(f"  {label:>10} {n:>7} {'#' * max(1, round(40 * n / widest))}")
+    return summary
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.run_id = uuid.uuid4().hex[:8]
+        self.sample_commits = commit_count_sampler(args.commits)
+        self.projects: List[Dict[str, object]] = []
+        self.sent_at: Dict[str, float] = {}  # marker -> time the push was sent
+        self.ack_latency: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+        self.commits_sent = 0
+        self.push_seq = 0
+
+    def create_projects(self) -> None:
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        try:
+            for i in range(self.args.projects):
+                project = Project(
+                    name=f"Load {self.run_id} #{i}",
+                    repo_full_name=f"load-{self.run_id}/repo-{i}",
+                    telegram_chat_id=f"load-{self.run_id}-{i}",
+                    telegram_bot_token="load-test",
+                    github_webhook_secret=SECRET,
+                    ai_enabled=self.args.ai,
+                    language="en",
+                    coalesce_window_sec=self.args.coalesce_window_sec,
+                )
+                db.add(project)
+                db.commit()
+                self.projects.append({"id": project.id, "index": i, "repo": project.repo_full_name,
+                                      "chat_id": project.telegram_chat_id})
+        finally:
+            db.close()
+        print(f"Created {len(self.projects)} projects for run {self.run_id}")
+
+    def delete_projects(self) -> None:
+        db = SessionLocal()
+        try:
+            for project in db.query(Project).filter(Project.id.in_([p["id"] for p in self.projects])):
+                db.delete(project)
+            db.commit()
+        finally:
+            db.close()
+
+    def next_push(self) -> tuple:
+        project = self.projects[self.push_seq % len(self.projects)]
+        marker = f"L{self.run_id}-{project['index']}-{self.push_seq}"
+        self.push_seq += 1
+        count = self.sample_commits()
+        commits = [{
+            "id": hashlib.sha1(f"{marker}/{i}".encode()).hexdigest(),
+            "message": f"feat: {marker} change {i} of {count}",
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "author": {"name": "Load Test", "email": "load@example.com"},
+        } for i in range(count)]
+        body = json.dumps({
+            "ref": "refs/heads/main",
+            "repository": {"full_name": project["repo"]},
+            "commits": commits,
+        }).encode()
+        return project, marker, body, count
+
+    async def push(self, client: httpx.AsyncClient) -> None:
+        project, marker, body, count = self.next_push()
+        signature = "sha256=" + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+        started = time.time()
+        try:
+            res = await client.post(
+                f"/webhook/github/{project['id']}",
+                content=body,
+                headers={
+                    "Content-Type": "application/json",
+                    "X-GitHub-Event": "push",
+                    "X-GitHub-Delivery": str(uuid.uuid4()),
+                    "X-Hub-Signature-256": signature,
+                },
+            )
+        except httpx.HTTPError:
+            self.errors += 1
+            return
+        self.statuses[res.status_code] = self.statuses.get(res.status_code, 0) + 1
+        if res.status_code in (200, 202):
+            self.ack_latency.append(time.time() - started)
+            self.sent_at[marker] = started
+            self.commits_sent += count
+
+    async def drive(self, client: httpx.AsyncClient) -> float:
+        """Send pushes until --pushes or --duration is reached; returns elapsed seconds."""
+        args = self.args
+        started = time.monotonic()
+
+        def more() -> bool:
+            if args.pushes and self.push_seq >= args.pushes:
+                return False
+            return not args.duration or time.monotonic() - started < args.duration
+
+        if args.rate:
+            # Open loop: start pushes on schedule regardless of how fast they complete
+            tasks = set()
+            interval = 1.0 / args.rate
+            next_at = time.monotonic()
+            while more():
+                task = asyncio.create_task(self.push(client))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                next_at += interval
+                await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+            await asyncio.gather(*tasks)
+        else:
+            async def sender() -> None:
+                while more():
+                    await self.push(client)
+            await asyncio.gather(*(sender() for _ in range(args.concurrency)))
+        return time.monotonic() - started
+
+    async def collect_deliveries(self, stub: httpx.AsyncClient) -> Dict[str, float]:
+        """Poll the Telegram stub until every acked push is delivered or --deliver-timeout passes."""
+        delivered: Dict[str, float] = {}
+        chats = {p["chat_id"] for p in self.projects}
+        since = 0
+        deadline = time.monotonic() + self.args.deliver_timeout
+        while len(delivered) < len(self.sent_at) and time.monotonic() < deadline:
+            data = (await stub.get("/_stub/deliveries", params={"since": since})).json()
+            since = data["next"]
+            for item in data["deliveries"]:
+                if item["chat_id"] not in chats or item["method"] != "sendMessage":
+                    continue
+                for marker in item["markers"]:
+                    if marker in self.sent_at and marker not in delivered:
+                        delivered[marker] = item["at"] - self.sent_at[marker]
+            await asyncio.sleep(0.5)
+        return delivered
+
+    async def run(self) -> Dict[str, object]:
+        args = self.args
+        self.create_projects()
+        limits = httpx.Limits(max_connections=max(args.concurrency, 100))
+        try:
+            async with httpx.AsyncClient(base_url=args.server_url, timeout=args.timeout, limits=limits) as client, \
+                    httpx.AsyncClient(base_url=args.stub_url, timeout=10) as stub:
+                mode = f"rate {args.rate}/s" if args.rate else f"concurrency {args.concurrency}"
+                print(f"Driving pushes ({mode}, commits {args.commits}) at {args.server_url}")
+                elapsed = await self.drive(client)
+                print(f"Sent {self.push_seq} pushes ({self.commits_sent} commits) in {elapsed:.1f}s; "
+                      f"statuses {self.statuses}, transport errors {self.errors}")
+
+                e2e_started = time.monotonic()
+                delivered = await self.collect_deliveries(stub) if not args.no_delivery else {}
+                stub_stats = (await stub.get("/_stub/stats")).json() if not args.no_delivery else {}
+        finally:
+            if not args.keep_projects:
+                self.delete_projects()
+
+        report = {
+            "run_id": self.run_id,
+            "projects": len(self.projects),
+            "pushes": self.push_seq,
+            "commits": self.commits_sent,
+            "statuses": self.statuses,
+            "transport_errors": self.errors,
+            "ack": summarize("Webhook ack", self.ack_latency, elapsed),
+        }
+        if not args.no_delivery:
+            report["delivery"] = summarize("End-to-end delivery", list(delivered.values()),
+                                           elapsed + time.monotonic() - e2e_started)
+            report["undelivered"] = len(self.sent_at) - len(delivered)
+            report["stub"] = stub_stats
+            print(f"\nUndelivered after {args.deliver_timeout:.0f}s: {report['undelivered']}; stub counters: {stub_stats}")
+        return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end load test against local Telegram/OpenAI stubs")
+    parser.add_argument("--server-url", default="http://127.0.0.1:8000", help="Webhook server base URL")
+    parser.add_argument("--stub-url", default="http://127.0.0.1:8081", help="stub_servers.py base URL")
+    parser.add_argument("--projects", type=int, default=10, help="Projects to create (pushes round-robin over them)")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--rate", type=float, default=0.0, help="Open loop: pushes per second")
+    load.add_argument("--concurrency", type=int, default=8, help="Closed loop: concurrent senders")
+    parser.add_argument("--pushes", type=int, default=0, help="Stop after this many pushes (0 = use --duration)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Stop after this many seconds (0 = use --pushes)")
+    parser.add_argument("--commits", default="1-10", help='Commits per push: "5", "1-50" or "exp:8"')
+    parser.add_argument("--ai", action="store_true", help="Enable AI posts on the projects (OpenAI stub)")
+    parser.add_argument("--coalesce_window_sec", type=int, default=0, help="Coalescing window of the projects")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Webhook request timeout, seconds")
+    parser.add_argument("--deliver-timeout", type=float, default=120.0, help="How long to wait for posts, seconds")
+    parser.add_argument("--no-delivery", action="store_true", help="Only measure acks (no stub polling)")
+    parser.add_argument("--keep-projects", action="store_true", help="Do not delete the created projects")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for commit counts")
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this file")
+    args = parser.parse_args()
+    if not args.pushes and not args.duration:
+        parser.error("one of --pushes or --duration must be set")
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    report = asyncio.run(LoadTest(args).run())
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
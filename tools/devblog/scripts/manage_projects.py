@@ -14,11 +14,15 @@
 """
 from __future__ import annotations
 import argparse
+import json
 from typing import Optional
 
 from app.db.session import SessionLocal, engine
 from app.db.base import Base
 from app.models.models import Project
+from app.services.project_cache import project_cache
+from app.core.commit_filter import compile_commit_filter
+from app.core.commit_parser import compile_commit_parser
 
 
 def ensure_tables():
@@ -53,6 +57,8 @@ def show_project(db, id: Optional[int], repo: Optional[str]):
     print(f"Language: {q.language}")
     print(f"AI enabled: {q.ai_enabled}")
     print(f"Post mode: {q.post_mode}")
+    print(f"Coalesce window: {q.coalesce_window_sec}s")
+    print(f"Commit rules: {json.dumps(q.commit_rules) if q.commit_rules else '<default>'}")
     print(f"Telegram chat id: {q.telegram_chat_id}")
     print(f"Telegram bot token: {'<set>' if q.telegram_bot_token else '<not set>'}")
     print(f"Created at: {q.created_at}")
@@ -74,10 +80,11 @@ def create_project(db, name: str, repo_full_name: str, telegram_chat_id: str, la
     db.add(p)
     db.commit()
     db.refresh(p)
+    project_cache.invalidate(db)
     print(f"Created project [{p.id}] {p.name}")
 
 
-def update_project(db, id: int, name: Optional[str], language: Optional[str], ai_enabled: Optional[bool], post_mode: Optional[str], telegram_chat_id: Optional[str], telegram_bot_token: Optional[str]):
+def update_project(db, id: int, name: Optional[str], language: Optional[str], ai_enabled: Optional[bool], post_mode: Optional[str], telegram_chat_id: Optional[str], telegram_bot_token: Optional[str], coalesce_window_sec: Optional[int] = None, commit_rules: Optional[str] = None):
     p = db.query(Project).filter(Project.id == id).first()
     if not p:
         print("Project not found")
@@ -95,10 +102,19 @@ def update_project(db, id: int, name: Optional[str], language: Optional[str], ai
         p.telegram_chat_id = telegram_chat_id; changed = True
     if telegram_bot_token is not None:
         p.telegram_bot_token = telegram_bot_token; changed = True
+    if coalesce_window_sec is not None:
+        p.coalesce_window_sec = max(0, coalesce_window_sec); changed = True
+    if commit_rules is not None:
+        # "" resets to the default Conventional Commits rules
+        p.commit_rules = json.loads(commit_rules) if commit_rules else None
+        compile_commit_filter(p.commit_rules)  # fail here, not on the next push
+        compile_commit_parser(p.commit_rules)
+        changed = True
     if changed:
         db.add(p)
         db.commit()
         db.refresh(p)
+        project_cache.invalidate(db)
         print(f"Updated project [{p.id}]")
     else:
         print("No updates provided")
@@ -113,6 +129,7 @@ def toggle_ai(db, id: int):
     db.add(p)
     db.commit()
     db.refresh(p)
+    project_cache.invalidate(db)
     print(f"Project [{p.id}] ai_enabled set to {p.ai_enabled}")
 
 
@@ -123,6 +140,7 @@ def delete_project(db, id: int):
         return
     db.delete(p)
     db.commit()
+    project_cache.invalidate(db)
     print(f"Deleted project [{id}]")
 
 
@@ -151,6 +169,8 @@ def main():
     p_update.add_argument("--post_mode")
     p_update.add_argument("--telegram_chat_id")
     p_update.add_argument("--telegram_bot_token")
+    p_update.add_argument("--coalesce_window_sec", type=int, help="Merge pushes arriving within N seconds into one post (0 = off)")
+    p_update.add_argument("--commit_rules", help='JSON, e.g. \'{"aliases": {"hotfix": "fix"}, "allowed_types": ["feat", "fix"]}\' ("" = default)')
 
     p_toggle = sub.add_parser("toggle-ai", help="Toggle ai_enabled for project")
     p_toggle.add_argument("--id", type=int, required=True)
@@ -170,7 +190,7 @@ def main():
         elif args.cmd == "create":
             create_project(db, args.name, args.repo_full_name, args.telegram_chat_id, args.language, args.ai_enabled)
         elif args.cmd == "update":
-            update_project(db, args.id, args.name, args.language, args.ai_enabled, args.post_mode, args.telegram_chat_id, args.telegram_bot_token)
+            update_project(db, args.id, args.name, args.language, args.ai_enabled, args.post_mode, args.telegram_chat_id, args.telegram_bot_token, args.coalesce_window_sec, args.commit_rules)
         elif args.cmd == "toggle-ai":
             toggle_ai(db, args.id)
         elif args.cmd == "delete":
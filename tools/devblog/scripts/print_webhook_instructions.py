@@ -70,7 +70,8 @@ def print_webhook_instructions(project_id: int = None):
         print("3. Fill in these values:")
         print()
         print("   Payload URL:")
-        print(f"   https://<your-domain-or-ngrok-url>/webhook/github")
+        print(f"   https://<your-domain-or-ngrok-url>/webhook/github/{project.id}")
+        print("   (legacy URL without project id also works: /webhook/github)")
         print()
         print("   Content type:")
         print("   application/json")
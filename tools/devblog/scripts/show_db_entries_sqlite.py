@@ -21,6 +21,8 @@ for row in cur.execute('SELECT id, project_id, status, telegram_message_id, cont
 print('\nCommits:')
 for row in cur.execute('SELECT id, project_id, commit_hash, author, message, pushed_at FROM commit_events ORDER BY created_at DESC LIMIT 10'):
     id, project_id, chash, author, message, pushed_at = row
+    if isinstance(chash, bytes):
+        chash = chash.hex()
     print(f'id={id} project_id={project_id} hash={chash} author={author} pushed_at={pushed_at}')
     print(message[:200])
     print('---')
@@ -19,18 +19,18 @@ payload = {
     "repository": {"full_name": REPO_FULL_NAME},
     "commits": [
         {
-            "id": "abc123def456",
+            "id": "3f2a9c4e1b7d8f60a5e2c91d4b3a7f8e6c0d1a2b",
             "message": "feat: Add simulated webhook test",
             "timestamp": "2025-12-09T10:00:00Z",
             "author": {"name": "Tester"},
-            "url": "https://github.com/test_owner/test_repo/commit/abc123"
+            "url": "https://github.com/test_owner/test_repo/commit/3f2a9c4e1b7d8f60a5e2c91d4b3a7f8e6c0d1a2b"
         },
         {
-            "id": "def789ghi012",
+            "id": "9b8e7d6c5a4f3e2d1c0b9a8f7e6d5c4b3a2f1e0d",
             "message": "fix: Correct minor bug",
             "timestamp": "2025-12-09T10:05:00Z",
             "author": {"name": "Tester"},
-            "url": "https://github.com/test_owner/test_repo/commit/def789"
+            "url": "https://github.com/test_owner/test_repo/commit/9b8e7d6c5a4f3e2d1c0b9a8f7e6d5c4b3a2f1e0d"
         }
     ],
     "pusher": {"name": "tester"}
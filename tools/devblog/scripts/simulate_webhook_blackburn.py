@@ -181,7 +181,7 @@ def send_webhook(payload: dict, webhook_secret: str, server_url: str = "http://l
         print(f"Response Status:     {response.status_code}")
         print()
         
-        if response.status_code == 200:
+        if response.status_code in (200, 202):
             print("✅ Webhook received successfully!")
             print()
             try:
@@ -199,7 +199,7 @@ def send_webhook(payload: dict, webhook_secret: str, server_url: str = "http://l
         print("💡 Check the server logs for detailed processing information")
         print("="*70 + "\n")
         
-        return response.status_code == 200
+        return response.status_code in (200, 202)
         
     except requests.exceptions.ConnectionError:
         print("❌ Cannot connect to server at {}".format(server_url))
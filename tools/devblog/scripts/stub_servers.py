@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+Local stand-ins for the Telegram Bot API and the OpenAI Responses API, for load tests.
+
+One server answers both:
+    POST /bot{token}/sendMessage, /bot{token}/editMessageText   (TELEGRAM_API_BASE=http://HOST:PORT)
+    POST /v1/responses                                          (OPENAI_API_BASE=http://HOST:PORT/v1)
+with configurable latency, 5xx error rate and 429 rate per API. The OpenAI stub echoes the
+load-test markers (see scripts/load_test.py) found in the prompt, so every delivered post can
+be traced back to its pushes.
+
+Control endpoints used by load_test.py:
+    GET  /_stub/deliveries?since=N   delivered messages from index N: [{"at", "chat_id", "markers"}]
+    GET  /_stub/stats                request/error counters per API
+    POST /_stub/reset                forget deliveries and counters
+
+Usage:
+    python scripts/stub_servers.py [--port 8081] [--telegram-latency 0.05] [--telegram-429-rate 0.02]
+        [--openai-latency 1.5] [--openai-error-rate 0.01]
+"""
+import re
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Same pattern as scripts/load_test.py builds: L<run>-<project>-<push>
+MARKER_RE = re.compile(r"\bL[0-9a-f]+-\d+-\d+\b")
+
+
+class StubConfig:
+    def __init__(self, latency: float, jitter: float, error_rate: float, rate_429: float, retry_after: float):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+
+    async def delay(self) -> None:
+        latency = self.latency * (1 + random.uniform(-self.jitter, self.jitter))
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    def fault(self) -> str:
+        """"429", "error" or "" for a normal answer."""
+        roll = random.random()
+        if roll < self.rate_429:
+            return "429"
+        if roll < self.rate_429 + self.error_rate:
+            return "error"
+        return ""
+
+
+def create_app(telegram: StubConfig, openai: StubConfig) -> FastAPI:
+    app = FastAPI(title="devblog stubs")
+    deliveries: List[Dict[str, Any]] = []
+    counters: Counter = Counter()
+    next_message_id = iter(range(1, 1 << 62))
+
+    @app.post("/bot{token}/{method}")
+    async def telegram_method(token: str, method: str, request: Request):
+        body = await request.json()
+        counters[f"telegram.{method}"] += 1
+        await telegram.delay()
+        fault = telegram.fault()
+        if fault == "429":
+            counters["telegram.429"] += 1
+            return JSONResponse(status_code=429, content={
+                "ok": False, "error_code": 429, "description": "Too Many Requests: retry later",
+                "parameters": {"retry_after": telegram.retry_after},
+            })
+        if fault == "error":
+            counters["telegram.5xx"] += 1
+            return JSONResponse(status_code=502, content={"ok": False, "description": "Bad Gateway"})
+        message_id = body.get("message_id") or next(next_message_id)
+        deliveries.append({
+            "at": time.time(),
+            "chat_id": str(body.get("chat_id")),
+            "method": method,
+            "markers": sorted(set(MARKER_RE.findall(body.get("text") or ""))),
+        })
+        return {"ok": True, "result": {"message_id": message_id, "chat": {"id": body.get("chat_id")}}}
+
+    @app.post("/v1/responses")
+    async def openai_responses(request: Request):
+        body = await request.json()
+        counters["openai.responses"] += 1
+        await openai.delay()
+        fault = openai.fault()
+        if fault == "429":
+            counters["openai.429"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"Retry-After": str(openai.retry_after)},
+                content={"error": {"message": "Rate limit reached", "type": "requests"}},
+            )
+        if fault == "error":
+            counters["openai.5xx"] += 1
+            return JSONResponse(status_code=500, content={"error": {"message": "Server error"}})
+        prompt = body.get("input") or ""
+        markers = sorted(set(MARKER_RE.findall(prompt)))
+        text = "🚀 <b>Stub post</b>\n" + "\n".join(f"• {m}" for m in markers) + "\n#loadtest"
+        return {
+            "output": [{"type": "message", "content": [{"type": "output_text", "text": text}]}],
+            "usage": {"input_tokens": (len(prompt) + 3) // 4, "output_tokens": (len(text) + 3) // 4},
+        }
+
+    @app.get("/_stub/deliveries")
+    async def stub_deliveries(since: int = 0):
+        return {"next": len(deliveries), "deliveries": deliveries[since:]}
+
+    @app.get("/_stub/stats")
+    async def stub_stats():
+        return dict(counters)
+
+    @app.post("/_stub/reset")
+    async def stub_reset():
+        deliveries.clear()
+        counters.clear()
+        return {"status": "reset"}
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Telegram and OpenAI stub servers for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--jitter", type=float, default=0.3, help="Latency jitter, fraction of the latency (uniform +-)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry_after / Retry-After of 429 answers, seconds")
+    for api, latency in (("telegram", 0.05), ("openai", 1.0)):
+        parser.add_argument(f"--{api}-latency", type=float, default=latency, help=f"{api} response latency, seconds")
+        parser.add_argument(f"--{api}-error-rate", type=float, default=0.0, help=f"Share of {api} calls answered with 5xx")
+        parser.add_argument(f"--{api}-429-rate", type=float, default=0.0, help=f"Share of {api} calls answered with 429")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(
+        StubConfig(args.telegram_latency, args.jitter, args.telegram_error_rate, args.telegram_429_rate, args.retry_after),
+        StubConfig(args.openai_latency, args.jitter, args.openai_error_rate, args.openai_429_rate, args.retry_after),
+    )
+    print(f"Stubs on http://{args.host}:{args.port}: set TELEGRAM_API_BASE=http://{args.host}:{args.port} "
+          f"and OPENAI_API_BASE=http://{args.host}:{args.port}/v1 for the server and worker")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+"""
+Upgrade an existing database to the current schema.
+
+`create_all` (run by the app and the worker on start) only creates missing tables.
+Databases created by earlier versions also need new columns, indexes and unique
+constraints, and their commit_events rebuilt (hashes stored as 20 bytes, raw payloads
+moved to commit_payloads). Back up the database, stop the app and the worker, then run:
+
+    python scripts/upgrade_db.py [--check]
+
+Running it again on an upgraded database changes nothing.
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.session import engine
+from app.db.upgrade import pending_upgrades, upgrade
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upgrade the database schema in place")
+    parser.add_argument("--check", action="store_true", help="Only list pending changes (exit code 1 if any)")
+    args = parser.parse_args()
+
+    pending = pending_upgrades(engine)
+    if args.check:
+        print("\n".join(pending) if pending else "Schema is up to date")
+        sys.exit(1 if pending else 0)
+    print(upgrade(engine))
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+"""
+Webhook job worker.
+
+Drains the `webhook_jobs` queue filled by POST /webhook/github: leases ready jobs
+(one per project at a time, so per-project order is kept), processes them with
+CommitProcessor as concurrent asyncio tasks and retries failures with backoff.
+Projects with a coalescing window get one "flush" job per burst of pushes, which
+publishes the collected commits once the window has elapsed. Projects in
+post_mode="daily_digest" get their digest posted every DIGEST_PERIOD_SEC.
+
+Usage:
+    python scripts/worker.py [--concurrency N] [--once]
+"""
+import sys
+import time
+import uuid
+import socket
+import signal
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Optional, Set
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.session import AsyncSessionLocal, async_engine, engine
+from app.db.base import Base
+from app.db.upgrade import pending_upgrades
+from app.models import WebhookJob
+from app.services.commit_processor import CommitProcessor
+from app.services.job_queue import JobQueue
+from app.services.digest import run_due_digests
+from app.services.hedged_posts import hedged_posts
+from app.services.project_cache import project_cache
+from app.integrations.http_client import start_shared_clients, close_shared_clients
+from app.core.logger import get_logger, bind_log_context, add_log_context
+from app.core.config import settings
+from app.core.metrics import mark_process_dead
+from app.core.timing import collect_timings, log_if_slow
+
+logger = get_logger(__name__)
+
+STATS_LOG_INTERVAL_SEC = 30
+PRUNE_INTERVAL_SEC = 3600
+
+
+async def process_job(job_id: int, worker_id: str) -> None:
+    """Process a single leased job, logging its stages when it is slow."""
+    with bind_log_context(job_id=job_id):
+        heartbeat = asyncio.create_task(_renew_lease(job_id, worker_id), name=f"heartbeat-{job_id}")
+        try:
+            with collect_timings() as timings:
+                await _process_job(job_id)
+        finally:
+            heartbeat.cancel()
+        log_if_slow(f"job {job_id}", timings)
+
+
+async def _renew_lease(job_id: int, worker_id: str) -> None:
+    """Keep the job's lease while it runs, so no other worker leases it (and sends its post) again."""
+    while True:
+        await asyncio.sleep(settings.WORKER_HEARTBEAT_SEC)
+        try:
+            async with AsyncSessionLocal() as db:
+                if not await JobQueue(db).renew(job_id, worker_id):
+                    logger.warning("Lease of job %s was lost", job_id)
+                    return
+        except Exception as exc:
+            # A missed beat is not fatal: the lease still has WORKER_LEASE_SEC - WORKER_HEARTBEAT_SEC left
+            logger.warning("Could not renew lease of job %s: %s", job_id, exc)
+
+
+async def _process_job(job_id: int) -> None:
+    """Process a single leased job in its own DB session."""
+    async with AsyncSessionLocal() as db:
+        queue = JobQueue(db)
+        job = await db.get(WebhookJob, job_id)
+        if not job:
+            return
+        # Keep the id of the webhook request that queued the job, so both ends can be correlated
+        add_log_context(project_id=job.project_id, request_id=(job.payload or {}).get("request_id") or f"job-{job.id}")
+
+        project = await project_cache.get_by_id(db, job.project_id)
+        if not project:
+            await queue.fail(job, "Project not found", retry=False)
+            return
+
+        wait_sec = (job.started_at - job.created_at).total_seconds() if job.started_at and job.created_at else 0.0
+        logger.info("Processing job %s for project %s (attempt %s, waited %.1fs)", job.id, project.id, job.attempts, wait_sec)
+
+        try:
+            payload = job.payload or {}
+            processor = CommitProcessor(db, project)
+            if job.kind == "flush":
+                # Coalescing window elapsed: one post for everything collected
+                result = await processor.publish_coalesced(payload.get("commit_ids", []))
+            else:
+                result = await processor.process_webhook_commits(
+                    payload.get("commits", []), payload.get("branch", ""), coalesce=True
+                )
+        except Exception as exc:
+            await db.rollback()
+            logger.exception("Job %s raised: %s", job.id, exc)
+            await queue.fail(job, str(exc))
+            return
+
+        if result.get("error"):
+            # The post stays in "error"; the retried job takes it over and sends it again
+            await queue.fail(job, result["error"])
+            return
+
+        await queue.complete(job, result)
+        logger.info("Job %s done: %s", job.id, result)
+
+
+async def run(concurrency: int, once: bool = False) -> None:
+    """Lease and process jobs until stopped (or until the queue is empty with --once)."""
+    Base.metadata.create_all(bind=engine)
+    pending = pending_upgrades(engine)
+    if pending:
+        logger.error("Database schema is outdated (%s): run scripts/upgrade_db.py", ", ".join(pending))
+
+    if settings.DATABASE_URL.startswith("sqlite") and concurrency > 1:
+        # SQLite serializes writers; parallel jobs would only fail with "database is locked"
+        logger.warning("SQLite database detected, limiting worker concurrency to 1")
+        concurrency = 1
+
+    worker_id = f"{socket.gethostname()}:{uuid.uuid4().hex[:8]}"
+    stopping = asyncio.Event()
+
+    def _stop(signum: int) -> None:
+        logger.info("Received signal %s, finishing in-flight jobs...", signum)
+        stopping.set()
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, _stop, signum)
+
+    await start_shared_clients()
+    logger.info("Worker %s started (concurrency=%s)", worker_id, concurrency)
+    in_flight: Set[asyncio.Task] = set()
+    last_stats = 0.0
+    last_prune = 0.0
+    last_digest_check = 0.0
+    digest_task: Optional[asyncio.Task] = None
+
+    while not stopping.is_set():
+        in_flight = {t for t in in_flight if not t.done()}
+        free = concurrency - len(in_flight)
+
+        jobs = []
+        if free > 0:
+            async with AsyncSessionLocal() as db:
+                queue = JobQueue(db)
+                jobs = await queue.lease(worker_id, free)
+                if time.monotonic() - last_stats >= STATS_LOG_INTERVAL_SEC:
+                    last_stats = time.monotonic()
+                    logger.info("Queue stats: %s", await queue.stats())
+                if time.monotonic() - last_prune >= PRUNE_INTERVAL_SEC:
+                    last_prune = time.monotonic()
+                    logger.info("Pruned finished jobs and deliveries: %s", await queue.prune())
+
+        if (digest_task is None or digest_task.done()) and not once \
+                and time.monotonic() - last_digest_check >= settings.DIGEST_CHECK_INTERVAL_SEC:
+            last_digest_check = time.monotonic()
+            digest_task = asyncio.create_task(run_due_digests(AsyncSessionLocal), name="digests")
+
+        for job in jobs:
+            in_flight.add(asyncio.create_task(process_job(job.id, worker_id), name=f"job-{job.id}"))
+
+        if not jobs:
+            if once and not in_flight:
+                break
+            # Wake up on poll interval, a finished job (frees a slot) or a stop signal
+            waiters = in_flight | {asyncio.create_task(stopping.wait())}
+            _, pending = await asyncio.wait(
+                waiters, timeout=settings.WORKER_POLL_INTERVAL_SEC, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in pending - in_flight:
+                task.cancel()
+
+    if digest_task is not None:
+        in_flight.add(digest_task)
+    if in_flight:
+        await asyncio.gather(*in_flight, return_exceptions=True)
+    await hedged_posts.drain(settings.AI_HEDGE_DEADLINE_SEC)
+    await close_shared_clients()
+    await async_engine.dispose()
+    mark_process_dead()
+    logger.info("Worker %s stopped", worker_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process queued GitHub webhook jobs")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.WORKER_CONCURRENCY,
+        help=f"Max jobs processed in parallel (default: {settings.WORKER_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Exit when there are no ready jobs left"
+    )
+
+    args = parser.parse_args()
+    asyncio.run(run(max(1, args.concurrency), once=args.once))
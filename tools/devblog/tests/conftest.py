@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+# Use a throwaway SQLite file for in-process app tests (must be set before app.core.config is imported).
+# A file, not sqlite:// - the sync and async engines must see the same database.
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+
+# Imported after DATABASE_URL is set: app.db reads it at import time
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+
+
+@pytest.fixture
+def memory_db():
+    """Coroutine factory: a fresh in-memory database with all tables, as an async_sessionmaker.
+
+    Call it inside the test's event loop (`factory = await memory_db()`); the engine is
+    `factory.kw["bind"]`. With `statements`, every SQL statement sent to the database is appended to it.
+    """
+    async def make(statements=None):
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        if statements is not None:
+            event.listen(engine.sync_engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+        return async_sessionmaker(engine, expire_on_commit=False)
+
+    return make
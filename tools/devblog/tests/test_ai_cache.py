@@ -0,0 +1,64 @@
+import asyncio
+
+from app.models import CommitSnapshot
+from app.services.ai_cache import AIPostCache
+
+COMMITS = [CommitSnapshot(1, "a" * 40, "Dev", "feat: add  thing\n\nbody", None, "main")]
+
+
+async def make_cache(memory_db, **kwargs):
+    factory = await memory_db()
+    return AIPostCache(session_factory=factory, **kwargs), factory.kw["bind"]
+
+
+def test_concurrent_misses_share_one_generation_and_hits_survive_restart(memory_db):
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "Post"
+
+    async def scenario():
+        cache, engine = await make_cache(memory_db)
+        key = cache.key_for("gpt-4o-mini", "en", "Ai", COMMITS)
+        # branch and message body do not change the key; the model does
+        assert key == cache.key_for("gpt-4o-mini", "en", "Ai", [COMMITS[0]._replace(branch="dev", message="feat: add thing")])
+        assert key != cache.key_for("gpt-4o", "en", "Ai", COMMITS)
+
+        results = await asyncio.gather(*(cache.get_or_generate(key, "gpt-4o-mini", generate) for _ in range(5)))
+        assert results == ["Post"] * 5 and len(calls) == 1
+        assert await cache.get_or_generate(key, "gpt-4o-mini", generate) == "Post"
+
+        # a new process (empty memory tier) is served from the DB
+        restarted = AIPostCache(session_factory=cache.session_factory)
+        assert await restarted.get_or_generate(key, "gpt-4o-mini", generate) == "Post"
+        assert len(calls) == 1
+
+        stats = cache.stats()
+        assert (stats["misses"], stats["coalesced"], stats["memory_hits"]) == (1, 4, 1)
+        assert stats["saved_sec"] >= 0.05
+        assert restarted.stats()["db_hits"] == 1
+        await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_expired_and_failed_generations_are_not_served(memory_db):
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        return None if len(calls) == 1 else f"Post {len(calls)}"
+
+    async def scenario():
+        cache, engine = await make_cache(memory_db, ttl_sec=0)
+        key = cache.key_for("gpt-4o-mini", "en", "Ai", COMMITS)
+
+        assert await cache.get_or_generate(key, "gpt-4o-mini", generate) is None  # failure is not cached
+        assert await cache.get_or_generate(key, "gpt-4o-mini", generate) == "Post 2"
+        assert await cache.get_or_generate(key, "gpt-4o-mini", generate) == "Post 3"  # TTL 0: expired at once
+        assert cache.stats()["misses"] == 3
+        await engine.dispose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,71 @@
+import json
+import re
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.projects import check_commit_rules
+from app.core.commit_filter import CommitFilter, DEFAULT_FILTER, compile_commit_filter, get_commit_filter
+
+
+def commit(author, message):
+    return {"id": "a" * 40, "message": message, "author": {"name": author}, "timestamp": None}
+
+
+def test_branch_globs():
+    rules = CommitFilter(branches=["main", "release/*"], ignore_branches=["release/old-*"])
+
+    assert rules.accepts_branch("main")
+    assert rules.accepts_branch("Release/1.2")
+    assert not rules.accepts_branch("release/old-1")
+    assert not rules.accepts_branch("feature/x")
+    assert DEFAULT_FILTER.accepts_branch("anything")
+
+
+def test_authors_messages_and_min_length():
+    rules = CommitFilter(
+        ignore_authors=["dependabot*", "*[bot]"],
+        ignore_messages=[r"^Merge (branch|pull request)", r"\[skip ci\]"],
+        min_length=5,
+    )
+    commits = [
+        commit("dependabot[bot]", "chore: bump x"),
+        commit("renovate[bot]", "chore: bump y"),
+        commit("Dev", "Merge branch 'main'"),
+        commit("Dev", "feat: thing [skip ci]"),
+        commit("Dev", "wip"),
+        commit("Dev", "feat: real change"),
+    ]
+
+    assert [c["message"] for c in rules.select(commits)] == ["feat: real change"]
+    assert DEFAULT_FILTER.select(commits) is commits
+
+
+def test_rules_are_compiled_once_and_invalid_rules_raise():
+    rules_json = json.dumps({"authors": ["alice"], "messages": ["^feat"]}, sort_keys=True)
+
+    rules = get_commit_filter(rules_json)
+
+    assert get_commit_filter(rules_json) is rules
+    assert rules.accepts("Alice", "feat: x") and not rules.accepts("bob", "feat: x")
+    assert compile_commit_filter({"aliases": {"hotfix": "fix"}}).accepts_branch("dev")
+    with pytest.raises(re.error):
+        compile_commit_filter({"messages": ["("]})
+
+
+@pytest.mark.parametrize("rules", [
+    {"branches": "main"},
+    {"ignore_authors": ["dependabot*", 7]},
+    {"messages": "^feat"},
+    {"min_length": "5"},
+    {"allowed_types": "feat"},
+    {"aliases": ["hotfix", "fix"]},
+])
+def test_rules_of_the_wrong_type_are_rejected_on_save(rules):
+    # A bare string would otherwise compile to one pattern per character ("m", "a", ...)
+    with pytest.raises(HTTPException) as exc_info:
+        check_commit_rules(rules)
+
+    assert exc_info.value.status_code == 400
+    with pytest.raises(ValueError):
+        CommitFilter(branches="main")
@@ -0,0 +1,33 @@
+import json
+
+from app.core.commit_parser import CommitParser, ParsedCommit, get_commit_parser, DEFAULT_PARSER
+
+
+def test_header_type_scope_and_breaking_are_parsed():
+    parser = CommitParser()
+
+    assert parser.parse("feat(api): add tokens") == ParsedCommit("feat", "api", False, "add tokens")
+    assert parser.parse("Fix!: drop py3.7") == ParsedCommit("fix", None, True, "drop py3.7")
+    assert parser.parse("refactor: split module\n\nBREAKING CHANGE: new import path").breaking is True
+    assert parser.parse("Feature(ui): dark mode").type == "feat"  # default alias
+    assert parser.parse("Update readme") == ParsedCommit(None, None, False, "Update readme")
+
+
+def test_free_form_messages_get_a_display_type_from_the_leading_verb():
+    parser = CommitParser()
+
+    assert parser.display_type(parser.parse("Added retries to the client")) == "feat"
+    assert parser.display_type(parser.parse("Merge branch main")) is None
+    assert parser.is_announced(None, "wip") is False
+    assert parser.is_announced("fix", "fix: x") is True
+
+
+def test_project_rules_are_compiled_once_per_rule_set():
+    rules = json.dumps({"aliases": {"hotfix": "fix"}, "allowed_types": ["feat", "fix"]}, sort_keys=True)
+
+    parser = get_commit_parser(rules)
+
+    assert get_commit_parser(rules) is parser
+    assert get_commit_parser(None) is DEFAULT_PARSER
+    assert parser.parse("hotfix: restart loop").type == "fix"
+    assert parser.is_announced("docs", "docs: x") is False
@@ -0,0 +1,375 @@
+import asyncio
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, text, update
+
+from app.core.config import settings
+from app.integrations.telegram import TelegramService
+from app.models import Project, ProjectSnapshot, Post, CommitEvent, CommitPayload, WebhookJob, DigestWatermark
+from app.services.commit_processor import CommitProcessor
+from app.services.digest import due_digest_projects
+from app.services.payload_store import PayloadStore
+from app.services.seen_commits import seen_commits
+
+
+async def make_project(memory_db, statements=None, **fields):
+    seen_commits.clear()
+    db = (await memory_db(statements))()
+    project = Project(name="Proc", repo_full_name="owner/proc", telegram_chat_id="@proc", **fields)
+    db.add(project)
+    await db.commit()
+    return db, ProjectSnapshot.from_model(project)
+
+
+def commits(n, prefix="a"):
+    return [
+        {"id": f"{prefix}{i:039x}", "message": f"feat: change {i}", "author": {"name": "Dev"},
+         "timestamp": "2024-01-01T00:00:00Z"}
+        for i in range(n)
+    ]
+
+
+async def count(db, model):
+    return await db.scalar(select(func.count()).select_from(model))
+
+
+async def sent_ok(self, text, parse_mode="HTML"):
+    return {"success": True, "message_id": "1"}
+
+
+def test_known_commits_are_not_announced_again(monkeypatch, memory_db):
+    sent = []
+
+    async def fake_send(self, text, parse_mode="HTML"):
+        sent.append(text)
+        return {"success": True, "message_id": str(len(sent))}
+
+    monkeypatch.setattr(TelegramService, "send_message", fake_send)
+
+    async def scenario():
+        db, project = await make_project(memory_db)
+
+        first = await CommitProcessor(db, project).process_webhook_commits(commits(3), "main")
+        # same commits pushed to another branch, plus one new commit
+        again = await CommitProcessor(db, project).process_webhook_commits(commits(3) + commits(1, prefix="b"), "feature")
+        seen_commits.clear()
+        # without the in-memory prefilter the unique index still rejects known commits
+        third = await CommitProcessor(db, project).process_webhook_commits(commits(3), "main")
+
+        assert first["message_sent"] is True
+        assert (again["processed"], again["duplicates"]) == (1, 3)
+        assert (third["processed"], third["duplicates"]) == (0, 3)
+        assert len(sent) == 2
+        assert "change 0" in sent[1] and "change 1" not in sent[1]
+        assert await count(db, CommitEvent) == 4
+        assert await count(db, Post) == 2
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_post_is_retried(monkeypatch, memory_db):
+    results = [{"success": False, "error": "boom"}, {"success": True, "message_id": "7"}]
+
+    async def fake_send(self, text, parse_mode="HTML"):
+        return results.pop(0)
+
+    monkeypatch.setattr(TelegramService, "send_message", fake_send)
+
+    async def scenario():
+        db, project = await make_project(memory_db)
+
+        failed = await CommitProcessor(db, project).process_webhook_commits(commits(2), "main")
+        # the retried job sees the commits as known and takes over their failed post
+        retry = await CommitProcessor(db, project).process_webhook_commits(commits(2), "main")
+        done = await CommitProcessor(db, project).process_webhook_commits(commits(2), "main")
+
+        assert (failed["message_sent"], failed["error"]) == (False, "boom")
+        assert (retry["message_sent"], retry["retried"]) == (True, 1)
+        assert "retried" not in done
+        post = (await db.scalars(select(Post))).one()
+        assert (post.status, post.telegram_message_id) == ("success", "7")
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_post_retries_stop_at_the_attempt_and_age_limits(monkeypatch, memory_db):
+    monkeypatch.setattr(settings, "POST_MAX_SEND_ATTEMPTS", 2)
+    calls = []
+
+    async def always_fails(self, text, parse_mode="HTML"):
+        calls.append(text)
+        return {"success": False, "error": "boom"}
+
+    monkeypatch.setattr(TelegramService, "send_message", always_fails)
+
+    async def scenario():
+        db, project = await make_project(memory_db)
+        for _ in range(4):
+            await CommitProcessor(db, project).process_webhook_commits(commits(1), "main")
+
+        post = (await db.scalars(select(Post))).one()
+        assert (len(calls), post.status, post.send_attempts) == (2, "error", 2)
+
+        # with attempts left, commits stored long ago are not announced again either
+        await db.execute(update(Post).values(send_attempts=1))
+        await db.execute(update(CommitEvent).values(created_at=datetime.utcnow() - timedelta(days=30)))
+        await db.commit()
+        late = await CommitProcessor(db, project).process_webhook_commits(commits(1), "main")
+
+        assert "retried" not in late and len(calls) == 2
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_large_push_costs_a_handful_of_statements(monkeypatch, memory_db):
+    monkeypatch.setattr(TelegramService, "send_message", sent_ok)
+
+    async def scenario():
+        statements = []
+        db, project = await make_project(memory_db, statements)
+        statements.clear()
+
+        result = await CommitProcessor(db, project).process_webhook_commits(commits(500), "main")
+
+        assert result["processed"] == 500
+        # payload + commit INSERT per 200-commit chunk, post INSERT, commit link UPDATE and post UPDATE; no per-row reloads
+        assert len(statements) <= 9, statements
+        assert not [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+        types = await db.execute(select(CommitEvent.commit_type, func.count()).group_by(CommitEvent.commit_type))
+        assert types.all() == [("feat", 500)]
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_commits_rejected_by_project_rules_are_never_written(memory_db):
+    async def scenario():
+        statements = []
+        db, project = await make_project(memory_db, 
+            statements,
+            commit_rules={"branches": ["main"], "ignore_authors": ["*[bot]"], "allowed_types": ["feat"]},
+        )
+        statements.clear()
+        processor = CommitProcessor(db, project)
+
+        ignored_branch = await processor.process_webhook_commits(commits(5), "feature/x")
+        bot_push = [{**c, "author": {"name": "dependabot[bot]"}} for c in commits(5)]
+        ignored_author = await processor.process_webhook_commits(bot_push, "main")
+        chores = [{**c, "message": "chore: x"} for c in commits(5, prefix="b")]
+        ignored_type = await processor.process_webhook_commits(chores, "main")
+
+        assert ignored_branch == {"processed": 0, "ignored": 5, "message_sent": False}
+        assert (ignored_author["processed"], ignored_author["ignored"]) == (0, 5)
+        assert (ignored_type["processed"], ignored_type["ignored"]) == (0, 5)
+        assert not [sql for sql in statements if sql.lstrip().upper().startswith("INSERT")]
+        assert await count(db, CommitEvent) == 0
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_raw_payloads_are_stored_compressed_and_deduplicated(monkeypatch, memory_db):
+    monkeypatch.setattr(TelegramService, "send_message", sent_ok)
+
+    async def scenario():
+        db, project = await make_project(memory_db)
+        batch = commits(2) + [{"id": "not-a-sha", "message": "feat: bogus"}]
+
+        result = await CommitProcessor(db, project).process_webhook_commits(batch, "main")
+
+        assert result["processed"] == 2
+        stored = (await db.scalars(select(CommitEvent).order_by(CommitEvent.id))).all()
+        assert [event.commit_hash for event in stored] == [c["id"] for c in batch[:2]]
+        raw_hash = await db.scalar(text("SELECT commit_hash FROM commit_events ORDER BY id"))
+        assert raw_hash == bytes.fromhex(batch[0]["id"])
+        assert await PayloadStore(db).get(stored[0].payload_digest) == batch[0]
+        # identical payloads share one row
+        assert await PayloadStore(db).put_many([batch[0], batch[0]]) == [stored[0].payload_digest] * 2
+        assert await count(db, CommitPayload) == 2
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_pushes_within_window_are_coalesced_into_one_post(monkeypatch, memory_db):
+    sent = []
+
+    async def fake_send(self, text, parse_mode="HTML"):
+        sent.append(text)
+        return {"success": True, "message_id": "1"}
+
+    monkeypatch.setattr(TelegramService, "send_message", fake_send)
+
+    async def scenario():
+        db, project = await make_project(memory_db, coalesce_window_sec=60)
+
+        first = await CommitProcessor(db, project).process_webhook_commits(commits(2), "main", coalesce=True)
+        second = await CommitProcessor(db, project).process_webhook_commits(commits(1, prefix="b"), "main", coalesce=True)
+
+        assert sent == []
+        assert first["coalesced_into"] == second["coalesced_into"]
+        job = await db.get(WebhookJob, first["coalesced_into"])
+        assert job.kind == "flush" and len(job.payload["commit_ids"]) == 3
+
+        result = await CommitProcessor(db, project).publish_coalesced(job.payload["commit_ids"])
+        # a retried flush does not post again
+        again = await CommitProcessor(db, project).publish_coalesced(job.payload["commit_ids"])
+
+        assert result["message_sent"] is True and again["message_sent"] is False
+        assert len(sent) == 1
+        assert "change 0" in sent[0] and "change 1" in sent[0]
+        post_ids = (await db.scalars(select(CommitEvent.post_id))).all()
+        assert len(set(post_ids)) == 1 and None not in post_ids
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_digest_mode_posts_once_from_the_watermark(monkeypatch, memory_db):
+    sent = []
+
+    async def fake_send(self, text, parse_mode="HTML"):
+        sent.append(text)
+        return {"success": True, "message_id": str(len(sent))}
+
+    monkeypatch.setattr(TelegramService, "send_message", fake_send)
+    monkeypatch.setattr(settings, "DIGEST_WATERMARK_LAG_SEC", 0)
+
+    async def scenario():
+        statements = []
+        db, project = await make_project(memory_db, statements, post_mode="daily_digest")
+
+        stored = await CommitProcessor(db, project).process_webhook_commits(commits(2), "main")
+        assert stored["digest"] is True and sent == []
+
+        first = await CommitProcessor(db, project).publish_digest()
+        await CommitProcessor(db, project).process_webhook_commits(commits(1, prefix="b"), "main")
+        statements.clear()
+        second = await CommitProcessor(db, project).publish_digest()
+        empty = await CommitProcessor(db, project).publish_digest()
+
+        assert (first["digested"], second["digested"], empty["digested"]) == (2, 1, 0)
+        assert len(sent) == 2
+        assert "change 1" in sent[0] and "change 1" not in sent[1]
+        # the second run only reads rows past the watermark
+        scans = [sql for sql in statements if "FROM commit_events" in sql]
+        assert scans and all("commit_events.id >" in sql for sql in scans)
+        watermark = await db.get(DigestWatermark, project.id)
+        assert watermark.last_commit_id == await db.scalar(select(func.max(CommitEvent.id)))
+
+        # a run that lost the race for the watermark (e.g. another worker) does not post
+        await CommitProcessor(db, project).process_webhook_commits(commits(1, prefix="c"), "main")
+        processor = CommitProcessor(db, project)
+        advance = processor._advance_watermark
+        async def lost_race(old, new):
+            return await advance(old - 1, new)
+        processor._advance_watermark = lost_race
+        raced = await processor.publish_digest()
+        assert raced["message_sent"] is False and len(sent) == 2
+        assert (await db.get(DigestWatermark, project.id, populate_existing=True)).last_commit_id == watermark.last_commit_id
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_digest_claimed_by_a_crashed_run_is_recovered(monkeypatch, memory_db):
+    sent = []
+
+    async def fake_send(self, text, parse_mode="HTML"):
+        sent.append(text)
+        return {"success": True, "message_id": str(len(sent))}
+
+    monkeypatch.setattr(TelegramService, "send_message", fake_send)
+
+    async def scenario():
+        db, project = await make_project(memory_db, post_mode="daily_digest")
+        await CommitProcessor(db, project).process_webhook_commits(commits(2), "main")
+
+        # the worker dies between claiming the digest and sending it
+        _, post_id, _ = await CommitProcessor(db, project).claim_digest()
+        assert project.id in await due_digest_projects(db)
+        busy = await CommitProcessor(db, project).publish_digest()
+        assert busy["in_progress"] == post_id and sent == []
+
+        monkeypatch.setattr(settings, "WORKER_LEASE_SEC", 0)
+        monkeypatch.setattr(settings, "DIGEST_BATCH_MAX_WAIT_SEC", 0)
+        monkeypatch.setattr(settings, "DIGEST_BATCH_POLL_SEC", 0)
+        recovered = await CommitProcessor(db, project).publish_digest()
+
+        assert (recovered["recovered"], recovered["message_sent"]) == (post_id, True)
+        assert len(sent) == 1 and "change 0" in sent[0] and "change 1" in sent[0]
+        assert (await db.get(Post, post_id, populate_existing=True)).status == "success"
+        assert project.id not in await due_digest_projects(db)
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_failing_digest_gives_up_and_push_posts_are_not_taken_for_digests(monkeypatch, memory_db):
+    monkeypatch.setattr(settings, "POST_MAX_SEND_ATTEMPTS", 2)
+    monkeypatch.setattr(settings, "DIGEST_WATERMARK_LAG_SEC", 0)
+
+    async def always_fails(self, text, parse_mode="HTML"):
+        return {"success": False, "error": "boom"}
+
+    monkeypatch.setattr(TelegramService, "send_message", always_fails)
+
+    async def scenario():
+        db, project = await make_project(memory_db)
+        # a per-push post that failed before the project switched to daily digests
+        await CommitProcessor(db, project).process_webhook_commits(commits(1, prefix="c"), "main")
+        project = replace(project, post_mode="daily_digest")
+
+        await CommitProcessor(db, project).process_webhook_commits(commits(1, prefix="d"), "main")
+        first = await CommitProcessor(db, project).publish_digest()
+        assert "recovered" not in first and first["error"] == "boom"
+        digest_id = await db.scalar(select(Post.id).where(Post.kind == "digest"))
+
+        retried = await CommitProcessor(db, project).publish_digest()
+        assert retried["recovered"] == digest_id and retried["message_sent"] is False
+
+        # out of attempts: the failed digest no longer holds back new commits
+        monkeypatch.setattr(TelegramService, "send_message", sent_ok)
+        await CommitProcessor(db, project).process_webhook_commits(commits(1, prefix="e"), "main")
+        third = await CommitProcessor(db, project).publish_digest()
+
+        assert "recovered" not in third and third["message_sent"] is True
+        posts = (await db.execute(select(Post.kind, Post.status).order_by(Post.id))).all()
+        assert posts == [("push", "error"), ("digest", "error"), ("digest", "success")]
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_digest_picks_up_a_lower_id_committed_late(monkeypatch, memory_db):
+    sent = []
+
+    async def fake_send(self, text, parse_mode="HTML"):
+        sent.append(text)
+        return {"success": True, "message_id": str(len(sent))}
+
+    monkeypatch.setattr(TelegramService, "send_message", fake_send)
+
+    async def scenario():
+        db, project = await make_project(memory_db, post_mode="daily_digest")
+        await CommitProcessor(db, project).process_webhook_commits(commits(3), "main")
+        # commit 1 stands for a concurrent insert whose transaction commits after the digest ran
+        first_id = await db.scalar(select(func.min(CommitEvent.id)))
+        late = (await db.execute(select(CommitEvent.__table__).where(CommitEvent.id == first_id))).mappings().one()
+        await db.execute(delete(CommitEvent).where(CommitEvent.id == first_id))
+        await db.commit()
+
+        await CommitProcessor(db, project).publish_digest()
+        await db.execute(insert(CommitEvent.__table__).values(**late))
+        await db.commit()
+        second = await CommitProcessor(db, project).publish_digest()
+
+        assert second["digested"] == 1 and second["message_sent"] is True
+        assert "change 0" in sent[1] and "change 0" not in sent[0]
+        await db.close()
+
+    asyncio.run(scenario())
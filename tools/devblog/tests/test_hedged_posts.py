@@ -0,0 +1,68 @@
+import time
+import asyncio
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.integrations.telegram import TelegramService
+from app.models import Project, ProjectSnapshot, Post
+from app.services.commit_processor import CommitProcessor
+from app.services.content_generator import ContentGenerator
+from app.services.hedged_posts import hedged_posts
+from app.services.seen_commits import seen_commits
+
+
+def push(prefix):
+    return [{"id": f"{prefix}{0:039x}", "message": "feat: hedged change", "author": {"name": "Dev"},
+             "timestamp": "2024-01-01T00:00:00Z"}]
+
+
+def test_template_goes_out_first_and_is_replaced_by_the_ai_text_in_time(monkeypatch, memory_db):
+    monkeypatch.setattr(settings, "AI_HEDGED_POSTS", True)
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(hedged_posts, "deadline_sec", 0.2)
+    calls = []
+
+    async def fake_send(self, text, parse_mode="HTML"):
+        calls.append(("send", text))
+        return {"success": True, "message_id": str(len(calls))}
+
+    async def fake_edit(self, message_id, text, parse_mode="HTML"):
+        calls.append(("edit", message_id, text))
+        return {"success": True, "message_id": message_id}
+
+    async def slow_ai(self, commits):
+        await asyncio.sleep(0.1 if commits[0].commit_hash.startswith("a") else 0.5)
+        return "AI post"
+
+    monkeypatch.setattr(TelegramService, "send_message", fake_send)
+    monkeypatch.setattr(TelegramService, "edit_message", fake_edit)
+    monkeypatch.setattr(ContentGenerator, "generate_ai", slow_ai)
+
+    async def scenario():
+        seen_commits.clear()
+        factory = await memory_db()
+        monkeypatch.setattr(hedged_posts, "session_factory", factory)
+        async with factory() as db:
+            project = Project(name="Hedge", repo_full_name="owner/hedge", telegram_chat_id="@hedge", ai_enabled=True)
+            db.add(project)
+            await db.commit()
+            snapshot = ProjectSnapshot.from_model(project)
+
+            started = time.monotonic()
+            result = await CommitProcessor(db, snapshot).process_webhook_commits(push("a"), "main")
+            # the post is out before the (0.1s) AI call finishes
+            assert result["message_sent"] is True and time.monotonic() - started < 0.1
+            assert calls[0][0] == "send" and "hedged change" in calls[0][1]
+
+            # this one's AI text misses the 0.2s deadline
+            await CommitProcessor(db, snapshot).process_webhook_commits(push("b"), "main")
+            await hedged_posts.drain(1)
+
+            assert calls[2:] == [("edit", "1", "AI post")]
+            posts = (await db.scalars(select(Post).order_by(Post.id))).all()
+            assert (posts[0].content, posts[0].edited_at is not None) == ("AI post", True)
+            assert posts[1].content == calls[1][1] and posts[1].edited_at is None
+        await factory.kw["bind"].dispose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,158 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.models import Project, WebhookJob, WebhookDelivery
+from app.services.job_queue import JobQueue
+
+
+@asynccontextmanager
+async def make_session(memory_db):
+    factory = await memory_db()
+    async with factory() as db:
+        yield db
+    await factory.kw["bind"].dispose()
+
+
+async def make_project(db, repo):
+    p = Project(name=repo, repo_full_name=repo, telegram_chat_id="@chat")
+    db.add(p)
+    await db.commit()
+    return p
+
+
+def test_lease_keeps_per_project_order(memory_db):
+    async def scenario():
+        async with make_session(memory_db) as db:
+            a = await make_project(db, "owner/a")
+            b = await make_project(db, "owner/b")
+            queue = JobQueue(db)
+            a1 = await queue.enqueue(a.id, {"branch": "main", "commits": []})
+            a2 = await queue.enqueue(a.id, {"branch": "main", "commits": []})
+            b1 = await queue.enqueue(b.id, {"branch": "main", "commits": []})
+
+            # one job per project at a time
+            leased = await queue.lease("w1", 10)
+            assert [j.id for j in leased] == [a1.id, b1.id]
+            assert await queue.lease("w2", 10) == []
+
+            # next job of a project becomes available only after the previous one is done
+            await queue.complete(leased[0], {"processed": 0})
+            assert [j.id for j in await queue.lease("w2", 10)] == [a2.id]
+
+            stats = await queue.stats()
+            assert stats["depth"] == 2
+            assert stats["processing"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_job_is_retried_with_backoff_and_blocks_later_jobs(memory_db):
+    async def scenario():
+        async with make_session(memory_db) as db:
+            a = await make_project(db, "owner/a")
+            queue = JobQueue(db)
+            await queue.enqueue(a.id, {"branch": "main", "commits": []})
+            await queue.enqueue(a.id, {"branch": "main", "commits": []})
+
+            job = (await queue.lease("w1", 1))[0]
+            await queue.fail(job, "boom")
+            assert job.status == "pending"
+            assert job.available_at > datetime.utcnow()
+            # retry is not due yet and the second job must wait behind it
+            assert await queue.lease("w1", 10) == []
+
+            job.available_at = datetime.utcnow() - timedelta(seconds=1)
+            await db.commit()
+            retried = await queue.lease("w1", 10)
+            assert [j.id for j in retried] == [job.id]
+            assert retried[0].attempts == 2
+
+    asyncio.run(scenario())
+
+
+def test_expired_lease_is_released(memory_db):
+    async def scenario():
+        async with make_session(memory_db) as db:
+            a = await make_project(db, "owner/a")
+            queue = JobQueue(db)
+            await queue.enqueue(a.id, {"branch": "main", "commits": []})
+
+            job = (await queue.lease("w1", 1))[0]
+            job.locked_until = datetime.utcnow() - timedelta(seconds=1)
+            await db.commit()
+
+            released = await queue.lease("w2", 1)
+            assert [j.locked_by for j in released] == ["w2"]
+            assert await db.scalar(select(func.count(WebhookJob.id))) == 1
+
+    asyncio.run(scenario())
+
+
+def test_renewed_lease_is_not_taken_by_another_worker(memory_db):
+    async def scenario():
+        async with make_session(memory_db) as db:
+            a = await make_project(db, "owner/a")
+            queue = JobQueue(db)
+            await queue.enqueue(a.id, {"branch": "main", "commits": []})
+
+            job = (await queue.lease("w1", 1))[0]
+            job.locked_until = datetime.utcnow() + timedelta(seconds=1)  # about to expire
+            await db.commit()
+
+            assert await queue.renew(job.id, "w1")
+            await db.refresh(job)
+            assert job.locked_until > datetime.utcnow() + timedelta(seconds=queue.lease_sec - 5)
+            assert await queue.lease("w2", 1) == []
+            # a worker that lost the lease cannot extend it
+            assert not await queue.renew(job.id, "w2")
+
+    asyncio.run(scenario())
+
+
+def test_prune_deletes_only_old_finished_jobs_and_deliveries(memory_db):
+    async def scenario():
+        async with make_session(memory_db) as db:
+            a = await make_project(db, "owner/a")
+            queue = JobQueue(db)
+            old = datetime.utcnow() - timedelta(days=30)
+            db.add_all([
+                WebhookJob(project_id=a.id, payload={}, status="done", finished_at=old),
+                WebhookJob(project_id=a.id, payload={}, status="failed", finished_at=old),
+                WebhookJob(project_id=a.id, payload={}, status="done", finished_at=datetime.utcnow()),
+                WebhookJob(project_id=a.id, payload={}, status="pending", created_at=old),
+                WebhookDelivery(delivery_id="old", project_id=a.id, created_at=old),
+                WebhookDelivery(delivery_id="new", project_id=a.id),
+            ])
+            await db.commit()
+
+            assert await queue.prune(retention_sec=24 * 3600) == {"jobs": 2, "deliveries": 1}
+            assert sorted((await db.scalars(select(WebhookJob.status))).all()) == ["done", "pending"]
+            assert (await db.scalars(select(WebhookDelivery.delivery_id))).all() == ["new"]
+            assert (await queue.stats())["pending"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_flush_job_is_debounced_and_does_not_block_pushes(memory_db):
+    async def scenario():
+        async with make_session(memory_db) as db:
+            a = await make_project(db, "owner/a")
+            queue = JobQueue(db)
+            flush = await queue.schedule_flush(a.id, [1], window_sec=60, max_delay_sec=90)
+            await db.commit()
+            push = await queue.enqueue(a.id, {"branch": "main", "commits": []})
+
+            # the flush job is not due yet, the later push goes first
+            assert [j.id for j in await queue.lease("w1", 10)] == [push.id]
+
+            # another push 50s later resets the timer, capped at created_at + max delay
+            flush.created_at -= timedelta(seconds=50)
+            again = await queue.schedule_flush(a.id, [2], window_sec=60, max_delay_sec=90)
+            assert again.id == flush.id
+            assert again.payload == {"commit_ids": [1, 2]}
+            assert again.available_at == again.created_at + timedelta(seconds=90)
+
+    asyncio.run(scenario())
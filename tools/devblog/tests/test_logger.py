@@ -0,0 +1,100 @@
+import io
+import json
+import queue
+import logging
+from logging.handlers import QueueListener
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core import logger as log_module
+from app.core.config import settings
+from app.core.logger import (
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    SamplingFilter,
+    bind_log_context,
+    parse_sampling,
+    redact,
+    register_secret,
+)
+
+
+def pipeline(name: str, maxsize: int = 0):
+    """Logger -> NonBlockingQueueHandler -> listener thread -> JSON lines in a buffer."""
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    log_queue = queue.Queue(maxsize=maxsize)
+    handler = NonBlockingQueueHandler(log_queue)
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger, handler, log_queue, output, stream
+
+
+def lines(stream: io.StringIO):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_records_carry_context_extras_and_exception():
+    logger, _, log_queue, output, stream = pipeline("test.logger.context")
+    listener = QueueListener(log_queue, output)
+    listener.start()
+    with bind_log_context(request_id="req-1", project_id=7):
+        logger.info("Processed %d commits", 3, extra={"branch": "main"})
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            logger.exception("Failed")
+    logger.info("outside")
+    listener.stop()
+
+    first, failed, outside = lines(stream)
+    assert first["msg"] == "Processed 3 commits"
+    assert (first["request_id"], first["project_id"], first["branch"]) == ("req-1", 7, "main")
+    assert "RuntimeError: boom" in failed["exc"]
+    assert "request_id" not in outside
+
+
+def test_full_queue_drops_instead_of_blocking():
+    logger, handler, log_queue, _, _ = pipeline("test.logger.full", maxsize=2)
+    for i in range(5):
+        logger.info("line %d", i)
+
+    assert log_queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_redaction_masks_secrets_tokens_and_signatures(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "adm1n-key-value")
+    register_secret("project-hook-secret")
+
+    text = redact(
+        "POST https://api.telegram.org/bot123456789:AAHdqTcvCH1vGWJxfSeofSAs0K5PALDsawXY/sendMessage "
+        "X-Hub-Signature-256=sha256=" + "ab" * 32 + " key sk-proj-abcdefghijklmnopqrst "
+        'admin adm1n-key-value hook project-hook-secret {"webhook_secret": "s3cr3tvalue"} Bearer abcdefgh12345'
+    )
+
+    for leaked in ("AAHdqTcv", "ab" * 32, "sk-proj", "adm1n-key-value", "project-hook-secret", "s3cr3tvalue", "abcdefgh12345"):
+        assert leaked not in text
+    assert redact("input_tokens=120 max_tokens: 500") == "input_tokens=120 max_tokens: 500"
+
+
+def test_sampling_keeps_share_of_info_lines_and_all_warnings():
+    assert parse_sampling("app.api.webhook=0.25, bad=x,app.x=2") == {"app.api.webhook": 0.25, "app.x": 1.0}
+    sampler = SamplingFilter(0.25)
+    info = logging.LogRecord("x", logging.INFO, __file__, 1, "m", None, None)
+    warning = logging.LogRecord("x", logging.WARNING, __file__, 1, "m", None, None)
+
+    assert sum(sampler.filter(info) for _ in range(100)) == 25
+    assert all(sampler.filter(warning) for _ in range(10))
+
+
+def test_request_id_is_echoed_and_generated():
+    client = TestClient(app)
+
+    assert client.get("/health", headers={"X-Request-ID": "abc-123"}).headers["x-request-id"] == "abc-123"
+    generated = client.get("/health", headers={"X-Request-ID": "bad id\n"}).headers["x-request-id"]
+    assert generated != "bad id\n" and log_module.REQUEST_ID_RE.match(generated)
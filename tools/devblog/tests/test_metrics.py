@@ -0,0 +1,27 @@
+import os
+import sys
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+OBSERVE = "from app.core.metrics import PUSH_COMMITS; PUSH_COMMITS.labels('7').observe(3)"
+RENDER = "from app.core.metrics import render_metrics; print(render_metrics().decode())"
+
+
+def run(code: str, multiproc_dir: Path) -> str:
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(multiproc_dir), PYTHONPATH=str(ROOT))
+    return subprocess.run(
+        [sys.executable, "-c", code], env=env, cwd=str(ROOT), capture_output=True, text=True, check=True,
+    ).stdout
+
+
+def test_samples_of_all_processes_are_aggregated(tmp_path):
+    # e.g. two uvicorn workers and the job worker writing to the same directory
+    run(OBSERVE, tmp_path)
+    run(OBSERVE, tmp_path)
+
+    text = run(RENDER, tmp_path)
+
+    assert 'devblog_push_commits_count{project="7"} 2.0' in text
+    assert 'devblog_push_commits_sum{project="7"} 6.0' in text
@@ -0,0 +1,73 @@
+import json
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.integrations.openai_batch import BatchBackend, LocalBatchBackend
+from app.integrations.telegram import TelegramService
+from app.models import Project, CommitEvent, Post
+from app.services.ai_cache import ai_post_cache
+from app.services.digest import run_due_digests
+from app.services.project_cache import project_cache
+from app.services.seen_commits import seen_commits
+
+
+def test_due_digests_are_generated_in_one_batch_with_per_project_fallback(monkeypatch, tmp_path, memory_db):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    sent = {}
+
+    async def fake_send(self, text, parse_mode="HTML"):
+        sent[self.project.name] = text
+        return {"success": True, "message_id": "1"}
+
+    monkeypatch.setattr(TelegramService, "send_message", fake_send)
+
+    def respond(body):
+        if "Project: broken\n" in body["input"]:
+            raise RuntimeError("model refused")
+        return {"output": [{"content": [{"text": "AI digest"}]}]}
+
+    async def scenario():
+        factory = await memory_db()
+        monkeypatch.setattr(ai_post_cache, "session_factory", factory)
+        project_cache.clear()
+        seen_commits.clear()
+        async with factory() as db:
+            for name, ai in (("alpha", True), ("broken", True), ("plain", False)):
+                project = Project(name=name, repo_full_name=f"owner/{name}", telegram_chat_id=f"@{name}",
+                                  post_mode="daily_digest", ai_enabled=ai)
+                db.add(project)
+                await db.flush()
+                db.add(CommitEvent(project_id=project.id, commit_hash=f"{project.id:040x}", author="Dev",
+                                   message=f"feat: {name} change", pushed_at=project.created_at, branch="main"))
+            await db.commit()
+
+        backend = LocalBatchBackend(tmp_path, respond)
+        results = await run_due_digests(factory, batch_backend=backend)
+
+        # one batch for the two AI projects, the template project is not sent
+        inputs = list(tmp_path.glob("*.input.jsonl"))
+        assert len(inputs) == 1
+        assert [json.loads(line)["custom_id"] for line in inputs[0].read_text().splitlines()] == ["0", "1"]
+
+        assert all(r["message_sent"] for r in results.values())
+        assert sent["alpha"] == "AI digest"
+        assert "broken change" in sent["broken"] and "plain change" in sent["plain"]  # template fallback
+        async with factory() as db:
+            assert set((await db.scalars(select(Post.status))).all()) == {"success"}
+            # nothing is due again until the next period
+            assert await run_due_digests(factory, batch_backend=backend) == {}
+        await factory.kw["bind"].dispose()
+
+    asyncio.run(scenario())
+
+
+def test_incomplete_backend_cannot_be_created():
+    class SubmitOnly(BatchBackend):
+        async def submit(self, requests):
+            return "batch-1"
+
+    with pytest.raises(TypeError):
+        SubmitOnly()
@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+
+from app.core.config import settings
+from app.integrations.http_client import SharedHttpClient
+from app.integrations.limiter import AIMDLimiter
+from app.integrations.openai_service import OpenAIService, OpenAIMetrics, parse_retry_after
+from app.models import ProjectSnapshot, CommitSnapshot
+
+PROJECT = ProjectSnapshot(
+    id=1, name="Ai", repo_full_name="owner/ai", github_webhook_secret=None, language="en",
+    ai_enabled=True, post_mode="per_push", telegram_chat_id="@ai", telegram_bot_token=None,
+)
+COMMITS = [CommitSnapshot(1, "a" * 40, "Dev", "feat: add thing", None, "main")]
+
+
+def make_service(responses, limiter):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return responses.pop(0)
+
+    http = SharedHttpClient("openai", base_url="http://openai.test/v1", transport=httpx.MockTransport(handler))
+    return OpenAIService(PROJECT, http=http, limiter=limiter, metrics=OpenAIMetrics()), calls
+
+
+def test_retries_429_honoring_retry_after_and_shrinks_limit(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    limiter = AIMDLimiter(initial=8, min_limit=1, max_limit=8)
+    ok = {"output": [{"content": [{"text": "Post"}]}], "usage": {"input_tokens": 50, "output_tokens": 7}}
+    service, calls = make_service([
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(503, headers={"retry-after-ms": "1"}),
+        httpx.Response(200, json=ok),
+    ], limiter)
+
+    assert asyncio.run(service.generate_post(COMMITS)) == (True, "Post")
+    assert calls == ["/v1/responses"] * 3
+    assert service.metrics.retries == 2
+    assert (service.metrics.input_tokens, service.metrics.output_tokens) == (50, 7)
+    # two push backs halve the limit twice, one success grows it by 1/limit
+    assert limiter.limit == 2.5
+    assert limiter.throttled == 2
+
+
+def test_gives_up_when_retry_after_is_too_long(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(settings, "OPENAI_RETRY_MAX_SEC", 5)
+    service, calls = make_service([httpx.Response(429, headers={"Retry-After": "120"})], AIMDLimiter(initial=2))
+
+    ok, error = asyncio.run(service.generate_post(COMMITS))
+
+    assert not ok and "429" in error
+    assert len(calls) == 1
+    assert service.metrics.failures == 1
+
+
+def test_limiter_bounds_concurrency_and_recovers():
+    limiter = AIMDLimiter(initial=2, min_limit=1, max_limit=4)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter:
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+            limiter.on_success()
+
+    async def scenario():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(scenario())
+    assert peak == 2
+    assert limiter.limit > 2
+    limiter.on_throttle()
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.limit == 1
+    assert parse_retry_after(httpx.Headers({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
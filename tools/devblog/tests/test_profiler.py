@@ -0,0 +1,45 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.config import settings
+from app.core.profiler import SamplingProfiler, list_profiles
+
+
+def busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_profiler_writes_folded_stacks_and_runs_one_at_a_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    profiler = SamplingProfiler.try_start("test")
+    assert SamplingProfiler.try_start("other") is None
+
+    busy(0.1)
+    path = profiler.stop()
+
+    lines = path.read_text().splitlines()
+    assert any("test_profiler:busy" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert list_profiles() == [profiler.id]
+    SamplingProfiler.try_start("again").stop()
+
+
+def test_profile_endpoints_require_admin_and_serve_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "adm1n")
+    client = TestClient(app)
+    admin = {"X-Admin-Token": "adm1n"}
+
+    assert client.post("/admin/profiles?seconds=0.05").status_code == 401
+    res = client.post("/admin/profiles?seconds=0.05", headers=admin)
+    assert res.status_code == 200
+
+    res = client.get("/health", headers={**admin, "X-Profile": "1"})
+    profile_id = res.headers["x-profile-id"]
+    assert profile_id in client.get("/admin/profiles", headers=admin).json()["profiles"]
+    assert client.get(f"/admin/profiles/{profile_id}", headers=admin).status_code == 200
+    assert client.get("/admin/profiles/..%2Fsecrets", headers=admin).status_code == 404
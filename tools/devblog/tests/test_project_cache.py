@@ -0,0 +1,64 @@
+import asyncio
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models import Project
+from app.services.project_cache import ProjectCache
+
+
+def make_sessions(tmp_path):
+    """Sync session (writes, invalidate) and async session (lookups) on the same database file."""
+    url = f"sqlite:///{tmp_path / 'cache.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+    return async_engine, sessionmaker(bind=engine)(), async_sessionmaker(async_engine, expire_on_commit=False)()
+
+
+def test_cache_hit_skips_db(tmp_path):
+    async def scenario():
+        async_engine, db, adb = make_sessions(tmp_path)
+        db.add(Project(name="A", repo_full_name="owner/a", telegram_chat_id="@a"))
+        db.commit()
+
+        statements = []
+        event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        cache = ProjectCache(version_check_sec=3600)
+        first = await cache.get_by_repo(adb, "owner/a")
+        count = len(statements)
+        again = await cache.get_by_repo(adb, "owner/a")
+        by_id = await cache.get_by_id(adb, first.id)
+
+        assert again is first and by_id is first
+        assert len(statements) == count
+        await adb.close()
+        await async_engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_propagates_to_other_process_cache(tmp_path):
+    async def scenario():
+        async_engine, db, adb = make_sessions(tmp_path)
+        p = Project(name="A", repo_full_name="owner/a", telegram_chat_id="@a")
+        db.add(p)
+        db.commit()
+
+        writer = ProjectCache(version_check_sec=0)
+        reader = ProjectCache(version_check_sec=0)
+        assert (await reader.get_by_repo(adb, "owner/a")).telegram_chat_id == "@a"
+
+        p.telegram_chat_id = "@b"
+        db.commit()
+        writer.invalidate(db)
+
+        assert (await reader.get_by_repo(adb, "owner/a")).telegram_chat_id == "@b"
+        assert await reader.get_by_repo(adb, "owner/missing") is None
+        await adb.close()
+        await async_engine.dispose()
+
+    asyncio.run(scenario())
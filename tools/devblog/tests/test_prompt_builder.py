@@ -0,0 +1,75 @@
+from app.integrations.prompt_builder import PromptBuilder, STATIC_INSTRUCTIONS, estimate_tokens
+from app.models import CommitSnapshot
+
+
+def commit(i, message):
+    return CommitSnapshot(i, f"{i:040x}", "Dev", message, None, "main")
+
+
+def test_static_instructions_come_first_and_small_pushes_are_untouched():
+    builder = PromptBuilder(token_budget=1500)
+    a = builder.build("Alpha", "ru", [commit(1, "feat: add login\n\nlong body")])
+    b = builder.build("Beta", "en", [commit(2, "fix: typo")])
+
+    assert a.text.startswith(STATIC_INSTRUCTIONS + "\n") and b.text.startswith(STATIC_INSTRUCTIONS + "\n")
+    assert a.stages == ()
+    assert "- 0000000 | Dev |  | feat: add login" in a.text and "long body" not in a.text
+
+
+def test_large_push_is_deduplicated_grouped_and_truncated_to_budget():
+    commits = [commit(i, "fix: typo") for i in range(300)]
+    commits += [commit(1000 + i, f"feat(api): endpoint number {i} " + "x" * 150) for i in range(400)]
+    commits += [commit(5000 + i, f"random change {i}") for i in range(50)]
+    builder = PromptBuilder(token_budget=800)
+
+    prompt = builder.build("Big", "en", commits)
+
+    assert prompt.raw_tokens > 10 * prompt.tokens
+    assert prompt.tokens <= 800 and estimate_tokens(prompt.text) == prompt.tokens
+    assert prompt.stages[:2] == ("dedupe", "group") and prompt.stages[-1].startswith("top:")
+    assert prompt.text.startswith(STATIC_INSTRUCTIONS)
+    assert "fix (300):\n  - typo (300)" in prompt.text
+    assert "feat (400):" in prompt.text and "other (50):" in prompt.text
+    assert "more" in prompt.text
+
+
+def test_duplicates_alone_can_bring_a_push_under_budget():
+    commits = [commit(i, "chore: bump version") for i in range(200)]
+
+    prompt = PromptBuilder(token_budget=400).build("Bumps", "en", commits)
+
+    assert prompt.stages == ("dedupe",)
+    assert prompt.text.endswith("- bump version (200)")
+
+
+def test_hard_cut_keeps_instructions_and_drops_whole_commit_lines():
+    commits = [commit(i, f"type{i}: change {i}") for i in range(200)]
+
+    prompt = PromptBuilder(token_budget=400).build("Types", "en", commits)
+
+    assert prompt.stages[-1] == "cut" and prompt.tokens <= 400
+    assert prompt.text.startswith(STATIC_INSTRUCTIONS + "\nProject: Types\nLanguage: en\nCommits (200):\n")
+    assert prompt.text.endswith(" more lines")
+    # a budget smaller than the instructions still never cuts into them
+    tiny = PromptBuilder(token_budget=10).build("Types", "en", commits)
+    assert tiny.text.startswith(STATIC_INSTRUCTIONS) and "Commits (200):" in tiny.text
+
+
+def test_commit_types_follow_the_project_rules():
+    from app.core.commit_parser import get_commit_parser
+    from app.integrations.openai_service import OpenAIService
+    from app.models import ProjectSnapshot
+
+    project = ProjectSnapshot(
+        id=1, name="Rules", repo_full_name="o/r", github_webhook_secret=None, telegram_chat_id="@r",
+        telegram_bot_token=None, language="en", ai_enabled=True, post_mode="realtime",
+        coalesce_window_sec=0, commit_rules='{"aliases": {"feature": "added"}}',
+    )
+    commits = [commit(i, f"feature: thing {i} " + "x" * 100) for i in range(40)]
+
+    builder = OpenAIService(project).prompt_builder
+    builder.token_budget = 400
+    prompt = builder.build("Rules", "en", commits)
+
+    assert builder.parser is get_commit_parser(project.commit_rules)
+    assert "group" in prompt.stages and "added (40):" in prompt.text
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from app.services.push_payload import parse_push_payload
+
+
+def test_extracts_only_needed_fields():
+    body = json.dumps({
+        "ref": "refs/heads/main",
+        "head_commit": {"id": "x", "message": "ignored"},
+        "commits": [
+            {"id": "a" * 40, "message": "feat: one", "author": {"name": "Dev", "email": "d@x"},
+             "timestamp": "2024-01-01T00:00:00Z", "added": ["a.py"]},
+            {"id": "b" * 40, "message": "fix: two", "author": None},
+        ],
+        "repository": {"full_name": "owner/repo", "owner": {"login": "owner"}},
+    }, indent=2).encode()
+
+    payload = parse_push_payload(body)
+
+    assert payload.repo_full_name == "owner/repo"
+    assert payload.branch == "main"
+    assert payload.commits == [
+        {"id": "a" * 40, "message": "feat: one", "author": {"name": "Dev"}, "timestamp": "2024-01-01T00:00:00Z"},
+        {"id": "b" * 40, "message": "fix: two", "author": {"name": "Unknown"}, "timestamp": None},
+    ]
+
+
+@pytest.mark.parametrize("body", [b"", b"[]", b'{"ref": }', b'{"commits": [1,]}', b'{"ref": "x"} trailing', b"\xff"])
+def test_rejects_malformed_payloads(body):
+    with pytest.raises(ValueError):
+        parse_push_payload(body)
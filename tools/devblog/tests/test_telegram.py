@@ -0,0 +1,99 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.integrations.http_client import SharedHttpClient
+from app.integrations.telegram import TelegramService
+from app.models import ProjectSnapshot
+
+
+class StubBotApi(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    paths = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.paths.append(self.path)
+        body = json.dumps({"ok": True, "result": {"message_id": len(self.paths)}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubBotApi)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StubBotApi.paths = []
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def make_project(chat_id):
+    return ProjectSnapshot(
+        id=1, name="Tg", repo_full_name="owner/tg", github_webhook_secret=None, language="en",
+        ai_enabled=False, post_mode="per_push", telegram_chat_id=chat_id, telegram_bot_token="TOKEN",
+    )
+
+
+def test_messages_reuse_one_pooled_connection(stub_url):
+    async def scenario():
+        http = SharedHttpClient("telegram", base_url=stub_url)
+        await http.start()
+        # a new service per webhook, one shared client underneath
+        results = [
+            await TelegramService(make_project("@pool"), http=http).send_message(f"post {i}")
+            for i in range(3)
+        ]
+        metrics = http.metrics()
+        await http.aclose()
+        return results, metrics
+
+    results, metrics = asyncio.run(scenario())
+
+    assert [r["message_id"] for r in results] == ["1", "2", "3"]
+    assert StubBotApi.paths == ["/botTOKEN/sendMessage"] * 3
+    assert metrics["requests"] == 3
+    assert metrics["connections_opened"] == 1
+
+
+def test_scheduler_delays_instead_of_dropping_and_obeys_retry_after(monkeypatch):
+    monkeypatch.setattr(settings, "TELEGRAM_RATE_LIMIT_PER_MIN", 1200)  # 20/s per chat
+    monkeypatch.setattr(settings, "TELEGRAM_CHAT_BURST", 1)
+    received = []
+
+    def handler(request):
+        text = json.loads(request.content)["text"]
+        if text == "post 2" and "429" not in received:
+            received.append("429")
+            return httpx.Response(429, json={"ok": False, "description": "Too Many Requests", "parameters": {"retry_after": 0.05}})
+        received.append(text)
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": len(received)}})
+
+    async def scenario():
+        http = SharedHttpClient("telegram", base_url="http://tg.test", transport=httpx.MockTransport(handler))
+        service = TelegramService(make_project("@sched"), http=http)
+        started = time.monotonic()
+        results = await asyncio.gather(*(service.send_message(f"post {i}") for i in range(6)))
+        return results, time.monotonic() - started
+
+    results, elapsed = asyncio.run(scenario())
+
+    assert all(r["success"] for r in results)
+    # released in submission order; the throttled message is retried in place
+    assert received == ["post 0", "post 1", "429", "post 2", "post 3", "post 4", "post 5"]
+    # 5 waits of 1/20 s plus the 0.05 s server pause
+    assert elapsed >= 0.25
@@ -0,0 +1,73 @@
+import json
+import zlib
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.db.upgrade import pending_upgrades, upgrade
+
+# Schema written by the first release (create_all of the original models)
+LEGACY_SCHEMA = """
+CREATE TABLE projects (
+    id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(255) NOT NULL, repo_type VARCHAR(50) NOT NULL,
+    repo_full_name VARCHAR(255) NOT NULL UNIQUE, github_webhook_secret VARCHAR(255), language VARCHAR(10),
+    ai_enabled BOOLEAN, post_mode VARCHAR(50), telegram_chat_id VARCHAR(255) NOT NULL,
+    telegram_bot_token VARCHAR(255), created_at DATETIME, updated_at DATETIME
+);
+CREATE TABLE commit_events (
+    id INTEGER NOT NULL PRIMARY KEY, project_id INTEGER NOT NULL REFERENCES projects (id),
+    commit_hash VARCHAR(255) NOT NULL, author VARCHAR(255) NOT NULL, message TEXT NOT NULL,
+    pushed_at DATETIME NOT NULL, branch VARCHAR(255) NOT NULL, data_raw JSON, created_at DATETIME
+);
+CREATE INDEX ix_commit_events_project_id ON commit_events (project_id);
+CREATE INDEX ix_commit_events_commit_hash ON commit_events (commit_hash);
+CREATE TABLE posts (
+    id INTEGER NOT NULL PRIMARY KEY, project_id INTEGER NOT NULL REFERENCES projects (id),
+    source VARCHAR(50) NOT NULL, content TEXT NOT NULL, content_md TEXT, status VARCHAR(50),
+    error_message TEXT, telegram_message_id VARCHAR(255), created_at DATETIME
+);
+INSERT INTO projects (id, name, repo_type, repo_full_name, telegram_chat_id, post_mode)
+    VALUES (1, 'Old', 'github', 'owner/old', '@old', 'per_push');
+INSERT INTO posts (project_id, source, content, status) VALUES (1, 'github', 'Old post', 'success')
+"""
+SHA = "ABCDEF0123456789abcdef0123456789abcdef01"
+
+
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA.split(";"):
+            conn.execute(text(statement))
+        for commit_id, commit_hash, branch in ((1, SHA, "main"), (2, "abc123def456", "main"), (3, SHA.lower(), "dev")):
+            conn.execute(
+                text(
+                    "INSERT INTO commit_events (id, project_id, commit_hash, author, message, pushed_at, branch, data_raw)"
+                    " VALUES (:id, 1, :hash, 'Dev', 'feat(api)!: new endpoint', '2024-01-01 00:00:00', :branch, :raw)"
+                ),
+                {"id": commit_id, "hash": commit_hash, "branch": branch, "raw": json.dumps({"id": commit_hash})},
+            )
+    return engine
+
+
+def test_legacy_database_is_upgraded_in_place(tmp_path):
+    engine = legacy_engine(tmp_path)
+    assert "rebuild commit_events" in pending_upgrades(engine)
+
+    report = upgrade(engine)
+
+    assert report["commit_events"] == {"copied": 1, "invalid_hash": 1, "duplicate": 1}
+    assert {"projects.coalesce_window_sec", "projects.commit_rules", "posts.content_hash"} <= set(report["columns"])
+    assert "uq_posts_project_content_hash" in report["indexes"]
+    with engine.connect() as conn:
+        row = conn.execute(text(
+            "SELECT e.commit_hash, e.commit_type, e.breaking, p.data FROM commit_events e"
+            " JOIN commit_payloads p ON p.digest = e.payload_digest"
+        )).one()
+        assert (row.commit_hash.hex(), row.commit_type, row.breaking) == (SHA.lower(), "feat", 1)
+        assert json.loads(zlib.decompress(row.data)) == {"id": SHA}
+        assert conn.execute(text("SELECT coalesce_window_sec FROM projects")).scalar() == 0
+        assert conn.execute(text("SELECT content FROM posts")).scalar() == "Old post"
+    assert "commit_events_legacy" not in inspect(engine).get_table_names()
+
+    # a second run has nothing left to do
+    assert pending_upgrades(engine) == []
+    assert upgrade(engine) == {"columns": [], "indexes": [], "commit_events": None}
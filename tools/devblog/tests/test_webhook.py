@@ -0,0 +1,255 @@
+import hmac
+import json
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, delete, event, func, select
+from sqlalchemy.orm import Session
+
+from app.main import app
+from app.api import webhook
+from app.core.config import settings
+from app.db import SessionLocal
+from app.db.base import Base
+from app.models import Project, WebhookJob, WebhookDelivery
+from app.services.project_cache import project_cache
+
+
+def sign(body: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def push_body(repo: str) -> bytes:
+    return json.dumps({
+        "ref": "refs/heads/main",
+        "repository": {"full_name": repo},
+        "commits": [{"id": "a" * 40, "message": "feat: webhook test", "author": {"name": "Dev"},
+                     "timestamp": "2024-01-01T00:00:00Z"}],
+    }).encode()
+
+
+@pytest.fixture
+def project():
+    db = SessionLocal()
+    p = Project(name="Hook", repo_full_name="owner/hook", telegram_chat_id="@hook", github_webhook_secret="s3cret")
+    db.add(p)
+    db.commit()
+    db.refresh(p)
+    project_cache.clear()
+    yield p
+    db.query(WebhookJob).delete()
+    db.delete(p)
+    db.commit()
+    db.close()
+    project_cache.clear()
+
+
+def test_project_route_queues_verified_push(project):
+    body = push_body("owner/hook")
+    client = TestClient(app)
+    res = client.post(
+        f"/webhook/github/{project.id}",
+        content=body,
+        headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": sign(body, "s3cret")},
+    )
+    assert res.status_code == 202
+    assert res.json()["commits_received"] == 1
+
+
+def test_project_route_rejects_forged_request_before_parsing(project, monkeypatch):
+    def fail_parse(body):
+        raise AssertionError("payload must not be decoded before signature check")
+
+    monkeypatch.setattr(webhook, "parse_push_payload", fail_parse)
+    body = push_body("owner/hook")
+    client = TestClient(app)
+    res = client.post(
+        f"/webhook/github/{project.id}",
+        content=body,
+        headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": sign(body, "wrong")},
+    )
+    assert res.status_code == 401
+
+
+def test_project_route_rejects_oversized_and_mismatched(project, monkeypatch):
+    client = TestClient(app)
+
+    monkeypatch.setattr(settings, "WEBHOOK_MAX_BODY_BYTES", 10)
+    body = push_body("owner/hook")
+    res = client.post(
+        f"/webhook/github/{project.id}",
+        content=body,
+        headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": sign(body, "s3cret")},
+    )
+    assert res.status_code == 413
+
+    monkeypatch.undo()
+    body = push_body("owner/other")
+    res = client.post(
+        f"/webhook/github/{project.id}",
+        content=body,
+        headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": sign(body, "s3cret")},
+    )
+    assert res.status_code == 400
+
+
+def test_redelivery_returns_original_result(project):
+    body = push_body("owner/hook")
+    headers = {
+        "X-GitHub-Event": "push",
+        "X-Hub-Signature-256": sign(body, "s3cret"),
+        "X-GitHub-Delivery": "delivery-1",
+    }
+    client = TestClient(app)
+    first = client.post(f"/webhook/github/{project.id}", content=body, headers=headers)
+    again = client.post("/webhook/github", content=body, headers=headers)
+
+    assert first.status_code == 202
+    assert again.status_code == 200
+    assert again.json()["job_id"] == first.json()["job_id"]
+    assert again.json()["duplicate"] is True
+
+    db = SessionLocal()
+    assert db.query(WebhookJob).filter(WebhookJob.project_id == project.id).count() == 1
+    db.close()
+
+
+def test_inline_redelivery_after_failure_is_processed_again(project, monkeypatch):
+    monkeypatch.setattr(settings, "WEBHOOK_QUEUE_ENABLED", False)
+    outcomes = [RuntimeError("db down"), {"processed": 1, "message_sent": False, "error": "Telegram 502"},
+                {"processed": 1, "message_sent": True}]
+
+    async def process(self, commits, branch, coalesce=False):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(webhook.CommitProcessor, "process_webhook_commits", process)
+    body = push_body("owner/hook")
+    headers = {
+        "X-GitHub-Event": "push",
+        "X-Hub-Signature-256": sign(body, "s3cret"),
+        "X-GitHub-Delivery": "delivery-inline",
+    }
+    client = TestClient(app, raise_server_exceptions=False)
+    url = f"/webhook/github/{project.id}"
+
+    assert client.post(url, content=body, headers=headers).status_code == 500
+    assert client.post(url, content=body, headers=headers).json()["message_sent"] is False
+    sent = client.post(url, content=body, headers=headers).json()
+    again = client.post(url, content=body, headers=headers).json()
+
+    assert (sent["message_sent"], "duplicate" in sent) == (True, False)
+    assert again["duplicate"] is True and not outcomes
+
+
+def test_push_rejected_by_project_rules_creates_no_job(project):
+    db = SessionLocal()
+    db.query(Project).filter(Project.id == project.id).update({"commit_rules": {"ignore_authors": ["dev"]}})
+    db.commit()
+    project_cache.clear()
+    body = push_body("owner/hook")
+    client = TestClient(app)
+    res = client.post(
+        f"/webhook/github/{project.id}",
+        content=body,
+        headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": sign(body, "s3cret")},
+    )
+    assert res.status_code == 200
+    assert res.json()["status"] == "ignored"
+    assert db.query(WebhookJob).filter(WebhookJob.project_id == project.id).count() == 0
+    db.close()
+
+
+def test_metrics_expose_webhook_signature_and_db_timings(project):
+    body = push_body("owner/hook")
+    client = TestClient(app)
+    client.post(
+        f"/webhook/github/{project.id}",
+        content=body,
+        headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": sign(body, "s3cret")},
+    )
+
+    res = client.get("/metrics")
+
+    assert res.status_code == 200
+    assert f'devblog_webhook_seconds_count{{project="{project.id}",status="202"}}' in res.text
+    assert f'devblog_push_commits_count{{project="{project.id}"}}' in res.text
+    assert "devblog_signature_validation_seconds_count" in res.text
+    assert 'devblog_db_statement_seconds_count{engine="async",operation="INSERT"}' in res.text
+
+
+def test_server_timing_breaks_down_webhook_stages_for_admins_only(project, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "adm1n")
+    body = push_body("owner/hook")
+    headers = {"X-GitHub-Event": "push", "X-Hub-Signature-256": sign(body, "s3cret")}
+    client = TestClient(app)
+    res = client.post(f"/webhook/github/{project.id}", content=body, headers={**headers, "X-Admin-Token": "adm1n"})
+
+    assert res.status_code == 202
+    stages = [part.split(";")[0] for part in res.headers["server-timing"].split(", ")]
+    assert {"signature", "parse", "enqueue", "db"} <= set(stages)
+    assert stages[-1] == "total"
+
+    # without a valid admin token the stage timings are not exposed
+    assert "server-timing" not in client.post(f"/webhook/github/{project.id}", content=body, headers=headers).headers
+    assert "server-timing" not in client.get("/health", headers={"X-Admin-Token": "adm1n-not"}).headers
+
+
+def test_deleting_project_removes_its_deliveries():
+    engine = create_engine("sqlite://")
+    event.listen(engine, "connect", lambda conn, record: conn.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as db:
+        orm_deleted, sql_deleted = (
+            Project(name=name, repo_full_name=f"owner/{name}", telegram_chat_id="@x") for name in ("orm", "sql")
+        )
+        db.add_all([orm_deleted, sql_deleted])
+        db.flush()
+        db.add_all([
+            WebhookDelivery(delivery_id="d-1", project_id=orm_deleted.id, response={"status": "queued"}),
+            WebhookJob(project_id=orm_deleted.id, payload={}, status="done"),
+            WebhookDelivery(delivery_id="d-2", project_id=sql_deleted.id, response={"status": "queued"}),
+        ])
+        db.commit()
+
+        db.delete(orm_deleted)
+        db.commit()
+        # the database cascades too, for deletes that bypass the ORM
+        db.execute(delete(Project).where(Project.id == sql_deleted.id))
+        db.commit()
+
+        assert db.scalar(select(func.count()).select_from(WebhookDelivery)) == 0
+        assert db.scalar(select(func.count()).select_from(Project)) == 0
+
+
+def test_repo_route_webhook_metrics_carry_the_project(project):
+    client = TestClient(app)
+    label = f'devblog_webhook_seconds_count{{project="{project.id}",status="202"}} '
+
+    def observed():
+        line = next((l for l in client.get("/metrics").text.splitlines() if l.startswith(label)), None)
+        return float(line.split()[-1]) if line else 0.0
+
+    before = observed()
+    body = push_body("owner/hook")
+    res = client.post(
+        "/webhook/github", content=body, headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": sign(body, "s3cret")},
+    )
+
+    assert res.status_code == 202
+    assert observed() == before + 1
+
+
+def test_unverified_webhook_metrics_do_not_create_project_series(project):
+    client = TestClient(app)
+
+    for url in ("/webhook/github/999991", "/webhook/github/garbage-x", f"/webhook/github/{project.id}"):
+        client.post(url, content=b"{}", headers={"X-GitHub-Event": "push", "X-Hub-Signature-256": "sha256=00"})
+
+    series = [l for l in client.get("/metrics").text.splitlines() if l.startswith("devblog_webhook_seconds_count")]
+    assert not any(f'project="{value}"' in line for line in series for value in ("999991", "garbage-x"))
+    assert not any(f'project="{project.id}",status="401"' in line for line in series)